@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Evaluasi mode cascade (rule_tier.py) vs skor full model.
+
+Dataset dari scripts/generate_dataset.py (pake label is_anomaly &
+anomaly_type-nya). Sebagian awal (--history) dimasukin ke statistik konteks
+dulu kayak history di serving, sisanya diskor dua kali pake score_batch:
+sekali full forest, sekali cascade. Cache skor ga dipake.
+
+Yang dilaporin:
+  - throughput (baris/s, best of --repeat) dua-duanya + speedup
+  - porsi baris yang diputusin tier aturan vs forest
+  - keputusan cascade yang beda sama full model (per tier & per jenis anomali)
+  - akurasi/precision/recall/F1 dua-duanya terhadap label dataset
+
+Pake:
+  python bench_cascade.py [--rows N] [--seed S] [--history 0.5]
+                          [--batch-size N] [--repeat N] [--output hasil.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'scripts'))
+
+LABEL_COLUMNS = ['is_anomaly', 'anomaly_type']
+
+
+def load_transactions(rows, seed):
+    """Transaksi + label dari generator dataset"""
+    from generate_dataset import generate
+    transactions = []
+    for chunk in generate(rows, seed):
+        transactions.extend(chunk.to_dict('records'))
+    labels = [{column: tx.pop(column) for column in LABEL_COLUMNS} for tx in transactions]
+    return transactions, labels
+
+
+def score_all(transactions, models, batch_size, repeat):
+    """Skor semua baris per batch, balikin (hasil, detik terbaik)"""
+    from predict_anomaly import score_batch
+    best = None
+    for _ in range(repeat):
+        results = []
+        start = time.perf_counter()
+        for offset in range(0, len(transactions), batch_size):
+            results.extend(score_batch(transactions[offset:offset + batch_size], models))
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return results, best
+
+
+def quality(predicted, actual):
+    """Akurasi/precision/recall/F1 terhadap label dataset"""
+    tp = int((predicted & actual).sum())
+    fp = int((predicted & ~actual).sum())
+    fn = int((~predicted & actual).sum())
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return {
+        'accuracy': round(float((predicted == actual).mean()), 5),
+        'precision': round(precision, 5),
+        'recall': round(recall, 5),
+        'f1': round(2 * precision * recall / (precision + recall), 5) if precision + recall else 0.0,
+        'anomalies': int(predicted.sum()),
+    }
+
+
+def run(args):
+    from context_stats import ContextStatsStore, observe_transactions
+    from metrics import Metrics
+    from predict_anomaly import load_model_files, resolve_model_dir
+    from rule_tier import RuleTier
+
+    transactions, labels = load_transactions(args.rows, args.seed)
+    split = int(len(transactions) * args.history)
+    history, transactions, labels = transactions[:split], transactions[split:], labels[split:]
+
+    stats = ContextStatsStore()
+    observe_transactions(stats, history)
+
+    files = load_model_files(resolve_model_dir())
+    base = {**files, 'stats': stats, 'cache': None, 'metrics': Metrics(enabled=False)}
+    full = {**base, 'rules': None}
+    cascade = {**base, 'rules': RuleTier(files['config'])}
+
+    full_results, full_seconds = score_all(transactions, full, args.batch_size, args.repeat)
+    cascade_results, cascade_seconds = score_all(transactions, cascade, args.batch_size, args.repeat)
+
+    actual = np.array([bool(label['is_anomaly']) for label in labels])
+    # Baris normal anomaly_type-nya None/NaN
+    kinds = np.array([
+        label['anomaly_type'] if isinstance(label['anomaly_type'], str) else 'normal' for label in labels
+    ], dtype=object)
+    full_pred = np.array([r['is_anomaly'] for r in full_results])
+    cascade_pred = np.array([r['is_anomaly'] for r in cascade_results])
+    tiers = np.array([r.get('tier', 'error') for r in cascade_results], dtype=object)
+    differs = full_pred != cascade_pred
+
+    return {
+        'meta': {
+            'rows': len(transactions),
+            'history_rows': len(history),
+            'seed': args.seed,
+            'batch_size': args.batch_size,
+            'backend': files['backend'],
+            'version': files['version'],
+        },
+        'throughput': {
+            'full_rows_per_sec': round(len(transactions) / full_seconds, 1),
+            'cascade_rows_per_sec': round(len(transactions) / cascade_seconds, 1),
+            'speedup': round(full_seconds / cascade_seconds, 3),
+        },
+        'tiers': {tier: int((tiers == tier).sum()) for tier in ('rules', 'model', 'error')},
+        'disagreements': {
+            'total': int(differs.sum()),
+            # Aturan bilang anomali tapi forest normal, & sebaliknya
+            'rules_anomaly': int((differs & (tiers == 'rules') & cascade_pred).sum()),
+            'rules_normal': int((differs & (tiers == 'rules') & ~cascade_pred).sum()),
+            'model': int((differs & (tiers == 'model')).sum()),
+            'by_type': {kind: int((differs & (kinds == kind)).sum()) for kind in sorted(set(kinds))},
+        },
+        'quality': {
+            'full': quality(full_pred, actual),
+            'cascade': quality(cascade_pred, actual),
+        },
+    }
+
+
+def report(result):
+    meta = result['meta']
+    throughput = result['throughput']
+    print('=' * 60)
+    print(f"CASCADE vs FULL MODEL ({meta['backend']}, {meta['version']})")
+    print('=' * 60)
+    print(f"Baris diskor: {meta['rows']:,} (history {meta['history_rows']:,}), batch {meta['batch_size']}")
+    print(f"Throughput: full {throughput['full_rows_per_sec']:,.0f} baris/s, "
+          f"cascade {throughput['cascade_rows_per_sec']:,.0f} baris/s ({throughput['speedup']}x)")
+    tiers = result['tiers']
+    total = max(sum(tiers.values()), 1)
+    print(f"Diputusin aturan: {tiers['rules']:,} ({tiers['rules'] / total * 100:.1f}%), "
+          f"forest: {tiers['model']:,}")
+    disagreements = result['disagreements']
+    print(f"Beda sama full model: {disagreements['total']} baris "
+          f"(aturan bilang anomali {disagreements['rules_anomaly']}, aturan bilang normal "
+          f"{disagreements['rules_normal']}, forest {disagreements['model']})")
+    for kind, count in disagreements['by_type'].items():
+        if count:
+            print(f"  {kind:<18} {count}")
+
+    print(f"\n  {'':<8} {'akurasi':>9} {'precision':>10} {'recall':>8} {'f1':>8} {'anomali':>8}")
+    for name in ('full', 'cascade'):
+        q = result['quality'][name]
+        print(f"  {name:<8} {q['accuracy']:>9.4f} {q['precision']:>10.4f} {q['recall']:>8.4f} "
+              f"{q['f1']:>8.4f} {q['anomalies']:>8}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Evaluasi cascade aturan + forest vs full model')
+    parser.add_argument('--rows', type=int, default=100000, help='ukuran dataset generate')
+    parser.add_argument('--seed', type=int, default=43)
+    parser.add_argument('--history', type=float, default=0.5,
+                        help='porsi awal dataset yang jadi statistik konteks (ga diskor)')
+    parser.add_argument('--batch-size', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='simpen hasil JSON ke file ini')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    result = run(args)
+    report(result)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'\n✓ Hasil disimpen ke {args.output}')
+
+
+if __name__ == '__main__':
+    main()
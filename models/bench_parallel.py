@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Benchmark skoring paralel (parallel_score.py): scaling dari 1 sampe N core.
+
+Dataset dari scripts/generate_dataset.py, diskor sekali pake score_batch biasa
+(satu proses), terus pake ScoringPool 2..N worker. Yang dicatet per jumlah
+worker: waktu nyalain pool (load model di tiap worker), waktu skor, speedup,
+efisiensi per core, dan hasilnya sama persis ga sama yang satu proses.
+
+Pake:
+  python bench_parallel.py [--rows N] [--max-workers N] [--repeat N] [--output hasil.json]
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from bench_pipeline import load_transactions, _git_commit
+from parallel_score import ScoringPool
+from predict_anomaly import load_models, score_batch
+
+
+def _best(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def run(args):
+    transactions = load_transactions(args.rows, args.seed)
+    models = load_models()
+    if 'error' in models:
+        raise RuntimeError(f"Model gagal diload: {models['error']}")
+    models['cache'] = None
+    model = models['model']
+    if hasattr(model, 'n_jobs'):
+        # Baseline beneran satu core
+        model.n_jobs = 1
+
+    serial_s, expected = _best(lambda: score_batch(transactions, models), args.repeat)
+    results = [{
+        'workers': 1,
+        'startup_ms': 0,
+        'score_ms': round(serial_s * 1000, 1),
+        'rows_per_sec': round(len(transactions) / serial_s, 1),
+        'speedup': 1.0,
+        'efficiency': 1.0,
+        'identical': True,
+    }]
+
+    for workers in range(2, args.max_workers + 1):
+        start = time.perf_counter()
+        pool = ScoringPool(workers, min_rows=0)
+        try:
+            pool.warm_up()
+            startup = time.perf_counter() - start
+            score_s, got = _best(lambda: pool.score(transactions, models), args.repeat)
+        finally:
+            pool.close()
+        speedup = serial_s / score_s
+        results.append({
+            'workers': workers,
+            'startup_ms': round(startup * 1000, 1),
+            'score_ms': round(score_s * 1000, 1),
+            'rows_per_sec': round(len(transactions) / score_s, 1),
+            'speedup': round(speedup, 2),
+            'efficiency': round(speedup / workers, 2),
+            'identical': got == expected,
+        })
+
+    return {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'cpu_count': os.cpu_count(),
+            'rows': len(transactions),
+            'backend': models['backend'],
+        },
+        'scaling': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark skoring paralel')
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--seed', type=int, default=43)
+    parser.add_argument('--max-workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='simpen hasil JSON ke file ini')
+    args = parser.parse_args()
+
+    result = run(args)
+    meta = result['meta']
+    print('=' * 60)
+    print(f"SKORING PARALEL {meta['rows']} baris ({meta['backend']}, {meta['cpu_count']} core)")
+    print('=' * 60)
+    print(f"  {'worker':>6} {'startup ms':>11} {'skor ms':>10} {'baris/s':>12} {'speedup':>8} {'efisiensi':>10} {'sama':>6}")
+    for row in result['scaling']:
+        print(f"  {row['workers']:>6} {row['startup_ms']:>11} {row['score_ms']:>10} {row['rows_per_sec']:>12,.0f} "
+              f"{row['speedup']:>8} {row['efficiency']:>10} {str(row['identical']):>6}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'\n✓ Hasil disimpen ke {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+Benchmark end-to-end pipeline skor anomali, hasilnya disimpen JSON biar
+bisa dibandingin antar commit.
+
+Yang diukur:
+  - cold start: proses baru -> import -> load_models -> skor pertama,
+    plus waktu sampe worker --serve ngirim sinyal siap
+  - latency per tahap (load, fitur, scaling, predict, serialisasi) per ukuran batch
+  - latency satu transaksi p50/p95/p99 (in-process & lewat worker --serve)
+  - throughput handle_request di beberapa ukuran batch
+  - peak RSS (proses ini & worker --serve)
+
+Datanya dari scripts/generate_dataset.py (ukuran & seed bisa diatur).
+Cache skor dimatiin biar yang keukur beneran skoringnya.
+
+Pake:
+  python bench_pipeline.py [--rows N] [--batch-sizes 1,10,100,1000] [--singles N]
+                           [--output hasil.json] [--compare hasil_lama.json]
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import resource
+import subprocess
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+sys.path.insert(0, os.path.join(SCRIPT_DIR, '..', 'scripts'))
+
+DEFAULT_BATCH_SIZES = (1, 10, 100, 1000, 10000)
+
+# Dijalanin di proses baru buat ngukur cold start per tahap
+COLD_START_CODE = '''
+import sys, time, json
+t0 = time.perf_counter()
+sys.path.insert(0, %r)
+import predict_anomaly
+t1 = time.perf_counter()
+models = predict_anomaly.load_models()
+models['cache'] = None
+t2 = time.perf_counter()
+json.dumps(predict_anomaly.handle_request(%s, models))
+t3 = time.perf_counter()
+print(json.dumps({'import': t1 - t0, 'load_models': t2 - t1, 'first_score': t3 - t2,
+                  'backend': models.get('backend'), 'error': models.get('error')}))
+'''
+
+
+def percentiles(samples):
+    """Ringkasan latency dalam ms"""
+    values = np.array(samples) * 1000
+    return {
+        'n': len(values),
+        'mean_ms': round(float(values.mean()), 4),
+        'p50_ms': round(float(np.percentile(values, 50)), 4),
+        'p95_ms': round(float(np.percentile(values, 95)), 4),
+        'p99_ms': round(float(np.percentile(values, 99)), 4),
+        'max_ms': round(float(values.max()), 4),
+    }
+
+
+def load_transactions(rows, seed):
+    """Transaksi dari generator dataset (tanpa kolom label)"""
+    from generate_dataset import generate
+    transactions = []
+    for chunk in generate(rows, seed):
+        chunk = chunk[['id', 'farm_id', 'description', 'amount', 'type', 'category', 'date']]
+        transactions.extend(chunk.to_dict('records'))
+    return transactions
+
+
+def cold_start(sample, runs):
+    """Proses Python baru sampe skor pertama, per tahap"""
+    code = COLD_START_CODE % (SCRIPT_DIR, repr(sample))
+    results = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True, cwd=SCRIPT_DIR)
+        total = time.perf_counter() - start
+        stages = json.loads(out.stdout.strip().splitlines()[-1])
+        stages['process_total'] = total
+        # Sisanya = start interpreter + import bawaan
+        stages['interpreter'] = total - stages['import'] - stages['load_models'] - stages['first_score']
+        results.append(stages)
+
+    summary = {'runs': runs, 'backend': results[0]['backend'], 'model_error': results[0]['error']}
+    for key in ('process_total', 'interpreter', 'import', 'load_models', 'first_score'):
+        values = [r[key] * 1000 for r in results]
+        summary[key + '_ms'] = {'min': round(min(values), 2), 'median': round(float(np.median(values)), 2)}
+    return summary
+
+
+def stage_latency(transactions, models, batch_sizes, repeat):
+    """Waktu tiap tahap scoring per ukuran batch (best of repeat)"""
+    from predict_anomaly import handle_request
+
+    plan = models['plan']
+    stats = models.get('stats')
+    model = models['model']
+    scaler = models['scaler']
+
+    results = {}
+    for size in batch_sizes:
+        batch = transactions[:size]
+        if len(batch) < size:
+            continue
+        timings = {'features': [], 'scaling': [], 'predict': [], 'serialization': [], 'end_to_end': []}
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            features, _, _, _ = plan.build(batch, stats)
+            t1 = time.perf_counter()
+            scaled = scaler.transform(features)
+            t2 = time.perf_counter()
+            model.predict_proba(scaled)
+            t3 = time.perf_counter()
+            response = handle_request({'transactions': batch}, models)
+            t4 = time.perf_counter()
+            json.dumps(response)
+            t5 = time.perf_counter()
+
+            timings['features'].append(t1 - t0)
+            timings['scaling'].append(t2 - t1)
+            timings['predict'].append(t3 - t2)
+            timings['serialization'].append(t5 - t4)
+            timings['end_to_end'].append(t5 - t3)
+
+        best = {stage: min(values) for stage, values in timings.items()}
+        results[str(size)] = {
+            **{stage + '_ms': round(value * 1000, 4) for stage, value in best.items()},
+            'rows_per_sec': round(size / best['end_to_end'], 1),
+        }
+    return results
+
+
+def single_latency(transactions, models, count):
+    """Latency satu transaksi lewat handle_request + json.dumps (in-process)"""
+    from predict_anomaly import handle_request
+
+    samples = []
+    for tx in transactions[:count]:
+        t = time.perf_counter()
+        json.dumps(handle_request(tx, models))
+        samples.append(time.perf_counter() - t)
+    return percentiles(samples)
+
+
+def _peak_rss_kb(pid):
+    """VmHWM (peak RSS) proses lain dari /proc (Linux only)"""
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        return None
+    return None
+
+
+def serve_latency(transactions, count, batch_size):
+    """
+    Round trip lewat worker predict_anomaly.py --serve (kayak dari Node):
+    waktu siap, latency satu transaksi, satu batch, sama peak RSS worker
+    """
+    env = {**os.environ, 'ANOMALY_CACHE_SIZE': '0'}
+    start = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, os.path.join(SCRIPT_DIR, 'predict_anomaly.py'), '--serve'],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+        text=True, env=env, cwd=SCRIPT_DIR
+    )
+    try:
+        proc.stdout.readline()
+        ready = time.perf_counter() - start
+
+        def call(request_id, payload):
+            t = time.perf_counter()
+            proc.stdin.write(json.dumps({'id': request_id, 'payload': payload}) + '\n')
+            proc.stdin.flush()
+            proc.stdout.readline()
+            return time.perf_counter() - t
+
+        samples = [call(i, tx) for i, tx in enumerate(transactions[:count])]
+        batch = transactions[:batch_size]
+        batch_seconds = min(call(-1, {'transactions': batch}) for _ in range(3))
+        peak = _peak_rss_kb(proc.pid)
+    finally:
+        proc.kill()
+        proc.wait()
+
+    return {
+        'ready_ms': round(ready * 1000, 2),
+        'single': percentiles(samples),
+        'batch_size': len(batch),
+        'batch_ms': round(batch_seconds * 1000, 2),
+        'batch_rows_per_sec': round(len(batch) / batch_seconds, 1),
+        'peak_rss_mb': round(peak / 1024, 1) if peak else None,
+    }
+
+
+def _git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                             text=True, cwd=SCRIPT_DIR, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'numpy': np.__version__}
+    try:
+        import sklearn
+        versions['sklearn'] = sklearn.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+def run(args):
+    from predict_anomaly import load_models
+
+    transactions = load_transactions(args.rows, args.seed)
+    sample = transactions[0]
+
+    result = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'rows': len(transactions),
+            'seed': args.seed,
+            'backend_env': os.environ.get('ANOMALY_BACKEND', 'auto'),
+            **_versions(),
+        },
+        'cold_start': cold_start(sample, args.cold_runs),
+    }
+
+    start = time.perf_counter()
+    models = load_models()
+    load_seconds = time.perf_counter() - start
+    if 'error' in models:
+        raise RuntimeError(f"Model gagal diload: {models['error']}")
+    models['cache'] = None
+
+    result['meta']['backend'] = models['backend']
+    result['load_models_ms'] = round(load_seconds * 1000, 2)
+    result['stages'] = stage_latency(transactions, models, args.batch_sizes, args.repeat)
+    result['single'] = single_latency(transactions, models, args.singles)
+    result['serve'] = serve_latency(transactions, args.singles, max(args.batch_sizes))
+    result['memory'] = {
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+    return result
+
+
+def report(result):
+    cold = result['cold_start']
+    print('=' * 60)
+    print(f"BENCHMARK PIPELINE ({result['meta']['backend']}, commit {result['meta']['commit']})")
+    print('=' * 60)
+    print(f"Cold start (median): total {cold['process_total_ms']['median']} ms = "
+          f"interpreter {cold['interpreter_ms']['median']} + import {cold['import_ms']['median']} + "
+          f"load {cold['load_models_ms']['median']} + skor pertama {cold['first_score_ms']['median']}")
+    print(f"Worker --serve siap: {result['serve']['ready_ms']} ms")
+
+    print('\nPer tahap (ms, best):')
+    print(f"  {'batch':>6} {'fitur':>10} {'scaling':>10} {'predict':>10} {'serial':>10} {'e2e':>10} {'baris/s':>12}")
+    for size, row in result['stages'].items():
+        print(f"  {size:>6} {row['features_ms']:>10.3f} {row['scaling_ms']:>10.3f} {row['predict_ms']:>10.3f} "
+              f"{row['serialization_ms']:>10.3f} {row['end_to_end_ms']:>10.3f} {row['rows_per_sec']:>12,.0f}")
+
+    for label, single in (('in-process', result['single']), ('lewat --serve', result['serve']['single'])):
+        print(f"\nSatu transaksi {label}: p50 {single['p50_ms']} ms, p95 {single['p95_ms']} ms, "
+              f"p99 {single['p99_ms']} ms")
+    print(f"\nPeak RSS: benchmark {result['memory']['peak_rss_mb']} MB, "
+          f"worker --serve {result['serve']['peak_rss_mb']} MB")
+
+
+def compare(result, baseline):
+    """Selisih angka penting vs hasil lama (positif = lebih lambat/gede)"""
+    def delta(new, old):
+        if not old:
+            return 'n/a'
+        return f'{(new - old) / old * 100:+.1f}%'
+
+    print('\n' + '=' * 60)
+    print(f"VS {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')})")
+    print('=' * 60)
+    rows = [
+        ('cold start', result['cold_start']['process_total_ms']['median'],
+         baseline['cold_start']['process_total_ms']['median']),
+        ('single p50', result['single']['p50_ms'], baseline['single']['p50_ms']),
+        ('single p99', result['single']['p99_ms'], baseline['single']['p99_ms']),
+        ('serve p50', result['serve']['single']['p50_ms'], baseline['serve']['single']['p50_ms']),
+        ('peak RSS', result['memory']['peak_rss_mb'], baseline['memory']['peak_rss_mb']),
+    ]
+    for size, row in result['stages'].items():
+        old = baseline['stages'].get(size)
+        if old:
+            rows.append((f'batch {size} e2e', row['end_to_end_ms'], old['end_to_end_ms']))
+    for name, new, old in rows:
+        print(f'  {name:<18} {old:>12} -> {new:<12} {delta(new, old)}')
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Benchmark pipeline skor anomali')
+    parser.add_argument('--rows', type=int, default=20000, help='ukuran dataset generate')
+    parser.add_argument('--seed', type=int, default=43)
+    parser.add_argument('--batch-sizes', default=','.join(map(str, DEFAULT_BATCH_SIZES)),
+                        help='ukuran batch dipisah koma')
+    parser.add_argument('--singles', type=int, default=500, help='jumlah sampel latency satu transaksi')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--cold-runs', type=int, default=3)
+    parser.add_argument('--output', help='simpen hasil JSON ke file ini')
+    parser.add_argument('--compare', help='hasil JSON lama buat dibandingin')
+    args = parser.parse_args()
+    args.batch_sizes = [int(size) for size in args.batch_sizes.split(',') if size]
+    return args
+
+
+def main():
+    args = parse_args()
+    result = run(args)
+    report(result)
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            compare(result, json.load(f))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=2)
+        print(f'\n✓ Hasil disimpen ke {args.output}')
+
+
+if __name__ == '__main__':
+    main()
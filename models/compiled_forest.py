@@ -0,0 +1,422 @@
+#!/usr/bin/env python3
+"""
+Versi "compiled" RandomForest + scaler + label encoder dalam bentuk array numpy.
+
+Import sklearn + unpickle forest itu yang bikin cold start lama, padahal buat
+inferensi cukup array node (feature, threshold, left, right, value). Di sini
+semua artifact joblib diexport ke folder forest/ (satu .npy per array, udah
+dalam layout flat yang siap pakai), terus dievaluasi pake numpy doang - semua
+tree buat satu batch dijalanin bareng sekali jalan.
+
+File .npy-nya ga dikompres dan diload pake mmap read-only, jadi kalo ada
+beberapa worker scoring di satu host, semuanya baca page memori fisik yang
+sama - ga ada copy forest per worker.
+
+    python compiled_forest.py export   # joblib -> forest/ (butuh sklearn)
+    python compiled_forest.py check    # bandingin hasil sama sklearn
+    python compiled_forest.py bench    # cold start & latency per baris
+    python compiled_forest.py memory   # RSS/PSS per worker, sklearn vs compiled
+"""
+
+import sys
+import os
+import json
+import time
+import shutil
+import hashlib
+import subprocess
+
+import numpy as np
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+COMPILED_PATH = os.path.join(SCRIPT_DIR, 'forest')
+SOURCE_FILES = [
+    'anomaly_detector_rf.joblib',
+    'scaler.joblib',
+    'le_category.joblib',
+    'le_farm.joblib',
+    'le_type.joblib',
+]
+# Biar batch gede ga makan memori (baris x tree) kebanyakan
+CHUNK_ROWS = 4096
+
+
+def source_signature(model_dir=SCRIPT_DIR):
+    """Hash artifact joblib - buat ngecek forest/ masih sinkron apa ngga"""
+    digest = hashlib.sha1()
+    for name in SOURCE_FILES:
+        with open(os.path.join(model_dir, name), 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+class CompiledForest:
+    """Pengganti RandomForestClassifier.predict_proba pake array numpy"""
+
+    def __init__(self, roots, feature, threshold, left, right, value, max_depth, classes):
+        # Semua tree udah digabung jadi array flat, anak-anaknya pake index global.
+        # Array-nya dipake langsung (ga dicopy) biar mmap-nya tetep kebagi antar proses
+        self.roots = roots
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.max_depth = int(max_depth)
+        self.classes_ = classes
+        self.n_estimators = len(roots)
+
+    def predict_proba(self, X):
+        # sklearn ngebandingin fitur dalam float32, jadi ikutin biar hasilnya sama
+        X = np.asarray(X, dtype=np.float32).astype(np.float64)
+        if len(X) <= CHUNK_ROWS:
+            return self._predict_chunk(X)
+        return np.vstack([
+            self._predict_chunk(X[start:start + CHUNK_ROWS])
+            for start in range(0, len(X), CHUNK_ROWS)
+        ])
+
+    def _predict_chunk(self, X):
+        n, n_features = X.shape
+        flat_X = X.ravel()
+        row_offsets = (np.arange(n) * n_features)[:, None]
+        nodes = np.broadcast_to(self.roots, (n, self.n_estimators))
+
+        # Leaf nunjuk ke dirinya sendiri, jadi cukup jalan sedalam tree terdalam
+        for _ in range(self.max_depth):
+            values = flat_X.take(row_offsets + self.feature.take(nodes))
+            go_left = values <= self.threshold.take(nodes)
+            nodes = np.where(go_left, self.left.take(nodes), self.right.take(nodes))
+
+        return self.value[nodes].mean(axis=1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+class CompiledScaler:
+    """Pengganti StandardScaler.transform"""
+
+    def __init__(self, mean, scale):
+        self.mean_ = mean
+        self.scale_ = scale
+
+    def transform(self, X):
+        return (np.asarray(X, dtype=np.float64) - self.mean_) / self.scale_
+
+
+class CompiledLabelEncoder:
+    """Pengganti LabelEncoder.transform - lookup dict, error kalo label baru"""
+
+    def __init__(self, classes):
+        self.classes_ = np.asarray(classes)
+        self.index = {c: i for i, c in enumerate(classes)}
+
+    def transform(self, values):
+        try:
+            return np.array([self.index[v] for v in values], dtype=np.int64)
+        except (KeyError, TypeError):
+            raise ValueError(f'y contains previously unseen labels: {values}')
+
+
+def export(model_dir=SCRIPT_DIR, output_path=COMPILED_PATH):
+    """Ubah artifact joblib jadi array-array flat di folder forest/"""
+    import joblib
+
+    model = joblib.load(os.path.join(model_dir, 'anomaly_detector_rf.joblib'))
+    scaler = joblib.load(os.path.join(model_dir, 'scaler.joblib'))
+    encoders = {
+        name: joblib.load(os.path.join(model_dir, f'le_{name}.joblib'))
+        for name in ('category', 'farm', 'type')
+    }
+
+    trees = [est.tree_ for est in model.estimators_]
+    n_trees = len(trees)
+    n_nodes = max(t.node_count for t in trees)
+    n_classes = len(model.classes_)
+
+    feature = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    threshold = np.full((n_trees, n_nodes), np.inf)
+    left = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    right = np.zeros((n_trees, n_nodes), dtype=np.int32)
+    value = np.zeros((n_trees, n_nodes, n_classes))
+
+    for i, t in enumerate(trees):
+        count = t.node_count
+        is_leaf = t.children_left == -1
+        own = np.arange(count)
+
+        feature[i, :count] = np.where(is_leaf, 0, t.feature)
+        threshold[i, :count] = np.where(is_leaf, np.inf, t.threshold)
+        left[i, :count] = np.where(is_leaf, own, t.children_left)
+        right[i, :count] = np.where(is_leaf, own, t.children_right)
+
+        # Normalisasi kayak DecisionTreeClassifier.predict_proba
+        proba = t.value[:, 0, :n_classes]
+        normalizer = proba.sum(axis=1, keepdims=True)
+        normalizer[normalizer == 0.0] = 1.0
+        value[i, :count] = proba / normalizer
+
+    n_features = scaler.mean_.shape[0]
+    mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+    scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+
+    # Gabung semua tree jadi array flat dengan index node global,
+    # disimpen udah dalam bentuk final biar pas load ga perlu diolah lagi
+    offsets = (np.arange(n_trees) * n_nodes)[:, None]
+    arrays = {
+        'roots': offsets.ravel().astype(np.int64),
+        'feature': feature.ravel().astype(np.int64),
+        'threshold': threshold.ravel(),
+        'left': (left + offsets).ravel().astype(np.int64),
+        'right': (right + offsets).ravel().astype(np.int64),
+        'value': value.reshape(-1, n_classes),
+        'classes': np.asarray(model.classes_),
+        'scaler_mean': np.asarray(mean, dtype=np.float64),
+        'scaler_scale': np.asarray(scale, dtype=np.float64),
+    }
+    meta = {
+        'source_signature': source_signature(model_dir),
+        'max_depth': int(max(t.max_depth for t in trees)),
+        'category_classes': [str(c) for c in encoders['category'].classes_],
+        'farm_classes': [str(c) for c in encoders['farm'].classes_],
+        'type_classes': [str(c) for c in encoders['type'].classes_],
+    }
+
+    # Tulis ke folder sementara dulu, baru dituker, biar worker yang lagi
+    # jalan ga kebaca setengah jadi
+    tmp_path = output_path + '.tmp'
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    for name, array in arrays.items():
+        np.save(os.path.join(tmp_path, f'{name}.npy'), np.ascontiguousarray(array))
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(meta, f, indent=2)
+
+    old_path = output_path + '.old'
+    shutil.rmtree(old_path, ignore_errors=True)
+    if os.path.exists(output_path):
+        os.rename(output_path, old_path)
+    os.rename(tmp_path, output_path)
+    shutil.rmtree(old_path, ignore_errors=True)
+    return output_path
+
+
+def load_compiled(path=COMPILED_PATH, model_dir=SCRIPT_DIR, mmap=True):
+    """
+    Load forest/ jadi objek yang interface-nya sama kayak artifact sklearn.
+    Array diload pake mmap read-only (kecuali mmap=False).
+    Balikin None kalo foldernya ga ada atau udah ga sinkron sama joblib-nya.
+    """
+    meta_path = os.path.join(path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+
+    with open(meta_path, 'r') as f:
+        meta = json.load(f)
+    if meta['source_signature'] != source_signature(model_dir):
+        return None
+
+    mmap_mode = 'r' if mmap else None
+
+    def array(name):
+        return np.load(os.path.join(path, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+
+    return {
+        'model': CompiledForest(
+            array('roots'),
+            array('feature'),
+            array('threshold'),
+            array('left'),
+            array('right'),
+            array('value'),
+            meta['max_depth'],
+            array('classes')
+        ),
+        'scaler': CompiledScaler(array('scaler_mean'), array('scaler_scale')),
+        'le_category': CompiledLabelEncoder(meta['category_classes']),
+        'le_farm': CompiledLabelEncoder(meta['farm_classes']),
+        'le_type': CompiledLabelEncoder(meta['type_classes']),
+    }
+
+
+def _sample_features(n=None):
+    """Matriks fitur dari dataset generate buat check & bench"""
+    sys.path.insert(0, SCRIPT_DIR)
+    from predict_anomaly import engineer_features_batch, load_models
+
+    dataset = os.path.join(SCRIPT_DIR, '..', 'scripts', 'kandang_anomaly_dataset_sep2025_jan2026.json')
+    with open(dataset, 'r', encoding='utf-8') as f:
+        transactions = json.load(f)['transactions'][:n]
+
+    models = load_models()
+    features, _, _ = engineer_features_batch(
+        transactions, models['config'], models['le_category'], models['le_type'], models.get('stats')
+    )
+    return features
+
+
+def check():
+    """Bandingin output compiled vs sklearn"""
+    import joblib
+
+    X = _sample_features()
+    compiled = load_compiled()
+    if compiled is None:
+        print('✗ forest/ ga ada / ga sinkron, jalanin export dulu')
+        sys.exit(1)
+
+    model = joblib.load(os.path.join(SCRIPT_DIR, 'anomaly_detector_rf.joblib'))
+    scaler = joblib.load(os.path.join(SCRIPT_DIR, 'scaler.joblib'))
+
+    X_sk = scaler.transform(X)
+    X_np = compiled['scaler'].transform(X)
+    proba_sk = model.predict_proba(X_sk)
+    proba_np = compiled['model'].predict_proba(X_np)
+
+    max_diff = float(np.abs(proba_sk - proba_np).max())
+    same_label = bool((model.predict(X_sk) == compiled['model'].predict(X_np)).all())
+    print(f'Baris: {len(X)}')
+    print(f'Selisih proba maksimum: {max_diff:.2e}')
+    print(f'Label sama semua: {same_label}')
+    if max_diff > 1e-9 or not same_label:
+        sys.exit(1)
+
+
+def _cold_start(backend):
+    """Waktu proses baru dari nol sampe model siap dipake"""
+    code = (
+        'import sys; sys.path.insert(0, %r)\n'
+        'import time; t = time.perf_counter()\n' % SCRIPT_DIR
+    )
+    if backend == 'sklearn':
+        code += (
+            'import joblib, os\n'
+            'for n in %r: joblib.load(os.path.join(%r, n))\n' % (SOURCE_FILES, SCRIPT_DIR)
+        )
+    else:
+        code += 'from compiled_forest import load_compiled; load_compiled()\n'
+    code += 'print(time.perf_counter() - t)'
+
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    total = time.perf_counter() - start
+    return total, float(out.stdout.strip())
+
+
+def bench(repeat=5):
+    """Benchmark cold start dan latency per baris sklearn vs compiled"""
+    import joblib
+
+    X = _sample_features()
+    compiled = load_compiled()
+    if compiled is None:
+        print('✗ forest/ ga ada / ga sinkron, jalanin export dulu')
+        sys.exit(1)
+
+    model = joblib.load(os.path.join(SCRIPT_DIR, 'anomaly_detector_rf.joblib'))
+    scaler = joblib.load(os.path.join(SCRIPT_DIR, 'scaler.joblib'))
+    backends = {
+        'sklearn': (scaler, model),
+        'compiled': (compiled['scaler'], compiled['model']),
+    }
+
+    print('=' * 60)
+    print('BENCHMARK sklearn vs compiled forest')
+    print('=' * 60)
+    for name, (sc, mdl) in backends.items():
+        cold = [_cold_start(name) for _ in range(repeat)]
+        process_total = min(c[0] for c in cold)
+        load_only = min(c[1] for c in cold)
+
+        single = []
+        for row in X[:200]:
+            t = time.perf_counter()
+            mdl.predict_proba(sc.transform(row.reshape(1, -1)))
+            single.append(time.perf_counter() - t)
+
+        t = time.perf_counter()
+        mdl.predict_proba(sc.transform(X))
+        batch = time.perf_counter() - t
+
+        print(f'\n{name}')
+        print(f'  Cold start (proses baru): {process_total * 1000:8.1f} ms')
+        print(f'  Load artifact doang     : {load_only * 1000:8.1f} ms')
+        print(f'  1 baris (median)        : {np.median(single) * 1000:8.3f} ms')
+        print(f'  Batch {len(X)} baris      : {batch * 1000:8.1f} ms '
+              f'({batch / len(X) * 1e6:.1f} us/baris)')
+
+
+def _memory_kb(pid):
+    """Rss & Pss (KB) satu proses dari /proc - Pss udah ngitung page yang kebagi"""
+    usage = {}
+    with open(f'/proc/{pid}/smaps_rollup', 'r') as f:
+        for line in f:
+            key, _, rest = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                usage[key] = int(rest.split()[0])
+    return usage
+
+
+def memory(workers=4):
+    """
+    Nyalain N worker predict_anomaly.py --serve per backend, skor satu batch
+    biar artifact-nya kesentuh semua, terus ukur memori tiap worker (Linux only)
+    """
+    dataset = os.path.join(SCRIPT_DIR, '..', 'scripts', 'kandang_anomaly_dataset_sep2025_jan2026.json')
+    with open(dataset, 'r', encoding='utf-8') as f:
+        transactions = json.load(f)['transactions']
+    request = json.dumps({'id': 1, 'payload': {'transactions': transactions}}) + '\n'
+
+    print('=' * 60)
+    print(f'MEMORI PER WORKER ({workers} worker)')
+    print('=' * 60)
+    for backend in ('sklearn', 'compiled'):
+        env = {**os.environ, 'ANOMALY_BACKEND': backend}
+        procs = [
+            subprocess.Popen(
+                [sys.executable, os.path.join(SCRIPT_DIR, 'predict_anomaly.py'), '--serve'],
+                stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                text=True, env=env
+            )
+            for _ in range(workers)
+        ]
+        try:
+            for proc in procs:
+                proc.stdout.readline()  # sinyal siap
+                proc.stdin.write(request)
+                proc.stdin.flush()
+                proc.stdout.readline()
+            usage = [_memory_kb(proc.pid) for proc in procs]
+        finally:
+            for proc in procs:
+                proc.kill()
+                proc.wait()
+
+        rss = sum(u['Rss'] for u in usage)
+        pss = sum(u['Pss'] for u in usage)
+        print(f'\n{backend}')
+        print(f'  RSS per worker : {rss / workers / 1024:8.1f} MB')
+        print(f'  PSS per worker : {pss / workers / 1024:8.1f} MB')
+        print(f'  Total PSS      : {pss / 1024:8.1f} MB')
+
+
+def main():
+    command = sys.argv[1] if len(sys.argv) > 1 else ''
+    if command == 'export':
+        path = export()
+        size = sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+        print(f'✓ Forest diexport ke {path} ({size / 1024:.0f} KB)')
+    elif command == 'check':
+        check()
+    elif command == 'bench':
+        bench()
+    elif command == 'memory':
+        memory(int(sys.argv[2]) if len(sys.argv) > 2 else 4)
+    else:
+        print('Pake: python compiled_forest.py export|check|bench|memory [workers]')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
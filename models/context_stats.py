@@ -0,0 +1,570 @@
+#!/usr/bin/env python3
+"""
+Statistik historis buat fitur konteks model anomali.
+
+Fitur kayak amount_zscore_category, amount_to_category_median, dll
+di notebook diitung dari seluruh dataset pake groupby. Pas serving kita
+ga mau scan ulang history tiap request, jadi statistiknya disimpen
+incremental di sini - update O(1) per transaksi, terus disimpen ke file
+JSON biar kebawa antar run.
+
+Beberapa worker --serve (pool Node, ANOMALY_WORKERS) bisa update_stats
+barengan, jadi update ga nulis ulang file JSON-nya (O(history) per request,
+plus worker terakhir yang nulis ngebuang update worker lain). Tiap update
+ditambahin ke log append-only di sebelahnya (context_stats.json.log, satu
+baris per transaksi, dikunci pake context_stats.json.lock), dan tiap worker
+ngejar log itu sebelum ngeskor (sync - cuma stat kalo ga ada yang baru).
+Tiap ANOMALY_STATS_COMPACT_LINES baris log dipadetin jadi snapshot baru
+(generasi baru, log-nya mulai kosong lagi).
+
+Build ulang dari data history:
+    python context_stats.py build ../scripts/kandang_anomaly_dataset_sep2025_jan2026.json
+"""
+
+import sys
+import os
+import json
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows
+    fcntl = None
+    import msvcrt
+
+import numpy as np
+import pandas as pd
+
+from duplicate_index import DuplicateIndex, identity
+from time_features import FARM_TZ, calendar_features, epoch_ms, invalid_message
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_STATS_PATH = os.environ.get(
+    'ANOMALY_STATS_PATH', os.path.join(SCRIPT_DIR, 'context_stats.json')
+)
+
+# Simpen hitungan harian cuma buat sekian hari terakhir
+DAILY_RETENTION_DAYS = 62
+# Log update dipadetin jadi snapshot tiap sekian baris
+COMPACT_LINES = int(os.environ.get('ANOMALY_STATS_COMPACT_LINES', 1000))
+LOG_SUFFIX = '.log'
+
+
+@contextmanager
+def _locked(path):
+    """Lock antar proses (file path + '.lock') selama nulis snapshot / log"""
+    with open(path + '.lock', 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _write_atomic(path, text):
+    """Tulis ke file sementara per proses dulu baru rename"""
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class RunningStats:
+    """Mean & variance jalan (algoritma Welford)"""
+
+    def __init__(self, n=0, mean=0.0, m2=0.0):
+        self.n = n
+        self.mean = mean
+        self.m2 = m2
+
+    def update(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+
+    @property
+    def std(self):
+        # ddof=1 biar sama kayak pandas .std() di notebook
+        if self.n < 2:
+            return 0.0
+        return math.sqrt(self.m2 / (self.n - 1))
+
+    def zscore(self, x):
+        if self.n < 2:
+            return 0.0
+        return (x - self.mean) / (self.std + 1e-10)
+
+    def merge(self, other):
+        """Gabungin statistik lain ke sini (rumus paralel Chan), hasilnya sama kayak update satu-satu"""
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        return self
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['n'], d['mean'], d['m2'])
+
+
+class StreamingQuantile:
+    """
+    Estimasi kuantil tanpa nyimpen semua data (algoritma P-square, Jain & Chlamtac).
+    Cuma 5 marker, update O(1). Di bawah 5 data masih diitung pas.
+    """
+
+    def __init__(self, p=0.5):
+        self.p = p
+        self.heights = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * p, 1 + 4 * p, 3 + 2 * p, 5]
+        self.increments = [0, p / 2, p, (1 + p) / 2, 1]
+
+    def update(self, x):
+        q = self.heights
+        if len(q) < 5:
+            q.append(x)
+            q.sort()
+            return
+
+        # Cari sel tempat x jatuh, geser marker ujung kalo perlu
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        for i in range(k + 1, 5):
+            self.positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Betulin tinggi marker tengah pake interpolasi parabolik
+        n = self.positions
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                candidate = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                    (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+                )
+                if not q[i - 1] < candidate < q[i + 1]:
+                    # Parabolik keluar jalur, pake linear aja
+                    candidate = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = candidate
+                n[i] += d
+
+    def value(self):
+        q = self.heights
+        if not q:
+            return None
+        if len(q) < 5:
+            # Masih dikit, itung kuantil pas (interpolasi linear kayak pandas)
+            pos = (len(q) - 1) * self.p
+            lo = int(math.floor(pos))
+            hi = min(lo + 1, len(q) - 1)
+            return q[lo] + (q[hi] - q[lo]) * (pos - lo)
+        return q[2]
+
+    def to_dict(self):
+        return {
+            'p': self.p,
+            'heights': self.heights,
+            'positions': self.positions,
+            'desired': self.desired
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        sketch = cls(d['p'])
+        sketch.heights = d['heights']
+        sketch.positions = d['positions']
+        sketch.desired = d['desired']
+        return sketch
+
+
+def _with_row(amounts, n, mean, std):
+    """
+    (n, mean, std) history + satu nilai amount per baris, rumus update
+    RunningStats tapi per kolom. Amount yang bukan angka ga ditambahin.
+    """
+    finite = np.isfinite(amounts)
+    x = np.where(finite, amounts, mean)
+    m2 = np.where(n >= 2, std * std * (n - 1), 0.0)
+    n_new = n + 1
+    delta = x - mean
+    mean_new = mean + delta / n_new
+    m2_new = m2 + delta * (x - mean_new)
+    std_new = np.sqrt(np.maximum(m2_new, 0.0) / np.maximum(n, 1))
+    std_new = np.where(n_new >= 2, std_new, 0.0)
+    return (
+        np.where(finite, n_new, n),
+        np.where(finite, mean_new, mean),
+        np.where(finite, std_new, std),
+    )
+
+
+class ContextStatsStore:
+    """Statistik per kategori, per kandang, per hari, plus indeks duplikat"""
+
+    def __init__(self):
+        self.total = 0
+        self.category_stats = {}
+        self.category_median = {}
+        self.farm_stats = {}
+        self.daily_counts = {}
+        self.duplicates = DuplicateIndex()
+        self.dirty = False
+        # File yang ditempelin (load), generasi snapshot-nya, posisi baca log
+        self.path = None
+        self.generation = None
+        self.log_inode = None
+        self.log_offset = 0
+        self.log_lines = 0
+        self.rejected_lines = 0
+
+    def observe(self, farm_id, category, amount, day, date_ms, tx_type='expense', tx_id=None):
+        """Masukin satu transaksi ke statistik - O(1). tx_id buat bedain dobel vs dirinya sendiri"""
+        self.total += 1
+        self.category_stats.setdefault(category, RunningStats()).update(amount)
+        self.category_median.setdefault(category, StreamingQuantile(0.5)).update(amount)
+        self.farm_stats.setdefault(farm_id, RunningStats()).update(amount)
+
+        day_key = f'{farm_id}|{day}'
+        self.daily_counts[day_key] = self.daily_counts.get(day_key, 0) + 1
+
+        self.duplicates.add(
+            self.duplicates.key(farm_id, category, tx_type, amount), date_ms, identity(tx_id, date_ms)
+        )
+
+        self.dirty = True
+
+    def prune_daily(self):
+        """Buang hitungan harian yang udah lewat masa simpen"""
+        if not self.daily_counts:
+            return
+        days = [k.rsplit('|', 1)[1] for k in self.daily_counts]
+        newest = datetime.strptime(max(days), '%Y-%m-%d')
+        self.daily_counts = {
+            k: v for k, v in self.daily_counts.items()
+            if (newest - datetime.strptime(k.rsplit('|', 1)[1], '%Y-%m-%d')).days <= DAILY_RETENTION_DAYS
+        }
+
+    def lookup(self, categories, farm_ids, days, amounts):
+        """
+        Statistik grup buat tiap baris (array numpy), read-only - dipake
+        FeaturePlan.build. Rumus fiturnya ada di feature_plan.py, di sini
+        cuma n/mean/std/median per kategori & kandang, frekuensi kategori,
+        sama jumlah transaksi harian. Transaksinya sendiri dianggep ikut
+        diitung (kayak groupby di frame_context pas training): n, mean & std
+        = history + transaksi itu (rumus Welford per baris), frekuensi &
+        hitungan harian +1. Median cuma dari history (sketch P-square ga
+        bisa ditambahin satu nilai tanpa ngubah isinya). Kalo history
+        kosong hasilnya sama kayak nilai placeholder lama.
+        """
+        category_codes, category_values = pd.factorize(pd.Series(categories, dtype=object), use_na_sentinel=False)
+        category_rows = []
+        for category in category_values:
+            cat_stats = self.category_stats.get(category)
+            median = self.category_median.get(category)
+            median = median.value() if median else None
+            n = cat_stats.n if cat_stats else 0
+            category_rows.append((
+                n,
+                cat_stats.mean if cat_stats else 0.0,
+                cat_stats.std if cat_stats else 0.0,
+                median if median is not None else np.nan,
+                (n + 1) / (self.total + 1) if cat_stats and self.total else 0.1,
+            ))
+        category_table = np.array(category_rows, dtype=np.float64).reshape(-1, 5)[category_codes]
+
+        farm_codes, farm_values = pd.factorize(pd.Series(farm_ids, dtype=object), use_na_sentinel=False)
+        farm_rows = []
+        for farm_id in farm_values:
+            farm_stats = self.farm_stats.get(farm_id)
+            farm_rows.append((farm_stats.n, farm_stats.mean, farm_stats.std) if farm_stats else (0, 0.0, 0.0))
+        farm_table = np.array(farm_rows, dtype=np.float64).reshape(-1, 3)[farm_codes]
+
+        day_keys = pd.Series(farm_ids, dtype=object).astype(str) + '|' + pd.Series(days, dtype=object)
+        day_codes, day_values = pd.factorize(day_keys)
+        daily = np.array([self.daily_counts.get(k, 0) + 1 for k in day_values], dtype=np.float64)[day_codes]
+
+        amounts = np.asarray(amounts, dtype=np.float64)
+        category_n, category_mean, category_std = _with_row(amounts, *category_table[:, :3].T)
+        farm_n, farm_mean, farm_std = _with_row(amounts, *farm_table.T)
+        return {
+            'category_n': category_n,
+            'category_mean': category_mean,
+            'category_std': category_std,
+            'category_median': category_table[:, 3],
+            'category_frequency': category_table[:, 4],
+            'farm_n': farm_n,
+            'farm_mean': farm_mean,
+            'farm_std': farm_std,
+            'daily_transaction_count': daily,
+        }
+
+    def to_dict(self):
+        return {
+            'version': 2,
+            'total': self.total,
+            'categories': {
+                # Median bisa belum ada kalo statistiknya diisi dari rollup cube
+                c: {'stats': s.to_dict(), 'median': self.category_median[c].to_dict() if c in self.category_median else None}
+                for c, s in self.category_stats.items()
+            },
+            'farms': {f: s.to_dict() for f, s in self.farm_stats.items()},
+            'daily_counts': self.daily_counts,
+            'duplicates': self.duplicates.to_dict()
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        store = cls()
+        store.total = d.get('total', 0)
+        for c, entry in d.get('categories', {}).items():
+            store.category_stats[c] = RunningStats.from_dict(entry['stats'])
+            if entry.get('median'):
+                store.category_median[c] = StreamingQuantile.from_dict(entry['median'])
+        for f, entry in d.get('farms', {}).items():
+            store.farm_stats[f] = RunningStats.from_dict(entry)
+        store.daily_counts = d.get('daily_counts', {})
+        # Versi 1 nyimpen kunci tanggal persis (recent_keys), ga bisa dipake lagi
+        store.duplicates = DuplicateIndex.from_dict(d.get('duplicates', {}))
+        return store
+
+    def save(self, path=DEFAULT_STATS_PATH):
+        """
+        Simpen snapshot penuh (build / rollup_cube context) - NIMPA isi file
+        termasuk update di log-nya, worker yang nempel baca ulang snapshot ini
+        """
+        with _locked(path):
+            self._write_snapshot(path)
+
+    def _write_snapshot(self, path):
+        """Snapshot + log kosong generasi baru (lock-nya udah dipegang)"""
+        self.prune_daily()
+        generation = f'{time.time_ns()}-{os.getpid()}'
+        data = self.to_dict()
+        data['generation'] = generation
+        # Snapshot dulu baru log: yang liat log generasi baru pasti dapet snapshot-nya juga
+        _write_atomic(path, json.dumps(data, ensure_ascii=False))
+        header = json.dumps({'generation': generation}) + '\n'
+        _write_atomic(path + LOG_SUFFIX, header)
+        self.path = path
+        self.generation = generation
+        self.log_inode = os.stat(path + LOG_SUFFIX).st_ino
+        self.log_offset = len(header.encode('utf-8'))
+        self.log_lines = 0
+        self.dirty = False
+
+    @classmethod
+    def read(cls, path=DEFAULT_STATS_PATH):
+        """Snapshot doang (tanpa log), kalo belum ada mulai dari kosong"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        store = cls.from_dict(data)
+        store.generation = data.get('generation')
+        return store
+
+    @classmethod
+    def load(cls, path=DEFAULT_STATS_PATH):
+        """Load snapshot + update di log-nya, terus nempel ke file itu (sync / append)"""
+        store = cls.read(path)
+        store.path = path
+        store.sync()
+        return store
+
+    def _reload(self):
+        fresh = self.read(self.path)
+        fresh.path = self.path
+        self.__dict__.update(fresh.__dict__)
+
+    def sync(self):
+        """
+        Kejar update dari proses lain di log. Kalo ga ada yang baru cuma
+        open + fstat. Balikin jumlah transaksi yang masuk.
+        """
+        if self.path is None:
+            return 0
+        try:
+            f = open(self.path + LOG_SUFFIX, 'rb')
+        except FileNotFoundError:
+            # Snapshot lama (belum ada log) / belum pernah disimpen
+            return 0
+        with f:
+            info = os.fstat(f.fileno())
+            if info.st_ino != self.log_inode:
+                # Udah dipadetin (generasi baru): mulai dari snapshot-nya
+                try:
+                    generation = json.loads(f.readline())['generation']
+                except (ValueError, KeyError, TypeError):
+                    return 0
+                if generation != self.generation:
+                    self._reload()
+                    if generation != self.generation:
+                        # Snapshot & log-nya lagi diganti proses lain, coba lagi nanti
+                        return 0
+                self.log_inode = info.st_ino
+                self.log_offset = f.tell()
+                self.log_lines = 0
+            if info.st_size <= self.log_offset:
+                return 0
+            f.seek(self.log_offset)
+            chunk = f.read(info.st_size - self.log_offset)
+        # Baris terakhir yang belum kelar ditulis ditinggal dulu
+        end = chunk.rfind(b'\n') + 1
+        observed = 0
+        for line in chunk[:end].splitlines(keepends=True):
+            # Offset maju per baris: baris rusak ga bikin yang sebelumnya kebaca dua kali
+            self.log_offset += len(line)
+            self.log_lines += 1
+            try:
+                row = json.loads(line)
+                error = row_error(row)
+            except ValueError as e:
+                error = str(e)
+            if error is not None:
+                # Dilewatin (ilang sendiri pas dipadetin), jangan sampe semua request ikut gagal
+                self.rejected_lines += 1
+                sys.stderr.write(f'context_stats: baris log dilewatin ({error}): {line[:200]!r}\n')
+                continue
+            self.observe(*row)
+            observed += 1
+        return observed
+
+    def append(self, transactions, tz=FARM_TZ):
+        """
+        Transaksi baru masuk statistik (update_stats). Kalo nempel ke file,
+        ditulis ke log (O(transaksi), bukan nulis ulang semua) terus dikejar
+        lewat sync, jadi update worker lain ga ilang. Tiap COMPACT_LINES
+        baris log dipadetin jadi snapshot.
+        """
+        rows = observed_rows(transactions, tz)
+        if self.path is None:
+            for row in rows:
+                self.observe(*row)
+            return
+        lines = ''.join(json.dumps(row, ensure_ascii=False) + '\n' for row in rows)
+        with _locked(self.path):
+            self.sync()
+            if self.log_inode is None:
+                # Belum ada log (file lama / belum pernah disimpen)
+                self._write_snapshot(self.path)
+            with open(self.path + LOG_SUFFIX, 'a', encoding='utf-8') as f:
+                f.write(lines)
+            self.sync()
+            if self.log_lines >= COMPACT_LINES:
+                self._write_snapshot(self.path)
+
+
+def row_error(row):
+    """
+    Cek satu baris argumen observe (baris log) sebelum masuk statistik -
+    aturannya sama kayak FeaturePlan.build + jumlahnya harus angka biasa
+    (bukan NaN/inf/negatif, duplicate_key ga bisa bulet-in NaN). Balikin
+    pesan error, None kalo aman.
+    """
+    if not isinstance(row, (list, tuple)) or len(row) != 7:
+        return 'bukan baris statistik'
+    farm_id, category, amount, day, date_ms, tx_type, tx_id = row
+    for name, value in (('farm_id', farm_id), ('category', category), ('type', tx_type), ('day', day)):
+        if not isinstance(value, str):
+            return f'{name} harus string, dapetnya {type(value).__name__}'
+    if isinstance(amount, bool) or not isinstance(amount, (int, float)) or not math.isfinite(amount) or amount < 0:
+        return f'amount ga valid: {amount!r}'
+    _, valid = epoch_ms([date_ms])
+    if not valid[0] or not float(date_ms).is_integer():
+        return invalid_message(date_ms)
+    if tx_id is not None and (isinstance(tx_id, bool) or not isinstance(tx_id, (str, int, float))):
+        return f'id ga valid: {tx_id!r}'
+    return None
+
+
+def observed_rows(transactions, tz=FARM_TZ):
+    """
+    Argumen ContextStatsStore.observe per transaksi, urut tanggal biar
+    hitungan harian rapi (ini juga format baris log). Tanggal di-decode
+    sekali jalan di zona waktu kandang, sama kayak FeaturePlan. Yang ga
+    lolos row_error (tanggal ga valid, amount NaN, kategori list, ...)
+    dilewatin - jangan sampe nyangkut di log terus bikin gagal yang replay.
+    """
+    transactions = list(transactions)
+    dates = [tx.get('date', 0) for tx in transactions]
+    times = calendar_features(dates, tz)
+    order = np.flatnonzero(times['valid'])
+    ms, _ = epoch_ms(dates)
+    order = order[np.argsort(ms[order], kind='stable')]
+    rows = []
+    for i in order.tolist():
+        tx = transactions[i]
+        try:
+            amount = float(tx.get('amount', 0))
+        except (TypeError, ValueError):
+            continue
+        row = (
+            tx.get('farm_id', tx.get('kandang', 'KANDANG1')),
+            tx.get('category', 'Lain-lain'),
+            amount,
+            str(times['day'][i]),
+            dates[i],
+            tx.get('type', 'expense'),
+            tx.get('id')
+        )
+        if row_error(row) is None:
+            rows.append(row)
+    return rows
+
+
+def observe_transactions(store, transactions, tz=FARM_TZ):
+    """Masukin banyak transaksi ke statistik di memori (build, bench)"""
+    for row in observed_rows(transactions, tz):
+        store.observe(*row)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != 'build':
+        print('Pake: python context_stats.py build <dataset.json> [output.json]')
+        sys.exit(1)
+
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    output_path = sys.argv[3] if len(sys.argv) > 3 else DEFAULT_STATS_PATH
+
+    store = ContextStatsStore()
+    observe_transactions(store, data.get('transactions', []))
+    store.save(output_path)
+
+    print(f'✓ {store.total} transaksi masuk statistik')
+    print(f'✓ Disimpen ke {output_path}')
+
+
+if __name__ == '__main__':
+    main()
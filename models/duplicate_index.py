@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Deteksi transaksi dobel dalam jendela waktu.
+
+Dulu is_potential_duplicate (kayak di notebook) cuma nyala kalo kandang +
+kategori + jumlah + TANGGAL-nya sama persis sampe milidetik. Transaksi yang
+diinput dua kali biasanya beda jam/hari, jadi fiturnya hampir ga pernah
+nyala. Di sini kuncinya (kandang, kategori, tipe, jumlah dibuletin) dan
+dianggep dobel kalo ada transaksi dengan kunci sama yang jaraknya masih
+dalam jendela (default 7 hari).
+
+Indeksnya dibagi per ember waktu selebar jendela: ember -> kunci ->
+[waktu paling awal, waktu paling akhir, jumlah, identitas]. Transaksi di
+waktu t cukup ngecek embernya sendiri + dua tetangga, jadi cek & tambah
+O(1), dan ember yang udah lewat jendela dibuang (memorinya ga numpuk).
+
+Identitas = id transaksi (kalo ga ada: timestamp persisnya). Transaksi yang
+udah masuk history (update_stats / context_stats.py build) terus diskor
+lagi ga boleh dobel sama dirinya sendiri - yang diitung cuma posting lain
+dengan kunci sama. Tanpa id, posting lain di milidetik yang persis sama
+dianggep transaksi yang sama.
+
+Buat batch ada find_duplicates: sort per (kunci, waktu), satu baris dobel
+kalo baris sebelumnya kuncinya sama & jaraknya masih dalam jendela. Hasilnya
+sama kayak ngecek-terus-nambah satu-satu urut waktu.
+
+Setting: ANOMALY_DUPLICATE_WINDOW_DAYS, ANOMALY_DUPLICATE_ROUNDING (jumlah
+dibuletin ke kelipatan ini, default 1 rupiah).
+
+Cek di dataset (paritas batch vs streaming + recall label duplicate):
+    python duplicate_index.py check ../scripts/kandang_anomaly_dataset_sep2025_jan2026.json
+"""
+
+import os
+import sys
+import json
+import time
+
+import numpy as np
+import pandas as pd
+
+DAY_MS = 86400 * 1000
+DEFAULT_WINDOW_DAYS = float(os.environ.get('ANOMALY_DUPLICATE_WINDOW_DAYS', 7))
+DEFAULT_ROUNDING = float(os.environ.get('ANOMALY_DUPLICATE_ROUNDING', 1))
+
+
+def duplicate_key(farm_id, category, tx_type, amount, rounding=DEFAULT_ROUNDING):
+    """Kunci duplikat: kandang + kategori + tipe + jumlah dibuletin"""
+    return f'{farm_id}|{category}|{tx_type}|{int(round(amount / rounding))}'
+
+
+def key_array(farm_ids, categories, tx_types, amounts, rounding=DEFAULT_ROUNDING):
+    """Versi kolom duplicate_key (buat DataFrame training), formatnya sama persis"""
+    def text(values):
+        return pd.Series(np.asarray(values, dtype=object)).astype(str)
+
+    rounded = pd.Series(np.round(np.asarray(amounts, dtype=np.float64) / rounding)).astype(np.int64).astype(str)
+    keys = text(farm_ids) + '|' + text(categories) + '|' + text(tx_types) + '|' + rounded
+    return keys.to_numpy(dtype=object)
+
+
+def identity(tx_id, date_ms):
+    """Identitas transaksi di indeks: id-nya, kalo ga ada timestamp persisnya"""
+    if tx_id is not None:
+        return f'#{tx_id}@{float(date_ms)!r}'
+    return f'@{float(date_ms)!r}'
+
+
+def transaction_key(tx, rounding=DEFAULT_ROUNDING):
+    """Kunci + waktu (ms) dari dict transaksi, None kalo amount/tanggalnya ngaco"""
+    try:
+        amount = float(tx.get('amount', 0))
+        date_ms = tx.get('date', 0)
+        if isinstance(date_ms, bool) or not isinstance(date_ms, (int, float)) or date_ms != date_ms:
+            return None
+        key = duplicate_key(
+            tx.get('farm_id', 'KANDANG1'), tx.get('category', 'Lain-lain'),
+            tx.get('type', 'expense'), amount, rounding
+        )
+    except Exception:
+        return None
+    return key, date_ms
+
+
+def find_duplicates(keys, times, window_ms):
+    """
+    Versi borongan: flag dobel buat satu batch (array bool, urutan input).
+    Baris ditandain kalo ada baris lain dengan kunci sama yang waktunya
+    <= waktunya sendiri dan jaraknya <= window_ms (seri waktu: yang
+    belakangan di input yang ditandain). Kunci None ga pernah dobel.
+    """
+    n = len(keys)
+    flags = np.zeros(n, dtype=bool)
+    if n < 2:
+        return flags
+
+    codes, _ = pd.factorize(pd.Series(keys, dtype=object), use_na_sentinel=True)
+    times = np.asarray(times, dtype=np.float64)
+    order = np.lexsort((np.arange(n), times, codes))
+    codes_sorted = codes[order]
+    times_sorted = times[order]
+
+    # Di dalam grup kunci yang udah urut waktu, tetangga sebelumnya itu yang paling deket
+    same = (codes_sorted[1:] == codes_sorted[:-1]) & (codes_sorted[1:] >= 0)
+    close = (times_sorted[1:] - times_sorted[:-1]) <= window_ms
+    flags[order[1:]] = same & close
+    return flags
+
+
+class DuplicateIndex:
+    """Indeks hash per ember waktu, cek & tambah O(1)"""
+
+    def __init__(self, window_days=DEFAULT_WINDOW_DAYS, rounding=DEFAULT_ROUNDING):
+        self.window_days = window_days
+        self.rounding = rounding
+        self.window_ms = window_days * DAY_MS
+        self.buckets = {}
+        self.newest = None
+
+    def __len__(self):
+        return sum(len(entries) for entries in self.buckets.values())
+
+    def _bucket(self, date_ms):
+        return int(date_ms // self.window_ms)
+
+    def check(self, key, date_ms, ident=None):
+        """
+        Ada transaksi LAIN kunci sama dalam jendela? (read-only). ident:
+        identitas transaksinya sendiri (identity()), kalo udah pernah masuk
+        indeks ga diitung.
+        """
+        bucket = self._bucket(date_ms)
+        # Satu ember selebar jendela -> yang seember pasti masih dalam jendela.
+        # Transaksinya sendiri (kalo udah masuk) pasti di ember ini juga
+        entries = self.buckets.get(bucket)
+        if entries is not None:
+            entry = entries.get(key)
+            if entry is not None and (ident is None or entry[2] > entry[3].count(ident)):
+                return True
+        entries = self.buckets.get(bucket - 1)
+        if entries is not None:
+            entry = entries.get(key)
+            if entry is not None and date_ms - entry[1] <= self.window_ms:
+                return True
+        entries = self.buckets.get(bucket + 1)
+        if entries is not None:
+            entry = entries.get(key)
+            if entry is not None and entry[0] - date_ms <= self.window_ms:
+                return True
+        return False
+
+    def add(self, key, date_ms, ident=None):
+        """Masukin satu transaksi, ember yang udah lewat jendela dibuang"""
+        bucket = self._bucket(date_ms)
+        entries = self.buckets.setdefault(bucket, {})
+        entry = entries.get(key)
+        if entry is None:
+            entries[key] = [date_ms, date_ms, 1, []]
+            entry = entries[key]
+        else:
+            if date_ms < entry[0]:
+                entry[0] = date_ms
+            if date_ms > entry[1]:
+                entry[1] = date_ms
+            entry[2] += 1
+        if ident is not None:
+            entry[3].append(ident)
+
+        if self.newest is None or bucket > self.newest:
+            self.newest = bucket
+            # Query paling baru masih butuh ember sebelumnya, sisanya udah ga kejangkau
+            for old in [b for b in self.buckets if b < bucket - 1]:
+                del self.buckets[old]
+
+    def observe(self, key, date_ms, ident=None):
+        """Cek dulu baru tambah (mode streaming) - balikin flag dobelnya"""
+        duplicate = self.check(key, date_ms, ident)
+        self.add(key, date_ms, ident)
+        return duplicate
+
+    def key(self, farm_id, category, tx_type, amount):
+        return duplicate_key(farm_id, category, tx_type, amount, self.rounding)
+
+    def batch_flags(self, transactions, history=True):
+        """
+        Flag dobel buat satu batch transaksi (list dict): dobel sama transaksi
+        lain di batch yang sama, ATAU (kalo history=True) sama history di
+        indeks (selain dirinya sendiri). Read-only.
+        """
+        keyed = [transaction_key(tx, self.rounding) if isinstance(tx, dict) else None for tx in transactions]
+        keys = [k[0] if k is not None else None for k in keyed]
+        times = [k[1] if k is not None else 0 for k in keyed]
+        flags = find_duplicates(keys, times, self.window_ms)
+        if history and self.buckets:
+            check = self.check
+            for i, k in enumerate(keyed):
+                if k is not None and not flags[i] and check(k[0], k[1], identity(transactions[i].get('id'), k[1])):
+                    flags[i] = True
+        return flags
+
+    def to_dict(self):
+        return {
+            'window_days': self.window_days,
+            'rounding': self.rounding,
+            'buckets': {str(b): entries for b, entries in self.buckets.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, d, window_days=DEFAULT_WINDOW_DAYS, rounding=DEFAULT_ROUNDING):
+        index = cls(window_days, rounding)
+        # Setting-nya ganti = ember & kunci lama ga nyambung lagi, mulai kosong
+        if d.get('window_days') != window_days or d.get('rounding') != rounding:
+            return index
+        index.buckets = {int(b): entries for b, entries in d.get('buckets', {}).items()}
+        for entries in index.buckets.values():
+            for entry in entries.values():
+                # File lama belum nyimpen identitas - posting lamanya dianggep "lain"
+                if len(entry) < 4:
+                    entry.append([])
+        index.newest = max(index.buckets) if index.buckets else None
+        return index
+
+
+def check_dataset(path, window_days=DEFAULT_WINDOW_DAYS):
+    """Bandingin batch vs streaming di satu dataset, plus recall label 'duplicate'"""
+    with open(path, 'r', encoding='utf-8') as f:
+        transactions = json.load(f).get('transactions', [])
+    transactions = sorted(transactions, key=lambda t: t.get('date', 0))
+
+    index = DuplicateIndex(window_days)
+    start = time.perf_counter()
+    bulk = index.batch_flags(transactions)
+    bulk_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    streamed = []
+    for tx in transactions:
+        keyed = transaction_key(tx, index.rounding)
+        streamed.append(keyed is not None and index.observe(*keyed, identity(tx.get('id'), keyed[1])))
+    stream_s = time.perf_counter() - start
+
+    labeled = np.array([tx.get('anomaly_type') == 'duplicate' for tx in transactions])
+    flagged = np.asarray(bulk)
+    return {
+        'rows': len(transactions),
+        'window_days': window_days,
+        'identical': flagged.tolist() == streamed,
+        'flagged': int(flagged.sum()),
+        'labeled_duplicates': int(labeled.sum()),
+        'recall': round(float((flagged & labeled).sum() / max(labeled.sum(), 1)), 4),
+        'bulk_ms': round(bulk_s * 1000, 2),
+        'stream_ms': round(stream_s * 1000, 2),
+        'index_entries': len(index),
+    }
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != 'check':
+        print('Pake: python duplicate_index.py check <dataset.json> [jendela_hari]')
+        sys.exit(1)
+    window_days = float(sys.argv[3]) if len(sys.argv) > 3 else DEFAULT_WINDOW_DAYS
+    print(json.dumps(check_dataset(sys.argv[2], window_days), indent=2))
+
+
+if __name__ == '__main__':
+    main()
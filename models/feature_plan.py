@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Feature engineering model anomali - satu-satunya definisi fitur, dipake
+training (build_frame) sama scorer (build).
+
+Dulu fiturnya ditulis dua kali: create_features di notebook (pandas groupby
++ lambda) dan engineer_features di predict_anomaly.py (per transaksi), dan
+udah mulai beda sendiri-sendiri. Sekarang:
+  - tabel kategori/tipe/kandang dari model_config.json disiapin sekali pas load
+  - rumus fiturnya satu (_columns), jalan per kolom numpy buat semua baris
+  - urutan kolom ngikutin feature_columns di model_config.json
+  - bedanya training vs serving cuma sumber statistik grupnya: training dari
+    dataset-nya sendiri (groupby tanpa lambda), serving dari ContextStatsStore
+
+Cek paritas (batch vs satu-satu, training vs serving):
+    python feature_plan.py parity ../scripts/kandang_anomaly_dataset_sep2025_jan2026.json
+    python -m pytest test_feature_plan.py   (dataset bawaan, termasuk bitmask alasan)
+"""
+
+import os
+import sys
+import json
+
+import numpy as np
+import pandas as pd
+
+from duplicate_index import DuplicateIndex, find_duplicates, identity, key_array
+from time_features import FARM_TZ, calendar_features, invalid_message
+
+# Mapping kandang default, kalo model_config.json belum punya "farm_mapping"
+FARM_MAPPING = {
+    'KANDANG1': 0, 'KANDANG2': 1, 'KANDANG3': 2,
+    'AYAM PERTAMA': 0, 'AYAM KEDUA': 1, 'Kandang KEVIN': 2
+}
+
+# Urutan fitur default, kalo model_config.json ga bawa feature_columns
+FEATURE_COLUMNS = (
+    'amount_log', 'amount_zscore_category', 'amount_zscore_farm', 'amount_to_category_median',
+    'category_type_mismatch', 'is_weekend', 'is_month_end', 'is_night_time',
+    'category_frequency', 'daily_transaction_count', 'is_potential_duplicate', 'exceeds_threshold',
+    'category_encoded', 'farm_encoded', 'type_encoded',
+    'day_of_week', 'day_of_month', 'hour_of_day', 'month'
+)
+
+# Kode alasan anomali (bitmask)
+TIME_PATTERN = 1
+CATEGORY_MISMATCH = 2
+AMOUNT_OUTLIER = 4
+# Baris aneh (amount bukan angka di kategori yang ada batasnya) - alasannya dicek manual
+NEEDS_CHECK = 8
+
+REASON_NAMES = (
+    (TIME_PATTERN, 'time_pattern'),
+    (CATEGORY_MISMATCH, 'category_mismatch'),
+    (AMOUNT_OUTLIER, 'amount_outlier'),
+)
+
+# Nilai fitur konteks kalo ga ada statistik historis
+NEUTRAL_CONTEXT = (0, 0, 1, 0.1, 1, 0)
+
+
+def reason_names(flags):
+    """Bitmask alasan -> list nama alasan (kosong = model_detected)"""
+    reasons = [name for bit, name in REASON_NAMES if flags & bit]
+    return reasons or ['model_detected']
+
+
+def frame_context(categories, farm_ids, amounts, days):
+    """
+    Statistik grup dari data itu sendiri (buat training, kayak create_features
+    di notebook). Groupby pake agregasi bawaan pandas, bukan lambda.
+    """
+    frame = pd.DataFrame({
+        'category': np.asarray(categories, dtype=object),
+        'farm_id': np.asarray(farm_ids, dtype=object),
+        'amount': np.asarray(amounts, dtype=np.float64),
+        'day': np.asarray(days, dtype=object),
+    })
+    by_category = frame.groupby('category', sort=False, dropna=False)['amount']
+    by_farm = frame.groupby('farm_id', sort=False, dropna=False)['amount']
+    category_n = by_category.transform('count').to_numpy(dtype=np.float64)
+    return {
+        'category_n': category_n,
+        'category_mean': by_category.transform('mean').to_numpy(dtype=np.float64),
+        'category_std': by_category.transform('std').fillna(0.0).to_numpy(dtype=np.float64),
+        'category_median': by_category.transform('median').to_numpy(dtype=np.float64),
+        'category_frequency': category_n / max(len(frame), 1),
+        'farm_n': by_farm.transform('count').to_numpy(dtype=np.float64),
+        'farm_mean': by_farm.transform('mean').to_numpy(dtype=np.float64),
+        'farm_std': by_farm.transform('std').fillna(0.0).to_numpy(dtype=np.float64),
+        'daily_transaction_count': frame.groupby(['farm_id', 'day'], sort=False, dropna=False)['amount']
+                                        .transform('size').to_numpy(dtype=np.float64),
+    }
+
+
+def neutral_context(n):
+    """Konteks kosong (ga ada history) - hasilnya NEUTRAL_CONTEXT"""
+    zeros = np.zeros(n)
+    return {
+        'category_n': zeros, 'category_mean': zeros, 'category_std': zeros,
+        'category_median': np.full(n, np.nan), 'category_frequency': np.full(n, NEUTRAL_CONTEXT[3]),
+        'farm_n': zeros, 'farm_mean': zeros, 'farm_std': zeros,
+        'daily_transaction_count': np.full(n, float(NEUTRAL_CONTEXT[4])),
+    }
+
+
+def _zscore(amount, n, mean, std):
+    # Di bawah 2 data std-nya ga ada (ddof=1) -> 0, sama kayak nan_to_num di notebook
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(n >= 2, (amount - mean) / (std + 1e-10), 0.0)
+
+
+def _median_ratio(amount, median):
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(np.isnan(median) | (median == 0), 1.0, amount / (median + 1e-10))
+
+
+class FeaturePlan:
+    """Tabel lookup kategori/tipe/kandang + flag per kategori, dibikin sekali"""
+
+    def __init__(self, config, le_category, le_type):
+        expense_categories = set(config.get('expense_categories', []))
+        income_categories = set(config.get('income_categories', []))
+        thresholds = config.get('anomaly_thresholds', {})
+        category_mapping = config.get('category_mapping', {})
+
+        self.feature_columns = list(config.get('feature_columns') or FEATURE_COLUMNS)
+        unknown = [c for c in self.feature_columns if c not in FEATURE_COLUMNS]
+        if unknown:
+            raise ValueError(f'Fitur ga dikenal di feature_columns: {unknown}')
+
+        # Kategori yang dikenal encoder pake index-nya, sisanya fallback ke config
+        category_codes = dict(category_mapping)
+        category_codes.update({c: i for i, c in enumerate(le_category.classes_.tolist())})
+
+        # Per kategori: (kode, kategori expense?, kategori income?, batas wajar)
+        known = (set(category_codes) | expense_categories | income_categories | set(thresholds))
+        self.categories = {
+            c: (
+                category_codes.get(c, 0),
+                c in expense_categories,
+                c in income_categories,
+                thresholds.get(c)
+            )
+            for c in known
+        }
+        self.unknown_category = (0, False, False, None)
+
+        # Tipe yang ga dikenal encoder: selain 'expense' dianggep income
+        self.type_codes = {t: i for i, t in enumerate(le_type.classes_.tolist())}
+        self.farm_codes = dict(config.get('farm_mapping') or FARM_MAPPING)
+        # Zona waktu fitur kalender - yang kepake pas training (dicatet di config) menang
+        self.tz = config.get('farm_timezone') or FARM_TZ
+
+        # Berapa kali nilai ga dikenal / tanggal ga kebaca (kumulatif, buat metrics)
+        self.counters = {'category_misses': 0, 'type_misses': 0, 'farm_misses': 0, 'invalid_dates': 0}
+
+    def _encode(self, categories, tx_types, farm_ids):
+        """Lookup tabel per nilai unik (bukan per baris), balikin kolom numpy"""
+        category_codes, category_values = pd.factorize(pd.Series(categories, dtype=object), use_na_sentinel=False)
+        entries = [self.categories.get(c, self.unknown_category) for c in category_values]
+        category_miss = np.array([e is self.unknown_category for e in entries], dtype=bool)[category_codes]
+        table = np.array(
+            [(code, expense, income, np.nan if limit is None else limit) for code, expense, income, limit in entries],
+            dtype=np.float64
+        ).reshape(-1, 4)[category_codes]
+
+        type_codes, type_values = pd.factorize(pd.Series(tx_types, dtype=object), use_na_sentinel=False)
+        type_rows = []
+        for t in type_values:
+            is_expense = t == 'expense'
+            code = self.type_codes.get(t)
+            type_rows.append((0 if is_expense else 1 if code is None else code, is_expense, t == 'income', code is None))
+        type_table = np.array(type_rows, dtype=np.int64).reshape(-1, 4)[type_codes]
+
+        farm_codes, farm_values = pd.factorize(pd.Series(farm_ids, dtype=object), use_na_sentinel=False)
+        farm_rows = [self.farm_codes.get(f) for f in farm_values]
+        farm_miss = np.array([code is None for code in farm_rows], dtype=bool)[farm_codes]
+        farm_table = np.array([0 if code is None else code for code in farm_rows], dtype=np.int64)[farm_codes]
+
+        return {
+            'category_code': table[:, 0],
+            'expense_category': table[:, 1] == 1,
+            'income_category': table[:, 2] == 1,
+            'limit': table[:, 3],
+            'category_miss': category_miss,
+            'type_code': type_table[:, 0],
+            'is_expense': type_table[:, 1] == 1,
+            'is_income': type_table[:, 2] == 1,
+            'type_miss': type_table[:, 3] == 1,
+            'farm_code': farm_table,
+            'farm_miss': farm_miss,
+        }
+
+    def _columns(self, amount, encoded, times, context, duplicate):
+        """Rumus semua fitur, per kolom. Balikin matriks n x len(feature_columns)"""
+        day_of_week, day_of_month, hour_of_day, month = (
+            times['day_of_week'], times['day_of_month'], times['hour'], times['month']
+        )
+        with np.errstate(invalid='ignore', divide='ignore'):
+            amount_log = np.log1p(amount)
+        limit = encoded['limit']
+        columns = {
+            'amount_log': amount_log,
+            'amount_zscore_category': _zscore(
+                amount, context['category_n'], context['category_mean'], context['category_std']),
+            'amount_zscore_farm': _zscore(amount, context['farm_n'], context['farm_mean'], context['farm_std']),
+            'amount_to_category_median': _median_ratio(amount, context['category_median']),
+            'category_type_mismatch': (
+                (encoded['expense_category'] & encoded['is_income']) |
+                (encoded['income_category'] & encoded['is_expense'])
+            ),
+            'is_weekend': day_of_week >= 5,
+            'is_month_end': day_of_month >= 28,
+            'is_night_time': hour_of_day <= 4,
+            'category_frequency': context['category_frequency'],
+            'daily_transaction_count': context['daily_transaction_count'],
+            'is_potential_duplicate': duplicate,
+            'exceeds_threshold': amount > np.nan_to_num(limit, nan=np.inf),
+            'category_encoded': encoded['category_code'],
+            'farm_encoded': encoded['farm_code'],
+            'type_encoded': encoded['type_code'],
+            'day_of_week': day_of_week,
+            'day_of_month': day_of_month,
+            'hour_of_day': hour_of_day,
+            'month': month,
+        }
+        features = np.empty((len(amount), len(self.feature_columns)), dtype=np.float64)
+        for j, name in enumerate(self.feature_columns):
+            features[:, j] = columns[name]
+        return features
+
+    def build(self, transactions, stats=None, duplicates=None, context=None):
+        """
+        Fitur buat scorer. duplicates: flag dobel di dalem batch (kalo None
+        diitung dari transactions sendiri). context: dict kosong -> diisi kolom
+        yang dipake tier aturan cascade (rule_tier.py). Balikin (features, errors, times, flags):
+          features : matriks n x len(feature_columns) (urutan dari model_config.json)
+          errors   : pesan error per baris (None kalo aman, tanggal ga valid juga error)
+          times    : fitur kalender (time_features.calendar_features, zona waktu kandang)
+          flags    : bitmask alasan anomali per baris
+        """
+        n = len(transactions)
+        errors = [None] * n
+        amounts = [0.0] * n
+        categories = ['Lain-lain'] * n
+        tx_types = ['expense'] * n
+        farm_ids = ['KANDANG1'] * n
+        date_values = [0] * n
+        has_type = np.zeros(n, dtype=bool)
+        has_category = np.zeros(n, dtype=bool)
+        numeric = np.zeros(n, dtype=bool)
+
+        # Satu-satunya loop per baris: ambil field dari dict + validasi
+        for i, tx in enumerate(transactions):
+            try:
+                raw_amount = tx.get('amount', 0)
+                amount = float(raw_amount)
+                if amount <= -1:
+                    # log1p ga kedefinisi
+                    raise ValueError('math domain error')
+                tx_type = tx.get('type', 'expense')
+                category = tx.get('category', 'Lain-lain')
+                farm_id = tx.get('farm_id', 'KANDANG1')
+                # Nilai yang ga bisa jadi kunci lookup (list/dict) = baris error
+                hash(tx_type), hash(category), hash(farm_id)
+            except Exception as e:
+                errors[i] = str(e)
+                continue
+            amounts[i] = amount
+            tx_types[i] = tx_type
+            categories[i] = category
+            farm_ids[i] = farm_id
+            date_values[i] = tx.get('date', 0)
+            has_type[i] = 'type' in tx
+            has_category[i] = 'category' in tx
+            numeric[i] = type(raw_amount) in (int, float)
+
+        amount = np.array(amounts, dtype=np.float64)
+        valid = np.array([e is None for e in errors], dtype=bool)
+        encoded = self._encode(categories, tx_types, farm_ids)
+
+        # Tanggal yang ga valid jadi error baris itu (dulu diganti datetime.now() diem-diem)
+        times = calendar_features(date_values, self.tz)
+        invalid = valid & ~times['valid']
+        for i in np.flatnonzero(invalid):
+            errors[i] = invalid_message(date_values[i])
+        valid &= ~invalid
+        days = np.where(times['valid'], times['day'], '')
+
+        history = np.zeros(n, dtype=bool)
+        context_out = context
+        if stats is not None:
+            context = stats.lookup(categories, farm_ids, days, amount)
+            index = stats.duplicates
+            if index.buckets:
+                # Transaksi yang udah masuk history ga dobel sama dirinya sendiri
+                for i in np.flatnonzero(valid & np.isfinite(amount)):
+                    key = index.key(farm_ids[i], categories[i], tx_types[i], amounts[i])
+                    ident = identity(transactions[i].get('id'), date_values[i])
+                    history[i] = index.check(key, date_values[i], ident)
+        else:
+            context = neutral_context(n)
+            index = DuplicateIndex()
+        if duplicates is None:
+            duplicates = index.batch_flags(transactions, history=False)
+        duplicate = history | np.asarray(duplicates, dtype=bool)
+
+        features = self._columns(amount, encoded, times, context, duplicate)
+        features[~valid] = 0.0
+
+        # Kode alasan - field yang ga ada dianggep kosong (bukan default fitur)
+        limit = encoded['limit']
+        has_limit = has_category & ~np.isnan(limit)
+        flags = np.where(times['hour'] <= 4, TIME_PATTERN, 0)
+        flags |= np.where(has_category & (
+            (encoded['expense_category'] & encoded['is_income']) |
+            (encoded['income_category'] & encoded['is_expense'] & has_type)
+        ), CATEGORY_MISMATCH, 0)
+        flags |= np.where(has_limit & numeric & (amount > np.nan_to_num(limit, nan=np.inf)), AMOUNT_OUTLIER, 0)
+        flags |= np.where(has_limit & ~numeric, NEEDS_CHECK, 0)
+
+        if context_out is not None:
+            context_out.update({
+                'category_n': context['category_n'],
+                'median_ratio': _median_ratio(amount, context['category_median']),
+                'zscore': _zscore(amount, context['category_n'], context['category_mean'], context['category_std']),
+                'duplicate': duplicate,
+            })
+
+        counters = self.counters
+        counters['category_misses'] += int((encoded['category_miss'] & valid).sum())
+        counters['type_misses'] += int((encoded['type_miss'] & valid).sum())
+        counters['farm_misses'] += int((encoded['farm_miss'] & valid).sum())
+        counters['invalid_dates'] += int(invalid.sum())
+
+        return features, errors, times, flags.tolist()
+
+    def build_frame(self, df):
+        """
+        Fitur buat training dari DataFrame dataset (kolom amount, type,
+        category, farm_id, date). Statistik grupnya dari df itu sendiri,
+        duplikat dicek sama kayak scorer (jendela waktu, duplicate_index.py).
+        """
+        amount = df['amount'].to_numpy(dtype=np.float64)
+        categories = df['category'].to_numpy(dtype=object)
+        tx_types = df['type'].to_numpy(dtype=object)
+        farm_ids = df['farm_id'].to_numpy(dtype=object)
+        date_values = df['date'].to_numpy()
+
+        encoded = self._encode(categories, tx_types, farm_ids)
+        times = calendar_features(date_values, self.tz)
+        if not times['valid'].all():
+            bad = np.flatnonzero(~times['valid'])
+            raise ValueError(f'{len(bad)} baris dataset tanggalnya ga valid, contoh baris {bad[0]}: '
+                             f'{invalid_message(date_values[bad[0]])}')
+        context = frame_context(categories, farm_ids, amount, times['day'])
+
+        index = DuplicateIndex()
+        duplicate = find_duplicates(
+            key_array(farm_ids, categories, tx_types, amount, index.rounding),
+            df['date'].to_numpy(dtype=np.float64), index.window_ms
+        )
+        return self._columns(amount, encoded, times, context, duplicate)
+
+
+def check_parity(plan, transactions, stats=None):
+    """
+    Cek fitur yang sama dari jalur yang beda:
+      - batch vs satu-satu (build) harus sama persis
+      - training (build_frame) vs serving tanpa history (build) sama persis
+        buat kolom yang ga bergantung statistik grup
+    """
+    batch, errors, _, flags = plan.build(transactions, stats)
+    index = stats.duplicates if stats is not None else DuplicateIndex()
+    in_batch = index.batch_flags(transactions, history=False)
+    single_mismatch = []
+    for i, tx in enumerate(transactions):
+        row, row_errors, _, row_flags = plan.build([tx], stats, in_batch[i:i + 1])
+        if row_errors[0] != errors[i] or row_flags[0] != flags[i] or not np.array_equal(row[0], batch[i]):
+            single_mismatch.append(i)
+
+    context_columns = {
+        'amount_zscore_category', 'amount_zscore_farm', 'amount_to_category_median',
+        'category_frequency', 'daily_transaction_count', 'is_potential_duplicate'
+    }
+    shared = [j for j, name in enumerate(plan.feature_columns) if name not in context_columns]
+    valid = [transactions[i] for i, e in enumerate(errors) if e is None]
+    training = plan.build_frame(pd.DataFrame(valid))
+    serving, _, _, _ = plan.build(valid)
+    differs = [
+        plan.feature_columns[j] for j in shared
+        if not np.array_equal(training[:, j], serving[:, j])
+    ]
+    return {
+        'rows': len(transactions),
+        'single_vs_batch_mismatches': len(single_mismatch),
+        'training_vs_serving_mismatched_columns': differs,
+        'ok': not single_mismatch and not differs,
+    }
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] != 'parity':
+        print('Pake: python feature_plan.py parity <dataset.json> [jumlah_baris]')
+        sys.exit(1)
+
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from predict_anomaly import load_models
+
+    with open(sys.argv[2], 'r', encoding='utf-8') as f:
+        transactions = json.load(f).get('transactions', [])
+    if len(sys.argv) > 3:
+        transactions = transactions[:int(sys.argv[3])]
+
+    models = load_models()
+    if 'error' in models:
+        print(f"✗ Model gagal diload: {models['error']}")
+        sys.exit(1)
+    result = check_parity(models['plan'], transactions, models.get('stats'))
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['ok'] else 1)
+
+
+if __name__ == '__main__':
+    main()
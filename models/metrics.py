@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Instrumentasi opsional buat scorer (predict_anomaly.py).
+
+Nyalain pake env ANOMALY_METRICS=1 (atau --metrics di CLI). Isinya:
+  - timer per tahap (perf_counter, monotonic): total, jumlah, paling lama
+  - counter: request, baris diskor, anomali, error, fallback, encoding miss
+  - gauge: nilai terakhir (misal kedalaman antrian micro_batch.py)
+  - dump kumulatif JSON / teks Prometheus
+
+Timing per request bisa ditempel ke response (payload "timings": true),
+itu jalan walaupun metrics global mati. Kalo dua-duanya mati, stage()
+langsung balikin timer kosong jadi overhead-nya cuma satu pengecekan.
+"""
+
+import os
+import time
+
+DEFAULT_ENABLED = os.environ.get('ANOMALY_METRICS', '').lower() in ('1', 'true', 'yes')
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'start')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.name, time.perf_counter() - self.start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+NULL_TIMER = _NullTimer()
+
+
+def process_age():
+    """Umur proses ini dalam detik (dari /proc, Linux only) - None kalo ga bisa"""
+    try:
+        with open('/proc/self/stat', 'r') as f:
+            # Field ke-22 (starttime), dihitung setelah nama proses "(...)"
+            start_ticks = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime', 'r') as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - start_ticks / os.sysconf('SC_CLK_TCK'))
+    except Exception:
+        return None
+
+
+class Metrics:
+    """Timer per tahap + counter kumulatif, plus timing request yang lagi jalan"""
+
+    def __init__(self, enabled=DEFAULT_ENABLED):
+        self.enabled = enabled
+        self.started = time.time()
+        self.stages = {}
+        self.counters = {}
+        self.gauges = {}
+        self.request = None
+
+    def stage(self, name):
+        """Context manager buat ngukur satu tahap"""
+        if not self.enabled and self.request is None:
+            return NULL_TIMER
+        return _Timer(self, name)
+
+    def observe(self, name, seconds):
+        """Catet durasi satu tahap (kumulatif + request yang lagi jalan)"""
+        if self.request is not None:
+            self.request[name] = self.request.get(name, 0.0) + seconds
+        if self.enabled:
+            stage = self.stages.get(name)
+            if stage is None:
+                stage = self.stages[name] = [0, 0.0, 0.0]
+            stage[0] += 1
+            stage[1] += seconds
+            if seconds > stage[2]:
+                stage[2] = seconds
+
+    def count(self, name, value=1):
+        if self.enabled and value:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name, value):
+        """Set nilai sekarang (bukan kumulatif)"""
+        if self.enabled:
+            self.gauges[name] = value
+
+    def begin_request(self, attach):
+        """Mulai ngumpulin timing buat request ini kalo diminta"""
+        self.request = {} if attach else None
+
+    def end_request(self):
+        """Timing request ini dalam ms (None kalo ga diminta)"""
+        timings, self.request = self.request, None
+        if timings is None:
+            return None
+        return {name + '_ms': round(seconds * 1000, 3) for name, seconds in timings.items()}
+
+    def snapshot(self, extra_counters=None):
+        """Dump kumulatif dalam bentuk dict (buat JSON)"""
+        counters = dict(self.counters)
+        for name, value in (extra_counters or {}).items():
+            counters[name] = counters.get(name, 0) + value
+        return {
+            'enabled': self.enabled,
+            'pid': os.getpid(),
+            'uptime_s': round(time.time() - self.started, 3),
+            'counters': counters,
+            'gauges': dict(self.gauges),
+            'stages': {
+                name: {
+                    'count': count,
+                    'total_ms': round(total * 1000, 3),
+                    'mean_ms': round(total / count * 1000, 4) if count else 0,
+                    'max_ms': round(longest * 1000, 3),
+                }
+                for name, (count, total, longest) in self.stages.items()
+            },
+        }
+
+    def prometheus(self, extra_counters=None):
+        """Dump kumulatif format teks Prometheus"""
+        snapshot = self.snapshot(extra_counters)
+        label = f'pid="{snapshot["pid"]}"'
+        lines = []
+        for name, value in sorted(snapshot['counters'].items()):
+            metric = f'anomaly_{name}_total'
+            lines.append(f'# TYPE {metric} counter')
+            lines.append(f'{metric}{{{label}}} {value}')
+
+        for name, value in sorted(snapshot['gauges'].items()):
+            metric = f'anomaly_{name}'
+            lines.append(f'# TYPE {metric} gauge')
+            lines.append(f'{metric}{{{label}}} {value}')
+
+        if self.stages:
+            lines.append('# TYPE anomaly_stage_seconds summary')
+            for name, (count, total, _) in sorted(self.stages.items()):
+                lines.append(f'anomaly_stage_seconds_sum{{{label},stage="{name}"}} {total:.9f}')
+                lines.append(f'anomaly_stage_seconds_count{{{label},stage="{name}"}} {count}')
+            lines.append('# TYPE anomaly_stage_seconds_max gauge')
+            for name, (_, _, longest) in sorted(self.stages.items()):
+                lines.append(f'anomaly_stage_seconds_max{{{label},stage="{name}"}} {longest:.9f}')
+
+        lines.append('# TYPE anomaly_uptime_seconds gauge')
+        lines.append(f'anomaly_uptime_seconds{{{label}}} {snapshot["uptime_s"]}')
+        return '\n'.join(lines) + '\n'
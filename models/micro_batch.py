@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Front asyncio buat mode --serve: request satu transaksi digabung jadi
+satu batch vektor.
+
+Node ngirim request satu-satu (tiap POST /predict satu transaksi), jadi
+di --serve biasa tiap baris bayar ongkos skor satu batch penuh (matriks
+fitur, scaler, predict_proba) cuma buat satu baris. Kalo lagi rame,
+MicroBatcher nampung request satu transaksi dulu, terus diskor sekali
+jalan begitu antriannya nyampe ANOMALY_COALESCE_MAX_BATCH baris ATAU
+request paling tua udah nunggu ANOMALY_COALESCE_MAX_WAIT_MS, hasilnya
+dibagiin balik ke masing-masing pemanggil (jawabannya boleh ga urut,
+Node nyocokin pake id).
+
+Hasil tiap request sama persis kayak diskor sendiri-sendiri:
+  - flag dobel di dalem batch ga dipake (tiap baris request sendiri,
+    dobel sama history tetep kedeteksi kayak biasa)
+  - request "update_stats" motong batch-nya, jadi request sesudahnya
+    diskor pake statistik yang udah ke-update (urutannya sama kayak serial)
+
+Yang ga digabung (langsung dijawab kayak --serve biasa): payload
+borongan, payload "timings": true, sama command.
+
+Skornya jalan di thread event loop (cache SQLite nempel ke thread yang
+bikin), selama ngeskor stdin ga dibaca - request baru numpuk di pipe
+dan ikut batch berikutnya. Nyalain pake --coalesce atau env
+ANOMALY_COALESCE=1. Statistik antrian: command "queue_stats", plus
+gauge/counter coalesce_* di metrics kalo ANOMALY_METRICS=1.
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+
+import numpy as np
+
+from predict_anomaly import (
+    NULL_METRICS, predict_batch, record_stats, handle_request, handle_command, write_line
+)
+
+DEFAULT_ENABLED = os.environ.get('ANOMALY_COALESCE', '').lower() in ('1', 'true', 'yes')
+DEFAULT_MAX_BATCH = int(os.environ.get('ANOMALY_COALESCE_MAX_BATCH', 64))
+DEFAULT_MAX_WAIT_MS = float(os.environ.get('ANOMALY_COALESCE_MAX_WAIT_MS', 5))
+# Antrian segini kali max_batch -> berhenti baca stdin dulu sampe keflush
+QUEUE_LIMIT_FACTOR = 4
+# Batas panjang satu baris NDJSON (payload borongan bisa gede)
+LINE_LIMIT = 64 * 1024 * 1024
+
+
+class MicroBatcher:
+    """
+    Antrian request + task yang ngeflush. submit() langsung balikin future,
+    flush(items) dipanggil sinkron dan harus balikin hasil sebanyak items.
+    """
+
+    def __init__(self, flush, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS, metrics=None):
+        self.flush = flush
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.metrics = metrics or NULL_METRICS
+        self.queue = []
+        self.arrived = asyncio.Event()
+        self.filled = asyncio.Event()
+        self.room = asyncio.Event()
+        self.room.set()
+        self.closed = False
+        self.counters = {
+            'submitted': 0, 'flushes': 0, 'flushed_full': 0, 'flushed_timeout': 0,
+            'flushed_drain': 0, 'peak_depth': 0, 'largest_batch': 0, 'wait_total': 0.0, 'wait_max': 0.0,
+        }
+
+    @property
+    def depth(self):
+        return len(self.queue)
+
+    def submit(self, item):
+        """Masukin satu item ke antrian, balikin future hasilnya"""
+        future = asyncio.get_running_loop().create_future()
+        self.queue.append((item, future, time.perf_counter()))
+        self.counters['submitted'] += 1
+        self._depth_changed()
+        self.arrived.set()
+        if len(self.queue) >= self.max_batch:
+            self.filled.set()
+        return future
+
+    async def wait_room(self):
+        """Tahan pembaca kalo antriannya udah kebanyakan"""
+        await self.room.wait()
+
+    def close(self):
+        """Ga ada request baru lagi - sisa antrian diflush abis itu run() selesai"""
+        self.closed = True
+        self.arrived.set()
+        self.filled.set()
+
+    async def run(self):
+        while True:
+            if not self.queue:
+                if self.closed:
+                    return
+                self.arrived.clear()
+                await self.arrived.wait()
+                continue
+            if len(self.queue) < self.max_batch and not self.closed:
+                remaining = self.queue[0][2] + self.max_wait - time.perf_counter()
+                if remaining > 0:
+                    self.filled.clear()
+                    try:
+                        await asyncio.wait_for(self.filled.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+            self._flush_once()
+            # Kasih kesempatan pembaca ngisi antrian lagi sebelum flush berikutnya
+            await asyncio.sleep(0)
+
+    def _flush_once(self):
+        batch = self.queue[:self.max_batch]
+        del self.queue[:self.max_batch]
+        self._depth_changed()
+
+        if len(batch) >= self.max_batch:
+            reason = 'full'
+        elif self.closed:
+            reason = 'drain'
+        else:
+            reason = 'timeout'
+        counters = self.counters
+        counters['flushes'] += 1
+        counters['flushed_' + reason] += 1
+        counters['largest_batch'] = max(counters['largest_batch'], len(batch))
+
+        now = time.perf_counter()
+        metrics = self.metrics
+        for _, _, queued_at in batch:
+            wait = now - queued_at
+            counters['wait_total'] += wait
+            counters['wait_max'] = max(counters['wait_max'], wait)
+            metrics.observe('queue_wait', wait)
+        metrics.count('coalesce_flushes_' + reason)
+        metrics.count('coalesced_requests', len(batch))
+
+        items = [item for item, future, _ in batch if not future.cancelled()]
+        try:
+            with metrics.stage('coalesce_flush'):
+                results = self.flush(items) if items else []
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        results = iter(results)
+        for _, future, _ in batch:
+            if not future.cancelled():
+                future.set_result(next(results))
+
+    def _depth_changed(self):
+        depth = len(self.queue)
+        if depth > self.counters['peak_depth']:
+            self.counters['peak_depth'] = depth
+        self.metrics.gauge('coalesce_queue_depth', depth)
+        self.metrics.gauge('coalesce_queue_peak_depth', self.counters['peak_depth'])
+        if depth >= self.max_batch * QUEUE_LIMIT_FACTOR:
+            self.room.clear()
+        else:
+            self.room.set()
+
+    def stats(self):
+        """Command "queue_stats": setting + isi antrian sekarang + kumulatif flush"""
+        counters = self.counters
+        flushed = counters['submitted'] - len(self.queue)
+        return {
+            'max_batch': self.max_batch,
+            'max_wait_ms': self.max_wait * 1000,
+            'depth': len(self.queue),
+            'peak_depth': counters['peak_depth'],
+            'submitted': counters['submitted'],
+            'flushes': counters['flushes'],
+            'flushed_full': counters['flushed_full'],
+            'flushed_timeout': counters['flushed_timeout'],
+            'flushed_drain': counters['flushed_drain'],
+            'largest_batch': counters['largest_batch'],
+            'mean_batch': round(flushed / counters['flushes'], 3) if counters['flushes'] else 0,
+            'mean_wait_ms': round(counters['wait_total'] / flushed * 1000, 4) if flushed else 0,
+            'max_wait_seen_ms': round(counters['wait_max'] * 1000, 3),
+        }
+
+
+def coalescable(payload):
+    """Payload satu transaksi tanpa timing per request -> boleh digabung"""
+    return isinstance(payload, dict) and not payload.get('transactions') and not payload.get('timings')
+
+
+def score_payloads(payloads, models):
+    """
+    Skor banyak payload satu transaksi, hasilnya sama kayak handle_request
+    satu-satu. Dipotong abis tiap payload "update_stats" biar yang sesudahnya
+    liat statistik yang udah ke-update.
+    """
+    metrics = models.get('metrics') or NULL_METRICS
+    results = []
+    start = 0
+    for i, payload in enumerate(payloads):
+        if payload.get('update_stats') or i == len(payloads) - 1:
+            segment = payloads[start:i + 1]
+            results.extend(predict_batch(segment, models, np.zeros(len(segment), dtype=bool)))
+            if payload.get('update_stats'):
+                with metrics.stage('update_stats'):
+                    record_stats([payload], models)
+            start = i + 1
+    version = models.get('version')
+    return [{**result, 'model_version': version} for result in results]
+
+
+async def _line_reader():
+    """Baris stdin secara async - pipe lewat StreamReader, file biasa lewat thread"""
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=LINE_LIMIT)
+    try:
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+        return reader.readline
+    except ValueError:
+        # stdin di-redirect dari file biasa, ga bisa dipasang ke event loop
+        return lambda: loop.run_in_executor(None, sys.stdin.buffer.readline)
+
+
+async def serve_async(models, reloader=None, max_batch=DEFAULT_MAX_BATCH, max_wait_ms=DEFAULT_MAX_WAIT_MS):
+    """
+    Sama kayak predict_anomaly.serve (protokol NDJSON, sinyal siap, command,
+    hot reload), bedanya request satu transaksi lewat MicroBatcher.
+    """
+    state = {'models': models}
+    metrics = models.get('metrics') or NULL_METRICS
+
+    def current():
+        if reloader is not None:
+            state['models'] = reloader.poll()
+        return state['models']
+
+    batcher = MicroBatcher(lambda payloads: score_payloads(payloads, current()), max_batch, max_wait_ms, metrics)
+    flusher = asyncio.ensure_future(batcher.run())
+    readline = await _line_reader()
+
+    write_line({
+        'ready': True,
+        'pid': os.getpid(),
+        'model_error': models.get('error'),
+        'model_version': models.get('version'),
+        'coalesce': {'max_batch': batcher.max_batch, 'max_wait_ms': batcher.max_wait * 1000}
+    })
+
+    def respond(request_id, started):
+        def done(future):
+            metrics.observe('request', time.perf_counter() - started)
+            if future.cancelled():
+                return
+            if future.exception() is not None:
+                metrics.count('request_errors')
+                write_line({'id': request_id, 'error': str(future.exception())})
+                return
+            with metrics.stage('serialize'):
+                write_line({'id': request_id, 'result': future.result()})
+        return done
+
+    while True:
+        await batcher.wait_room()
+        line = await readline()
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+
+        request_id = None
+        try:
+            with metrics.stage('parse'):
+                request = json.loads(line)
+            request_id = request.get('id')
+            payload = request.get('payload', {})
+            if 'command' not in request and coalescable(payload):
+                metrics.count('requests')
+                batcher.submit(payload).add_done_callback(respond(request_id, time.perf_counter()))
+                continue
+
+            models = current()
+            if reloader is not None and request.get('command') == 'reload':
+                result = reloader.reload()
+            elif reloader is not None and request.get('command') == 'model_info':
+                result = reloader.info()
+            elif request.get('command') == 'queue_stats':
+                result = batcher.stats()
+            elif 'command' in request:
+                result = handle_command(request['command'], models)
+            else:
+                result = handle_request(payload, models)
+            with metrics.stage('serialize'):
+                write_line({'id': request_id, 'result': result})
+        except json.JSONDecodeError as e:
+            metrics.count('bad_requests')
+            write_line({'id': request_id, 'error': f'Geje nih input JSON-nya: {str(e)}'})
+        except Exception as e:
+            metrics.count('request_errors')
+            write_line({'id': request_id, 'error': str(e)})
+
+    # stdin ketutup: sisa antrian diskor dulu baru keluar
+    batcher.close()
+    await flusher
+    return state['models']
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""
+Hot reload model buat mode --serve.
+
+Worker --serve idupnya lama, jadi model baru hasil scripts/train_model.py
+(versions/CURRENT dipindah) dulu baru kepake kalo prosesnya direstart.
+ModelReloader ngecek tiap ANOMALY_RELOAD_INTERVAL detik (default 2, 0 =
+mati) apakah folder model yang aktif berubah: folder hasil resolve_model_dir
+(isi CURRENT / ANOMALY_MODEL_DIR) plus mtime & ukuran file artifact-nya.
+
+Kalo berubah, versi baru diload di thread belakang (plus pool worker-nya
+kalo skor paralel nyala), sementara request tetep dilayanin model lama.
+Signature-nya harus sama dua kali cek berturut-turut dulu biar file yang
+lagi ditulis (ganti artifact di tempat) ga keburu diload setengah jadi.
+Pas udah siap, loop serve nuker dict models di batas request (poll()), jadi
+satu request ga pernah kecampur dua model. Cache SQLite dibikin di situ
+juga (koneksinya nempel ke thread yang bikin), statistik & metrics nerusin
+punya model lama.
+
+Kalo load-nya gagal, model lama tetep jalan dan signature yang gagal
+diinget biar ga dicoba terus sampe filenya berubah lagi.
+"""
+
+import os
+import time
+import threading
+
+from compiled_forest import SOURCE_FILES
+from metrics import Metrics
+from predict_anomaly import (
+    VERSIONS_DIR, NULL_METRICS, resolve_model_dir, load_model_files, load_cache, load_stats
+)
+
+DEFAULT_INTERVAL = float(os.environ.get('ANOMALY_RELOAD_INTERVAL', 2))
+WATCHED_FILES = list(SOURCE_FILES) + ['model_config.json', os.path.join('forest', 'meta.json')]
+
+
+def artifact_signature(versions_dir=VERSIONS_DIR):
+    """(folder model aktif, (nama, mtime, ukuran) tiap artifact) - berubah = ada model baru"""
+    model_dir = os.path.realpath(resolve_model_dir(versions_dir))
+    files = []
+    for name in WATCHED_FILES:
+        try:
+            st = os.stat(os.path.join(model_dir, name))
+            files.append((name, st.st_mtime_ns, st.st_size))
+        except OSError:
+            files.append((name, None, None))
+    return model_dir, tuple(files)
+
+
+class ModelReloader:
+    """Pegang dict models yang aktif, versi baru disiapin di thread belakang"""
+
+    def __init__(self, models, interval=DEFAULT_INTERVAL, versions_dir=VERSIONS_DIR):
+        self.models = models
+        self.interval = interval
+        self.versions_dir = versions_dir
+        self.signature = artifact_signature(versions_dir)
+        self.failed = None
+        self.candidate = None
+        self.pending = None
+        self.error = None
+        self.last_error = None
+        self.loaded_at = time.time()
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+
+    def start(self):
+        if self.interval > 0:
+            self.thread = threading.Thread(target=self._watch, name='model-reload', daemon=True)
+            self.thread.start()
+        return self
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _watch(self):
+        while not self.stop_event.wait(self.interval):
+            self.check(settle=True)
+
+    def check(self, settle=False):
+        """
+        Cek signature, kalo ada versi baru load di thread pemanggil terus
+        taro di pending (belum dipake sampe poll()). settle=True -> signature
+        baru harus keliatan sama di cek sebelumnya dulu. Balikin True kalo
+        ada versi baru yang siap dituker.
+        """
+        with self.lock:
+            signature = artifact_signature(self.versions_dir)
+            if signature == self.signature or signature == self.failed:
+                self.candidate = None
+                return self.pending is not None
+            if settle and signature != self.candidate:
+                self.candidate = signature
+                return self.pending is not None
+            self.candidate = None
+
+            pool = None
+            try:
+                # Metrics sendiri, punya model aktif dipake thread utama
+                files = load_model_files(signature[0], Metrics(enabled=False))
+                pool = self._start_pool(signature[0])
+            except Exception as e:
+                if pool is not None:
+                    pool.close()
+                self.failed = signature
+                self.error = f'{signature[0]}: {e}'
+                return self.pending is not None
+
+            if self.pending is not None and self.pending[2] is not None:
+                # Versi yang belum sempet dipake keburu disusul versi baru
+                self.pending[2].close()
+            self.pending = (signature, files, pool)
+            self.error = None
+            return True
+
+    def _start_pool(self, model_dir):
+        """Pool baru buat versi baru (kalo yang lama pake pool), udah di-warm up"""
+        old = self.models.get('pool')
+        if old is None:
+            return None
+        from parallel_score import ScoringPool
+        pool = ScoringPool(old.workers, old.min_rows, model_dir, start_method='spawn')
+        try:
+            pool.warm_up()
+        except Exception:
+            pool.close()
+            raise
+        return pool
+
+    def poll(self):
+        """
+        Dipanggil thread utama di antara request: kalo versi baru udah siap,
+        tuker dict models-nya. Balikin dict models yang aktif.
+        """
+        if self.pending is None and self.error is None:
+            return self.models
+        # Lock lagi dipegang thread belakang (lagi load) -> jangan nunggu, layanin pake yang lama
+        if not self.lock.acquire(blocking=False):
+            return self.models
+        try:
+            old = self.models
+            metrics = old.get('metrics') or NULL_METRICS
+            if self.error is not None:
+                metrics.count('model_reload_errors')
+                self.last_error, self.error = self.error, None
+            if self.pending is None:
+                return self.models
+
+            signature, files, pool = self.pending
+            self.pending = None
+            stats = old.get('stats')
+            models = {
+                **files,
+                'stats': stats if stats is not None else load_stats(),
+                'cache': load_cache(files['version']),
+                'metrics': old.get('metrics') or Metrics()
+            }
+            if pool is not None:
+                models['pool'] = pool
+            self.models = models
+            self.signature = signature
+            self.failed = None
+            self.loaded_at = time.time()
+        finally:
+            self.lock.release()
+
+        if old.get('pool') is not None:
+            old['pool'].close()
+        metrics.count('model_reloads')
+        return models
+
+    def reload(self):
+        """Command "reload": cek sekarang juga (tanpa nunggu interval), tuker kalo ada"""
+        self.check()
+        before = self.models.get('version')
+        models = self.poll()
+        return {**self.info(), 'reloaded': models.get('version') != before}
+
+    def info(self):
+        """Command "model_info": versi & folder model yang aktif"""
+        return {
+            'model_version': self.models.get('version'),
+            'model_dir': self.models.get('model_dir'),
+            'backend': self.models.get('backend'),
+            'cascade': self.models.get('rules') is not None,
+            'loaded_at': self.loaded_at,
+            'model_error': self.models.get('error'),
+            'last_reload_error': self.last_error,
+        }
+
+    def close(self):
+        """Matiin watcher + pool yang masih nyala (aktif maupun yang belum sempet dituker)"""
+        self.stop()
+        if self.pending is not None and self.pending[2] is not None:
+            self.pending[2].close()
+            self.pending = None
+        if self.models.get('pool') is not None:
+            self.models['pool'].close()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Skoring paralel buat batch gede (re-audit multi-kandang / multi-tahun).
+
+Input dipecah jadi potongan berurutan, tiap potongan diskor score_batch di
+process pool. Tiap worker load model sekali pas start (forest compiled
+di-mmap, jadi page-nya kebagi antar worker), hasilnya disambung lagi sesuai
+urutan asli. Dipecah per potongan, bukan per kandang: fiturnya per baris,
+statistik konteksnya cuma dibaca, dan flag dobel di dalem batch udah diitung
+di proses utama sebelum dipotong, jadi hasilnya sama aja, dan potongan yang
+rata lebih gampang dibagi ke core.
+
+Worker count: --workers di predict_anomaly.py atau env ANOMALY_SCORE_WORKERS.
+Batch di bawah ANOMALY_PARALLEL_MIN_ROWS baris tetep diskor di proses utama
+(ongkos kirim ke worker lebih gede dari hematnya).
+"""
+
+import os
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+DEFAULT_WORKERS = int(os.environ.get('ANOMALY_SCORE_WORKERS', 0))
+PARALLEL_MIN_ROWS = int(os.environ.get('ANOMALY_PARALLEL_MIN_ROWS', 5000))
+# Potongan per worker (biar worker yang cepet bisa ngambil lagi)
+CHUNKS_PER_WORKER = 4
+MIN_CHUNK_ROWS = 1000
+
+# Model punya worker ini (diisi _init_worker)
+_models = None
+
+
+def _init_worker(model_dir=None):
+    global _models
+    from predict_anomaly import load_models
+    _models = load_models(model_dir=model_dir)
+    # Cache dipegang proses utama
+    _models['cache'] = None
+    model = _models.get('model')
+    if hasattr(model, 'n_jobs'):
+        # Paralelnya udah di level proses, jangan tiap worker bikin thread sebanyak core
+        model.n_jobs = 1
+
+
+def _score_chunk(transactions, duplicates=None):
+    """Skor satu potongan. Balikin (hasil, counter metrics, counter FeaturePlan)"""
+    from predict_anomaly import score_batch
+
+    # Statistik konteks udah nambah (update_stats) -> kejar log-nya, sama kayak proses utama
+    stats = _models.get('stats')
+    if stats is not None:
+        stats.sync()
+
+    results = score_batch(transactions, _models, duplicates)
+
+    counters = {}
+    metrics = _models.get('metrics')
+    if metrics is not None:
+        counters = dict(metrics.counters)
+        metrics.counters.clear()
+    plan_counters = {}
+    plan = _models.get('plan')
+    if plan is not None:
+        plan_counters = dict(plan.counters)
+        for name in plan.counters:
+            plan.counters[name] = 0
+    return results, counters, plan_counters
+
+
+def partition(total, workers):
+    """Potong [0, total) jadi range berurutan yang kurang lebih sama gede"""
+    chunks = max(1, min(workers * CHUNKS_PER_WORKER, total // MIN_CHUNK_ROWS))
+    size, extra = divmod(total, chunks)
+    ranges = []
+    start = 0
+    for i in range(chunks):
+        end = start + size + (1 if i < extra else 0)
+        ranges.append((start, end))
+        start = end
+    return ranges
+
+
+class ScoringPool:
+    """Process pool yang tiap worker-nya megang model sendiri"""
+
+    def __init__(self, workers=DEFAULT_WORKERS, min_rows=PARALLEL_MIN_ROWS, model_dir=None,
+                 start_method=None):
+        self.workers = workers
+        self.min_rows = min_rows
+        # model_dir dipatok biar worker ga ngeload versi lain dari proses utama
+        self.model_dir = model_dir
+        # start_method='spawn' kalo pool-nya dibikin dari thread lain (fork di
+        # proses yang lagi multi-thread bisa nyangkut di lock punya thread lain)
+        context = multiprocessing.get_context(start_method) if start_method else None
+        self.executor = ProcessPoolExecutor(
+            max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(model_dir,)
+        )
+
+    def warm_up(self):
+        """Tunggu semua worker selesai load model (biar request pertama ga kena)"""
+        futures = [self.executor.submit(_score_chunk, []) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+
+    def score(self, transactions, models, duplicates=None):
+        """Skor semua transaksi, hasilnya urut sesuai input (duplicates: flag dobel satu batch penuh)"""
+        futures = [
+            self.executor.submit(
+                _score_chunk, transactions[start:end],
+                None if duplicates is None else duplicates[start:end]
+            )
+            for start, end in partition(len(transactions), self.workers)
+        ]
+
+        metrics = models.get('metrics')
+        plan = models.get('plan')
+        results = []
+        for future in futures:
+            chunk_results, counters, plan_counters = future.result()
+            results.extend(chunk_results)
+            if metrics is not None:
+                for name, value in counters.items():
+                    metrics.count(name, value)
+            if plan is not None:
+                for name, value in plan_counters.items():
+                    plan.counters[name] = plan.counters.get(name, 0) + value
+        return results
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
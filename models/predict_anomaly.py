@@ -4,235 +4,779 @@ import sys
 import json
 import math
 import os
-from datetime import datetime
+import argparse
+import time
+import hashlib
 
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+# Versi model hasil scripts/train_model.py, yang aktif ditunjuk file CURRENT
+VERSIONS_DIR = os.environ.get('ANOMALY_VERSIONS_DIR', os.path.join(SCRIPT_DIR, 'versions'))
+# Ukuran micro-batch default buat mode --stream
+STREAM_BATCH_SIZE = 500
+# Ukuran batch pas skor dari store Parquet (--store)
+STORE_BATCH_SIZE = 50000
 
-def load_models():
-    """Load semua model dan encoder yang dibutuhin"""
+from metrics import Metrics
+
+# Dipake kalo models ga bawa metrics (misal dict bikinan sendiri)
+NULL_METRICS = Metrics(enabled=False)
+
+def resolve_model_dir(versions_dir=VERSIONS_DIR):
+    """
+    Folder artifact yang dipake: ANOMALY_MODEL_DIR kalo diset, kalo ngga versi
+    yang ditunjuk versions/CURRENT, kalo belum ada balik ke models/ (artifact
+    lama hasil notebook)
+    """
+    if os.environ.get('ANOMALY_MODEL_DIR'):
+        return os.environ['ANOMALY_MODEL_DIR']
     try:
-        import joblib
+        with open(os.path.join(versions_dir, 'CURRENT'), 'r') as f:
+            version = f.read().strip()
+    except OSError:
+        return SCRIPT_DIR
+    path = os.path.join(versions_dir, version)
+    return path if version and os.path.isdir(path) else SCRIPT_DIR
+
+
+def load_artifacts(model_dir=SCRIPT_DIR):
+    """
+    Load forest, scaler & encoder. Defaultnya pake versi compiled (forest/,
+    numpy doang tanpa sklearn) kalo ada dan masih sinkron sama joblib-nya,
+    kalo ngga balik ke joblib. ANOMALY_BACKEND=sklearn|compiled buat maksa.
+    """
+    backend = os.environ.get('ANOMALY_BACKEND', 'auto')
+
+    if backend != 'sklearn':
+        from compiled_forest import load_compiled
+        compiled = load_compiled(os.path.join(model_dir, 'forest'), model_dir)
+        if compiled is not None:
+            return {**compiled, 'backend': 'compiled'}
+        if backend == 'compiled':
+            raise RuntimeError('forest/ ga ada / ga sinkron, jalanin compiled_forest.py export dulu')
+
+    import joblib
+    
+    return {
+        'model': joblib.load(os.path.join(model_dir, 'anomaly_detector_rf.joblib')),
+        'scaler': joblib.load(os.path.join(model_dir, 'scaler.joblib')),
+        'le_category': joblib.load(os.path.join(model_dir, 'le_category.joblib')),
+        'le_farm': joblib.load(os.path.join(model_dir, 'le_farm.joblib')),
+        'le_type': joblib.load(os.path.join(model_dir, 'le_type.joblib')),
+        'backend': 'sklearn'
+    }
+
+
+def load_model_files(model_dir, metrics=NULL_METRICS):
+    """
+    Bagian load_models yang cuma baca folder model (artifact, config,
+    FeaturePlan) - ga nyentuh cache/statistik, jadi aman dipanggil dari
+    thread lain (dipake model_reload.py buat load versi baru di belakang)
+    """
+    with metrics.stage('load_artifacts'):
+        artifacts = load_artifacts(model_dir)
+
+    with metrics.stage('load_config'):
+        with open(os.path.join(model_dir, 'model_config.json'), 'r') as f:
+            config = json.load(f)
+
+        version = model_version(config, model_dir)
+
+        from feature_plan import FeaturePlan
+        plan = FeaturePlan(config, artifacts['le_category'], artifacts['le_type'])
+
+        # Mode cascade: tier aturan dulu, forest buat yang ragu-ragu doang
+        from rule_tier import RuleTier, cascade_enabled
+        rules = RuleTier(config) if cascade_enabled() else None
+
+    return {
+        **artifacts,
+        'config': config,
+        'model_dir': model_dir,
+        'plan': plan,
+        'rules': rules,
+        'version': version
+    }
+
+
+def load_models(metrics=None, model_dir=None):
+    """Load semua model dan encoder yang dibutuhin (model_dir None = resolve_model_dir())"""
+    from metrics import process_age
+
+    metrics = metrics or Metrics()
+    if metrics.enabled:
+        # Waktu dari proses mulai sampe sini (start interpreter + import)
+        age = process_age()
+        if age is not None:
+            metrics.observe('startup', age)
+
+    try:
+        files = load_model_files(model_dir or resolve_model_dir(), metrics)
         
-        model = joblib.load(os.path.join(SCRIPT_DIR, 'anomaly_detector_rf.joblib'))
-        scaler = joblib.load(os.path.join(SCRIPT_DIR, 'scaler.joblib'))
-        le_category = joblib.load(os.path.join(SCRIPT_DIR, 'le_category.joblib'))
-        le_farm = joblib.load(os.path.join(SCRIPT_DIR, 'le_farm.joblib'))
-        le_type = joblib.load(os.path.join(SCRIPT_DIR, 'le_type.joblib'))
+        with metrics.stage('load_stats'):
+            stats = load_stats()
         
-        with open(os.path.join(SCRIPT_DIR, 'model_config.json'), 'r') as f:
-            config = json.load(f)
+        with metrics.stage('load_cache'):
+            cache = load_cache(files['version'])
         
         return {
-            'model': model,
-            'scaler': scaler,
-            'le_category': le_category,
-            'le_farm': le_farm,
-            'le_type': le_type,
-            'config': config
+            **files,
+            'stats': stats,
+            'cache': cache,
+            'metrics': metrics
         }
     except Exception as e:
-        return {'error': str(e)}
+        metrics.count('model_load_errors')
+        return {'error': str(e), 'metrics': metrics}
 
 
-def engineer_features(tx, config, le_category, le_type):
-    """Hitung semua fitur yang dipengenin model"""
-    amount = float(tx.get('amount', 0))
-    tx_type = tx.get('type', 'expense')
-    category = tx.get('category', 'Lain-lain')
-    date_ms = tx.get('date', 0)
-    farm_id = tx.get('farm_id', 'KANDANG1')
-    
-    # Parse tanggal dulu
-    try:
-        dt = datetime.fromtimestamp(date_ms / 1000)
-    except:
-        dt = datetime.now()
-    
-    # Fitur jumlah dasar
-    amount_log = math.log1p(amount)
-    
-    # Fitur waktu
-    day_of_week = dt.weekday()
-    day_of_month = dt.day
-    hour_of_day = dt.hour
-    month = dt.month
-    is_weekend = 1 if day_of_week >= 5 else 0
-    is_month_end = 1 if day_of_month >= 28 else 0
-    is_night_time = 1 if 0 <= hour_of_day <= 4 else 0
-    
-    # Cek kategori vs tipe nyambung ga
-    expense_categories = config.get('expense_categories', [])
-    income_categories = config.get('income_categories', [])
-    
-    category_type_mismatch = 0
-    if category in expense_categories and tx_type == 'income':
-        category_type_mismatch = 1
-    elif category in income_categories and tx_type == 'expense':
-        category_type_mismatch = 1
-    
-    # Cek bates wajar
-    thresholds = config.get('anomaly_thresholds', {})
-    exceeds_threshold = 0
-    if category in thresholds and amount > thresholds[category]:
-        exceeds_threshold = 1
-    
-    # Encode variabel kategori
+def model_version(config, model_dir=SCRIPT_DIR):
+    """
+    Versi model: ambil "model_version" dari model_config.json kalo ada,
+    kalo ngga hash isi config + artifact joblib
+    """
+    if config.get('model_version'):
+        return str(config['model_version'])
+    from compiled_forest import source_signature
+    digest = hashlib.sha1(json.dumps(config, sort_keys=True).encode('utf-8'))
+    digest.update(source_signature(model_dir).encode('utf-8'))
+    return digest.hexdigest()[:12]
+
+
+def load_cache(version):
+    """Cache hasil skor (ANOMALY_CACHE_SIZE=0 buat matiin)"""
+    from score_cache import ScoreCache, DEFAULT_MEMORY_ENTRIES
+    if DEFAULT_MEMORY_ENTRIES <= 0:
+        return None
     try:
-        category_encoded = le_category.transform([category])[0]
-    except:
-        category_encoded = config.get('category_mapping', {}).get(category, 0)
-    
+        return ScoreCache(version)
+    except Exception:
+        # SQLite-nya bermasalah, pake memori doang
+        return ScoreCache(version, disk_path=None)
+
+
+def load_stats():
+    """
+    Load statistik historis buat fitur konteks (belum ada file = mulai kosong).
+    Kalo file-nya rusak error-nya dilempar (jadi model error) - jangan diem-diem
+    mulai kosong, fitur konteksnya jadi ngaco kayak history-nya ilang.
+    """
+    from context_stats import ContextStatsStore, DEFAULT_STATS_PATH
     try:
-        type_encoded = le_type.transform([tx_type])[0]
-    except:
-        type_encoded = 0 if tx_type == 'expense' else 1
+        return ContextStatsStore.load()
+    except Exception as e:
+        raise RuntimeError(f'Statistik konteks gagal diload ({DEFAULT_STATS_PATH}): {e}') from e
+
+
+def engineer_features_batch(transactions, config, le_category, le_type, stats=None):
+    """
+    Versi borongan engineer_features - satu matriks fitur buat semua transaksi.
+    Balikin (features, errors, times): errors[i] keisi kalo baris i gagal diparse
+    (termasuk tanggal yang ga valid), times itu fitur kalender hasil decode
+    (time_features.calendar_features, zona waktu kandang).
+    Kalo stats (ContextStatsStore) dikasih, fitur konteks diitung dari history.
+    """
+    from feature_plan import FeaturePlan
+    features, errors, times, _ = FeaturePlan(config, le_category, le_type).build(transactions, stats)
+    return features, errors, times
+
+
+def engineer_features(tx, config, le_category, le_type, stats=None):
+    """Hitung semua fitur yang dipengenin model"""
+    features, errors, _ = engineer_features_batch([tx], config, le_category, le_type, stats)
+    if errors[0] is not None:
+        raise ValueError(errors[0])
+    return features[0].tolist()
+
+
+def error_result(message):
+    """Hasil prediksi kosong kalo ada yang gagal"""
+    return {
+        'is_anomaly': False,
+        'confidence': 0,
+        'anomaly_reasons': [],
+        'error': message
+    }
+
+
+def explain_anomaly(tx, hour, config):
+    """Cek apa yang bikin transaksi jadi anomali (hour: jam lokal kandang)"""
+    anomaly_reasons = []
+    if 0 <= hour <= 4:
+        anomaly_reasons.append('time_pattern')
     
-    # Encode kandang - pake mapping dari config soalnya data asli bisa beda
-    farm_mapping = {'KANDANG1': 0, 'KANDANG2': 1, 'KANDANG3': 2, 
-                   'AYAM PERTAMA': 0, 'AYAM KEDUA': 1, 'Kandang KEVIN': 2}
-    farm_encoded = farm_mapping.get(farm_id, 0)
+    category = tx.get('category', '')
+    tx_type = tx.get('type', '')
     
-    # Nilai placeholder buat fitur yang butuh konteks historis
-    # Kalo udah live, ini diitung dari history transaksi beneran
-    amount_zscore_category = 0  # Butuh statistik kategori
-    amount_zscore_farm = 0  # Butuh statistik kandang
-    amount_to_category_median = 1  # Butuh, median kategori
-    category_frequency = 0.1  # Butuh frekuensi
-    daily_transaction_count = 1  # Butuh hitungan harian
-    is_potential_duplicate = 0  # Butuh deteksi duplikat
+    if category in config.get('expense_categories', []) and tx_type == 'income':
+        anomaly_reasons.append('category_mismatch')
+    elif category in config.get('income_categories', []) and tx_type == 'expense':
+        anomaly_reasons.append('category_mismatch')
     
-    # Vektor fitur urutannya(dari model_config.json)
-    features = [
-        amount_log,
-        amount_zscore_category,
-        amount_zscore_farm,
-        amount_to_category_median,
-        category_type_mismatch,
-        is_weekend,
-        is_month_end,
-        is_night_time,
-        category_frequency,
-        daily_transaction_count,
-        is_potential_duplicate,
-        exceeds_threshold,
-        category_encoded,
-        farm_encoded,
-        type_encoded,
-        day_of_week,
-        day_of_month,
-        hour_of_day,
-        month
-    ]
+    thresholds = config.get('anomaly_thresholds', {})
+    if category in thresholds and tx.get('amount', 0) > thresholds[category]:
+        anomaly_reasons.append('amount_outlier')
     
-    return features
+    if not anomaly_reasons:
+        anomaly_reasons.append('model_detected')
+    return anomaly_reasons
 
 
-def predict_single(tx, models):
-    """Tebak anomali buat satu transaksi"""
+def predict_batch(transactions, models, duplicates=None):
+    """
+    Tebak anomali buat banyak transaksi sekaligus. Yang udah pernah diskor
+    diambil dari cache, sisanya diskor bareng lewat score_batch.
+    duplicates: flag dobel di dalem batch (None = diitung dari transactions,
+    micro_batch.py ngasih semua False soalnya tiap baris request sendiri-sendiri)
+    """
+    stats = models.get('stats')
+    if stats is not None:
+        # Update_stats dari worker lain (log statistik) masuk dulu
+        stats.sync()
+
+    cache = models.get('cache')
+    if cache is None or 'error' in models:
+        return score_rows(transactions, models, duplicates)
+
+    from score_cache import fingerprint
+
+    metrics = models.get('metrics') or NULL_METRICS
+    with metrics.stage('cache_lookup'):
+        # Fitur konteks ikut nentuin hasil, jadi keadaan statistik masuk kunci juga
+        # Zona waktu kandang nentuin fitur jam/hari, jadi ikut kunci juga
+        version = f"{models.get('version')}:{stats.total if stats is not None else 0}:{models['plan'].tz}"
+        if models.get('rules') is not None:
+            # Hasil cascade bisa beda sama full model, jangan kecampur di cache
+            version += ':cascade'
+
+        # Dobel sama transaksi lain di batch ini = hasilnya ikut bergantung sama batch-nya
+        if duplicates is None:
+            duplicates = batch_duplicates(transactions, models)
+        keys = [
+            fingerprint(tx, version) if isinstance(tx, dict) and _cacheable_date(tx) and not duplicate else None
+            for tx, duplicate in zip(transactions, duplicates)
+        ]
+
+        results = cache.get_many(keys)
+    missing = [i for i, result in enumerate(results) if result is None]
+    if missing:
+        scored = score_rows([transactions[i] for i in missing], models, duplicates[missing])
+        for i, result in zip(missing, scored):
+            results[i] = result
+        cache.put_many([keys[i] for i in missing], scored)
+    return results
+
+
+def _cacheable_date(tx):
+    """Tanggal yang ga valid hasilnya error per baris, ga usah dicache"""
+    date_ms = tx.get('date', 0)
+    return isinstance(date_ms, (int, float)) and not isinstance(date_ms, bool)
+
+
+def batch_duplicates(transactions, models):
+    """Flag dobel di dalem batch (kunci & jendela sama kayak indeks di statistik)"""
+    from duplicate_index import DuplicateIndex
+    stats = models.get('stats')
+    index = stats.duplicates if stats is not None else DuplicateIndex()
+    return index.batch_flags(transactions, history=False)
+
+
+def score_rows(transactions, models, duplicates=None):
+    """Batch gede dilempar ke process pool (kalo ada), sisanya score_batch biasa"""
+    pool = models.get('pool')
+    if pool is not None and 'error' not in models and len(transactions) >= pool.min_rows:
+        metrics = models.get('metrics') or NULL_METRICS
+        with metrics.stage('parallel_score'):
+            # Dicek sebelum dipotong, biar pasangan dobel yang kepisah potongan tetep ketemu
+            if duplicates is None:
+                duplicates = batch_duplicates(transactions, models)
+            return pool.score(transactions, models, duplicates)
+    return score_batch(transactions, models, duplicates)
+
+
+def score_batch(transactions, models, duplicates=None):
+    """
+    Skor banyak transaksi sekaligus - satu matriks fitur,
+    sekali scaler, sekali predict_proba (label + confidence dari situ semua).
+    duplicates: flag dobel di dalem batch (None = diitung dari transactions)
+    """
+    metrics = models.get('metrics') or NULL_METRICS
     if 'error' in models:
-        return {
-            'is_anomaly': False,
-            'confidence': 0,
-            'anomaly_reasons': [],
-            'error': models['error']
-        }
+        metrics.count('model_unavailable', len(transactions))
+        return [error_result(models['error']) for _ in transactions]
     
     try:
-        features = engineer_features(
-            tx, 
-            models['config'], 
-            models['le_category'], 
-            models['le_type']
-        )
-        
-        # Skalain fitur
         import numpy as np
-        features_array = np.array(features).reshape(1, -1)
-        features_scaled = models['scaler'].transform(features_array)
+        from feature_plan import NEEDS_CHECK, reason_names
         
-        # Predict model
-        prediction = models['model'].predict(features_scaled)[0]
+        config = models['config']
+        rules = models.get('rules')
+        context = {} if rules is not None else None
+        with metrics.stage('features'):
+            features, errors, times, flags = models['plan'].build(transactions, models.get('stats'), duplicates, context)
         
-        # Ambil probabilitas
-        if hasattr(models['model'], 'predict_proba'):
-            proba = models['model'].predict_proba(features_scaled)[0]
-            confidence = float(max(proba))
-        else:
-            confidence = 1.0 if prediction == 1 else 0.0
+        results = [None if e is None else error_result(e) for e in errors]
+        valid = [i for i, e in enumerate(errors) if e is None]
+        metrics.count('rows_scored', len(valid))
+        metrics.count('row_errors', len(transactions) - len(valid))
+
+        if rules is not None and valid:
+            # Tier 1: baris yang jelas diputusin aturan, forest cuma buat sisanya
+            from rule_tier import AMBIGUOUS, ANOMALY
+            with metrics.stage('rules'):
+                decisions = rules.decide(flags, context)
+            for i in valid:
+                if decisions[i] == AMBIGUOUS:
+                    continue
+                is_anomaly = bool(decisions[i] == ANOMALY)
+                if is_anomaly:
+                    metrics.count('anomalies')
+                results[i] = {
+                    'is_anomaly': is_anomaly,
+                    'confidence': rules.confidence,
+                    'anomaly_reasons': reason_names(flags[i]) if is_anomaly else [],
+                    'tier': 'rules'
+                }
+            decided = len(valid)
+            valid = [i for i in valid if decisions[i] == AMBIGUOUS]
+            metrics.count('rule_decided', decided - len(valid))
+            metrics.count('model_decided', len(valid))
+        if not valid:
+            return results
         
-        # Alasan anomali
-        anomaly_reasons = []
-        if prediction == 1:
-            # Cek apa yang bikin jadi anomali
-            dt = datetime.fromtimestamp(tx.get('date', 0) / 1000)
-            if 0 <= dt.hour <= 4:
-                anomaly_reasons.append('time_pattern')
-            
-            category = tx.get('category', '')
-            tx_type = tx.get('type', '')
-            config = models['config']
-            
-            if category in config.get('expense_categories', []) and tx_type == 'income':
-                anomaly_reasons.append('category_mismatch')
-            elif category in config.get('income_categories', []) and tx_type == 'expense':
-                anomaly_reasons.append('category_mismatch')
-            
-            thresholds = config.get('anomaly_thresholds', {})
-            if category in thresholds and tx.get('amount', 0) > thresholds[category]:
-                anomaly_reasons.append('amount_outlier')
+        # Skalain fitur
+        with metrics.stage('scaling'):
+            features_scaled = models['scaler'].transform(features[valid])
+        
+        # predict() RF itu argmax dari predict_proba, jadi cukup sekali jalan
+        model = models['model']
+        with metrics.stage('predict'):
+            if hasattr(model, 'predict_proba'):
+                proba = model.predict_proba(features_scaled)
+                predictions = model.classes_[np.argmax(proba, axis=1)]
+                confidences = proba.max(axis=1)
+            else:
+                predictions = model.predict(features_scaled)
+                confidences = (predictions == 1).astype(float)
+        
+        for i, prediction, confidence in zip(valid, predictions, confidences):
+            anomaly_reasons = []
+            if prediction == 1:
+                metrics.count('anomalies')
+                if not flags[i] & NEEDS_CHECK:
+                    anomaly_reasons = reason_names(flags[i])
+                else:
+                    # Baris aneh, cek manual kayak dulu
+                    metrics.count('fallbacks')
+                    try:
+                        anomaly_reasons = explain_anomaly(transactions[i], int(times['hour'][i]), config)
+                    except Exception as e:
+                        results[i] = error_result(str(e))
+                        continue
             
-            if not anomaly_reasons:
-                anomaly_reasons.append('model_detected')
+            results[i] = {
+                'is_anomaly': bool(prediction == 1),
+                'confidence': round(float(confidence), 3),
+                'anomaly_reasons': anomaly_reasons
+            }
+            if rules is not None:
+                results[i]['tier'] = 'model'
         
-        return {
-            'is_anomaly': bool(prediction == 1),
-            'confidence': round(confidence, 3),
-            'anomaly_reasons': anomaly_reasons
-        }
+        return results
         
     except Exception as e:
+        metrics.count('batch_errors')
+        return [error_result(str(e)) for _ in transactions]
+
+
+def predict_single(tx, models):
+    """Tebak anomali buat satu transaksi"""
+    return predict_batch([tx], models)[0]
+
+
+def record_stats(transactions, models):
+    """Masukin transaksi yang udah diskor ke statistik historis (log append-only, lihat context_stats.py)"""
+    stats = models.get('stats')
+    if stats is None:
+        return
+    # Baris yang ga valid (amount NaN, kategori list, ...) disaring observed_rows
+    stats.append(transactions, models['plan'].tz)
+
+
+def handle_request(data, models):
+    """
+    Proses satu payload - satu transaksi atau borongan (batch).
+    Kalo payload-nya bawa "update_stats": true, transaksinya dimasukin
+    ke statistik historis abis diskor.
+    """
+    transactions = data.get('transactions', [])
+    metrics = models.get('metrics') or NULL_METRICS
+    metrics.count('requests')
+    # "timings": true -> timing per tahap ditempel ke response
+    metrics.begin_request(bool(data.get('timings')))
+    start = time.perf_counter()
+
+    if not transactions:
+        # Mode satu transaksi doang
+        result = predict_single(data, models)
+        if data.get('update_stats'):
+            with metrics.stage('update_stats'):
+                record_stats([data], models)
+    else:
+        # Mode borongan (batch) - semua transaksi diskor sekali jalan
+        predictions = predict_batch(transactions, models)
+        results = [
+            {**tx, 'anomaly': prediction}
+            for tx, prediction in zip(transactions, predictions)
+        ]
+
+        if data.get('update_stats'):
+            with metrics.stage('update_stats'):
+                record_stats(transactions, models)
+
+        anomaly_count = sum(1 for r in results if r['anomaly']['is_anomaly'])
+
+        result = {
+            **summarize(len(results), anomaly_count),
+            'transactions': results
+        }
+
+    # Versi model yang ngeskor (bisa ganti di tengah jalan kalo hot reload)
+    result = {**result, 'model_version': models.get('version')}
+    metrics.observe('request', time.perf_counter() - start)
+    timings = metrics.end_request()
+    if timings is not None:
+        result = {**result, 'timings': timings}
+    return result
+
+
+def summarize(total, anomaly_count):
+    """Ringkasan jumlah anomali"""
+    return {
+        'total': total,
+        'anomaly_count': anomaly_count,
+        'anomaly_percentage': round(anomaly_count / total * 100, 2) if total else 0
+    }
+
+
+def handle_command(command, models):
+    """Perintah non-skoring buat mode --serve"""
+    if command == 'cache_stats':
+        cache = models.get('cache')
+        return cache.stats() if cache is not None else {'enabled': False}
+    if command == 'metrics':
+        return metrics_snapshot(models)
+    if command == 'metrics_prometheus':
+        return {'text': metrics_snapshot(models, 'prometheus')}
+    if command == 'model_info':
         return {
-            'is_anomaly': False,
-            'confidence': 0,
-            'anomaly_reasons': [],
-            'error': str(e)
+            'model_version': models.get('version'),
+            'model_dir': models.get('model_dir'),
+            'backend': models.get('backend'),
+            'cascade': models.get('rules') is not None,
+            'model_error': models.get('error')
         }
+    raise ValueError(f'Command ga dikenal: {command}')
+
+
+def metrics_snapshot(models, fmt='json'):
+    """
+    Dump metrics kumulatif (JSON dict atau teks Prometheus). Counter
+    encoding miss dari FeaturePlan & hit/miss cache ikut dimasukin.
+    """
+    metrics = models.get('metrics') or NULL_METRICS
+    extra = {}
+    plan = models.get('plan')
+    if plan is not None:
+        extra.update(plan.counters)
+    cache = models.get('cache')
+    if cache is not None:
+        extra['cache_hits'] = cache.counters['hits']
+        extra['cache_misses'] = cache.counters['misses']
+    if fmt == 'prometheus':
+        return metrics.prometheus(extra)
+    return {**metrics.snapshot(extra), 'backend': models.get('backend'), 'version': models.get('version')}
+
+
+def dump_metrics(models, fmt):
+    """Tulis dump metrics ke stderr (buat --metrics, stdout kepake buat hasil)"""
+    if fmt == 'prometheus':
+        sys.stderr.write(metrics_snapshot(models, fmt))
+    else:
+        sys.stderr.write(json.dumps(metrics_snapshot(models)) + '\n')
+    sys.stderr.flush()
+
+
+def write_line(obj):
+    """Tulis satu baris JSON ke stdout terus langsung flush"""
+    sys.stdout.write(json.dumps(obj) + '\n')
+    sys.stdout.flush()
+
+
+def serve(models, reloader=None):
+    """
+    Mode resident - model diload sekali, terus jawab banyak request.
+    Protokolnya NDJSON lewat stdin/stdout:
+      masuk  : {"id": 1, "payload": {...}} atau {"id": 1, "command": "cache_stats"}
+      keluar : {"id": 1, "result": {...}} atau {"id": 1, "error": "..."}
+    Baris pertama yang keluar itu sinyal siap: {"ready": true, ...}
+    Kalo reloader (ModelReloader) dikasih, model baru dituker di antara
+    request; command "model_info" / "reload" buat ngecek / maksa cek.
+    """
+    write_line({
+        'ready': True,
+        'pid': os.getpid(),
+        'model_error': models.get('error'),
+        'model_version': models.get('version')
+    })
+
+    metrics = models.get('metrics') or NULL_METRICS
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+
+        if reloader is not None:
+            models = reloader.poll()
+
+        request_id = None
+        try:
+            with metrics.stage('parse'):
+                request = json.loads(line)
+            request_id = request.get('id')
+            if reloader is not None and request.get('command') == 'reload':
+                result = reloader.reload()
+                models = reloader.models
+            elif reloader is not None and request.get('command') == 'model_info':
+                result = reloader.info()
+            elif 'command' in request:
+                result = handle_command(request['command'], models)
+            else:
+                result = handle_request(request.get('payload', {}), models)
+            with metrics.stage('serialize'):
+                write_line({'id': request_id, 'result': result})
+        except json.JSONDecodeError as e:
+            metrics.count('bad_requests')
+            write_line({'id': request_id, 'error': f'Geje nih input JSON-nya: {str(e)}'})
+        except Exception as e:
+            metrics.count('request_errors')
+            write_line({'id': request_id, 'error': str(e)})
+
+
+def serve_resident(models, reloader, args):
+    """--serve biasa, atau lewat front asyncio micro_batch.py kalo --coalesce"""
+    import micro_batch
+    enabled = micro_batch.DEFAULT_ENABLED if args.coalesce is None else args.coalesce
+    if not enabled:
+        return serve(models, reloader)
+    import asyncio
+    max_batch = args.coalesce_max_batch or micro_batch.DEFAULT_MAX_BATCH
+    max_wait_ms = micro_batch.DEFAULT_MAX_WAIT_MS if args.coalesce_max_wait_ms is None else args.coalesce_max_wait_ms
+    return asyncio.run(micro_batch.serve_async(models, reloader, max_batch, max_wait_ms))
+
+
+def stream(models, batch_size=STREAM_BATCH_SIZE):
+    """
+    Mode streaming buat export gede - memorinya konstan.
+    Masuk NDJSON satu transaksi per baris, diskor per micro-batch, tiap hasil
+    langsung ditulis satu baris ({...tx, "anomaly": {...}}). Paling akhir
+    keluar trailer {"summary": {"total", "anomaly_count", "anomaly_percentage",
+    "model_version"}}.
+    Baris yang JSON-nya rusak dapet {"line": n, "error": "..."} dan ga diitung.
+    """
+    total = 0
+    anomaly_count = 0
+    batch = []
+
+    def flush():
+        nonlocal total, anomaly_count
+        predictions = predict_batch(batch, models)
+        lines = []
+        for tx, prediction in zip(batch, predictions):
+            lines.append(json.dumps({**tx, 'anomaly': prediction}))
+            anomaly_count += 1 if prediction['is_anomaly'] else 0
+        total += len(batch)
+        sys.stdout.write('\n'.join(lines) + '\n')
+        sys.stdout.flush()
+        batch.clear()
+
+    for line_number, line in enumerate(sys.stdin, 1):
+        line = line.strip()
+        if not line:
+            continue
+
+        try:
+            tx = json.loads(line)
+        except json.JSONDecodeError as e:
+            # Flush dulu yang ngantri biar urutan output tetep sama kayak input
+            if batch:
+                flush()
+            write_line({'line': line_number, 'error': f'Geje nih input JSON-nya: {str(e)}'})
+            continue
+
+        batch.append(tx)
+        if len(batch) >= batch_size:
+            flush()
+
+    if batch:
+        flush()
+
+    write_line({'summary': {**summarize(total, anomaly_count), 'model_version': models.get('version')}})
+
+
+def score_store(models, root, filters=None, batch_size=STORE_BATCH_SIZE, output=None):
+    """
+    Skor batch langsung dari store Parquet (transaction_store.py) - cuma kolom
+    yang dipake scorer yang dibaca, filter kandang/tanggal di-push ke store.
+    Hasilnya ditulis ke store `output` (kolom anomaly_is_anomaly,
+    anomaly_confidence, anomaly_reasons, plus anomaly_tier kalo cascade)
+    atau, kalo output ga dikasih, NDJSON ke stdout kayak --stream. Paling
+    akhir keluar {"summary": ...}.
+    """
+    from transaction_store import SCORE_COLUMNS, TransactionStore, swap_in
+
+    store = TransactionStore(root)
+    target = TransactionStore(output + '.tmp') if output else None
+    total = 0
+    anomaly_count = 0
+    for batch in store.batches(SCORE_COLUMNS, batch_rows=batch_size, **(filters or {})):
+        # Kolom kosong (null) dibuang biar dict-nya sama kayak transaksi JSON
+        transactions = [
+            {key: value for key, value in tx.items() if value is not None}
+            for tx in batch.to_pylist()
+        ]
+        predictions = predict_batch(transactions, models)
+        anomalies = sum(1 for prediction in predictions if prediction['is_anomaly'])
+        anomaly_count += anomalies
+        total += len(transactions)
+
+        if target is not None:
+            frame = batch.to_pandas()
+            frame['anomaly_is_anomaly'] = [p['is_anomaly'] for p in predictions]
+            frame['anomaly_confidence'] = [p['confidence'] for p in predictions]
+            frame['anomaly_reasons'] = [p['anomaly_reasons'] for p in predictions]
+            if models.get('rules') is not None:
+                frame['anomaly_tier'] = [p.get('tier') for p in predictions]
+            target.write(frame)
+        else:
+            sys.stdout.write('\n'.join(
+                json.dumps({**tx, 'anomaly': prediction})
+                for tx, prediction in zip(transactions, predictions)
+            ) + '\n')
+            sys.stdout.flush()
+
+    if target is not None:
+        swap_in(target.root, output)
+    write_line({'summary': {**summarize(total, anomaly_count), 'model_version': models.get('version')}})
+
+
+def start_pool(models, workers=None, rows=None):
+    """
+    Nyalain process pool buat skor paralel kalo diminta (workers > 1).
+    rows = ukuran batch sekali jalan, kalo kekecilan ga usah bikin pool
+    """
+    from parallel_score import DEFAULT_WORKERS, PARALLEL_MIN_ROWS, ScoringPool
+    workers = DEFAULT_WORKERS if workers is None else workers
+    if workers <= 1 or 'error' in models or (rows is not None and rows < PARALLEL_MIN_ROWS):
+        return None
+    models['pool'] = ScoringPool(workers, model_dir=models.get('model_dir'))
+    return models['pool']
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Deteksi anomali transaksi kandang')
+    parser.add_argument('--serve', action='store_true',
+                        help='mode resident, request NDJSON {"id", "payload"} lewat stdin')
+    parser.add_argument('--stream', action='store_true',
+                        help='input NDJSON satu transaksi per baris, hasil ditulis per baris')
+    parser.add_argument('--batch-size', type=int, default=STREAM_BATCH_SIZE,
+                        help=f'ukuran micro-batch mode --stream (default {STREAM_BATCH_SIZE})')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='jumlah proses buat skor batch gede paralel '
+                             '(default env ANOMALY_SCORE_WORKERS, 0/1 = ga paralel)')
+    parser.add_argument('--store', metavar='DIR',
+                        help='skor transaksi dari store Parquet (transaction_store.py), bukan stdin')
+    parser.add_argument('--store-output', metavar='DIR',
+                        help='--store: tulis hasilnya ke store ini (default NDJSON ke stdout)')
+    parser.add_argument('--farm', action='append', help='--store: cuma kandang ini (boleh berkali-kali)')
+    parser.add_argument('--start', help='--store: tanggal awal (YYYY-MM-DD atau epoch ms)')
+    parser.add_argument('--end', help='--store: tanggal akhir, eksklusif')
+    parser.add_argument('--coalesce', action='store_true', default=None,
+                        help='--serve: gabungin request satu transaksi jadi satu batch '
+                             '(micro_batch.py, default env ANOMALY_COALESCE)')
+    parser.add_argument('--coalesce-max-batch', type=int, default=None,
+                        help='--coalesce: flush pas antrian nyampe segini request '
+                             '(default env ANOMALY_COALESCE_MAX_BATCH, 64)')
+    parser.add_argument('--coalesce-max-wait-ms', type=float, default=None,
+                        help='--coalesce: request paling lama nunggu segini ms sebelum diflush '
+                             '(default env ANOMALY_COALESCE_MAX_WAIT_MS, 5)')
+    parser.add_argument('--cascade', action='store_true',
+                        help='aturan deterministik mutusin baris yang jelas, forest cuma buat sisanya '
+                             '(rule_tier.py, default env ANOMALY_CASCADE)')
+    parser.add_argument('--metrics', nargs='?', const='json', choices=['json', 'prometheus'],
+                        help='nyalain metrics, dump kumulatifnya ditulis ke stderr pas selesai')
+    return parser.parse_args()
 
 
 def main():
     """Pintu masuk utama - baca dari stdin, keluar ke stdout"""
+    args = parse_args()
+
+    from metrics import Metrics
+    metrics = Metrics(enabled=True) if args.metrics else Metrics()
+    if args.cascade:
+        # Lewat env biar proses pool & model hasil hot reload ikut cascade juga
+        os.environ['ANOMALY_CASCADE'] = '1'
+
+    if args.store:
+        models = load_models(metrics)
+        if 'error' in models:
+            write_line({'error': models['error']})
+            sys.exit(1)
+        pool = start_pool(models, args.workers)
+        try:
+            filters = {'farms': args.farm, 'start': args.start, 'end': args.end}
+            score_store(models, args.store, filters, output=args.store_output)
+        finally:
+            if pool is not None:
+                pool.close()
+        if args.metrics:
+            dump_metrics(models, args.metrics)
+        return
+
+    if args.serve or args.stream:
+        models = load_models(metrics)
+        pool = start_pool(models, args.workers)
+        if args.serve:
+            from model_reload import ModelReloader
+            reloader = ModelReloader(models).start()
+            try:
+                serve_resident(models, reloader, args)
+            finally:
+                # Pool yang aktif bisa udah ganti gara-gara reload
+                reloader.close()
+            models = reloader.models
+        else:
+            try:
+                stream(models, max(1, args.batch_size))
+            finally:
+                if pool is not None:
+                    pool.close()
+        if args.metrics:
+            dump_metrics(models, args.metrics)
+        return
+
+    pool = None
     try:
         input_data = sys.stdin.read()
         data = json.loads(input_data)
         
         # Load model-modelnya
-        models = load_models()
-        
-        transactions = data.get('transactions', [])
+        models = load_models(metrics)
+        pool = start_pool(models, args.workers, len(data.get('transactions', [])))
         
-        if not transactions:
-            # Mode satu transaksi doang
-            result = predict_single(data, models)
-            print(json.dumps(result))
-        else:
-            # Mode borongan (batch)
-            results = []
-            for tx in transactions:
-                prediction = predict_single(tx, models)
-                results.append({
-                    **tx,
-                    'anomaly': prediction
-                })
-            
-            anomaly_count = sum(1 for r in results if r['anomaly']['is_anomaly'])
-            
-            output = {
-                'total': len(results),
-                'anomaly_count': anomaly_count,
-                'anomaly_percentage': round(anomaly_count / len(results) * 100, 2) if results else 0,
-                'transactions': results
-            }
-            print(json.dumps(output))
+        print(json.dumps(handle_request(data, models)))
+        if args.metrics:
+            dump_metrics(models, args.metrics)
             
     except json.JSONDecodeError as e:
         print(json.dumps({'error': f'Geje nih input JSON-nya: {str(e)}'}))
@@ -240,6 +784,9 @@ def main():
     except Exception as e:
         print(json.dumps({'error': str(e)}))
         sys.exit(1)
+    finally:
+        if pool is not None:
+            pool.close()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tier pertama mode cascade: aturan deterministik sebelum RandomForest.
+
+Sinyal paling kuat (kategori ga cocok sama tipe, amount lewat
+anomaly_thresholds, transaksi jam 00:00-04:59) itu aturan pasti - sama kayak
+fallback detectAnomalyRuleBased di Node - dan bit-nya udah diitung
+FeaturePlan.build buat anomaly_reasons. Di mode cascade baris yang jelas
+langsung diputusin di sini (per kolom numpy), forest cuma dipake buat yang
+ragu-ragu:
+  - anomali : ada alasan di "anomaly_reasons" (default ketiganya)
+  - normal  : ga ada alasan sama sekali, bukan dobel, history kategorinya
+              udah cukup (min_category_history, termasuk transaksinya sendiri) dan amount-nya wajar
+              (amount / median kategori <= max_median_ratio, |zscore| <= max_abs_zscore)
+  - sisanya (termasuk baris NEEDS_CHECK) -> forest
+
+Aturannya dari model_config.json (kategori expense/income, anomaly_thresholds)
+plus blok "cascade" opsional buat batas-batas di atas. Nyalain pake env
+ANOMALY_CASCADE=1 atau --cascade, tiap hasil dapet "tier": "rules" / "model".
+Bandingin sama skor full model: python bench_cascade.py
+"""
+
+import os
+
+import numpy as np
+
+from feature_plan import TIME_PATTERN, CATEGORY_MISMATCH, AMOUNT_OUTLIER, NEEDS_CHECK, REASON_NAMES
+
+CASCADE_DEFAULTS = {
+    'anomaly_reasons': ['time_pattern', 'category_mismatch', 'amount_outlier'],
+    'min_category_history': 30,
+    'max_median_ratio': 5.0,
+    'max_abs_zscore': 3.0,
+    # Confidence hasil tier aturan (forest ngasih probabilitas kelasnya)
+    'confidence': 1.0,
+}
+
+REASON_BITS = {name: bit for bit, name in REASON_NAMES}
+ALL_REASONS = TIME_PATTERN | CATEGORY_MISMATCH | AMOUNT_OUTLIER
+
+# Keputusan per baris
+AMBIGUOUS = -1
+NORMAL = 0
+ANOMALY = 1
+
+
+def cascade_enabled():
+    """Dibaca pas load model (env ikut ke proses pool juga)"""
+    return os.environ.get('ANOMALY_CASCADE', '').lower() in ('1', 'true', 'yes')
+
+
+class RuleTier:
+    """Batas-batas cascade dari model_config.json, dibikin sekali pas load"""
+
+    def __init__(self, config):
+        settings = {**CASCADE_DEFAULTS, **(config.get('cascade') or {})}
+        unknown = [name for name in settings['anomaly_reasons'] if name not in REASON_BITS]
+        if unknown:
+            raise ValueError(f'Alasan ga dikenal di cascade.anomaly_reasons: {unknown}')
+        self.anomaly_mask = 0
+        for name in settings['anomaly_reasons']:
+            self.anomaly_mask |= REASON_BITS[name]
+        self.min_category_history = settings['min_category_history']
+        self.max_median_ratio = settings['max_median_ratio']
+        self.max_abs_zscore = settings['max_abs_zscore']
+        self.confidence = settings['confidence']
+
+    def decide(self, flags, context):
+        """
+        flags: bitmask alasan dari FeaturePlan.build, context: dict kolom
+        dari build(..., context=...). Balikin array ANOMALY / NORMAL / AMBIGUOUS.
+        """
+        flags = np.asarray(flags, dtype=np.int64)
+        decisions = np.full(len(flags), AMBIGUOUS, dtype=np.int8)
+        clear = (flags & NEEDS_CHECK) == 0
+        with np.errstate(invalid='ignore'):
+            usual = (
+                (context['category_n'] >= self.min_category_history) &
+                (context['median_ratio'] <= self.max_median_ratio) &
+                (np.abs(context['zscore']) <= self.max_abs_zscore)
+            )
+        decisions[clear & ((flags & ALL_REASONS) == 0) & ~context['duplicate'] & usual] = NORMAL
+        decisions[clear & ((flags & self.anomaly_mask) != 0)] = ANOMALY
+        return decisions
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Cache hasil skor anomali, kuncinya sidik jari transaksi.
+
+Dashboard & list transaksi sering ngirim ulang transaksi yang sama ke
+/api/anomaly/batch. Hasilnya cuma bergantung sama field yang dibaca
+engineer_features (amount, type, category, date, farm_id, id) + versi model
+(+ keadaan statistik konteks), jadi bisa disimpen:
+  - tier memori: LRU dengan batas jumlah entri
+  - tier disk (opsional): SQLite, juga dibatesin, buat dibagi antar worker/run
+Kunci selalu bawa versi model, jadi kalo artifact ganti, entri lama otomatis
+ga kepake lagi. Di SQLite entri versi lama ga dihapus pas dibuka (pas hot
+reload worker yang masih di versi lama masih make) - kebuang sendiri lewat
+LRU. Jumlah barisnya dijaga trigger di tabel score_count, jadi ngecek batas
+ga perlu COUNT(*) tiap simpen.
+"""
+
+import os
+import json
+import time
+import hashlib
+import sqlite3
+from collections import OrderedDict
+
+DEFAULT_MEMORY_ENTRIES = int(os.environ.get('ANOMALY_CACHE_SIZE', 10000))
+DEFAULT_DISK_PATH = os.environ.get('ANOMALY_CACHE_DB') or None
+DEFAULT_DISK_ENTRIES = int(os.environ.get('ANOMALY_CACHE_DB_SIZE', 200000))
+
+# Field yang dibaca engineer_features / explain_anomaly (id: cek dobel vs history
+# ga ngitung transaksinya sendiri, jadi hasilnya ikut bergantung sama id)
+FINGERPRINT_FIELDS = ('type', 'category', 'date', 'farm_id', 'id')
+
+
+def fingerprint(tx, version):
+    """
+    Sidik jari kanonik satu transaksi. Amount dinormalisasi ke float plus
+    tanda angka beneran apa bukan ("150000" string dapet NEEDS_CHECK di
+    FeaturePlan, 150000 angka ngga - jadi ga boleh satu entri), field lain
+    apa adanya (yang ga ada jadi null). Balikin None kalo transaksinya ga
+    bisa dicache (misal amount-nya ngaco).
+    """
+    try:
+        raw_amount = tx.get('amount', 0)
+        amount = float(raw_amount)
+        numeric = type(raw_amount) in (int, float)
+        canonical = json.dumps(
+            [version, amount, numeric] + [tx.get(field) for field in FINGERPRINT_FIELDS],
+            ensure_ascii=False,
+            separators=(',', ':')
+        )
+    except Exception:
+        return None
+    return hashlib.sha1(canonical.encode('utf-8')).hexdigest()
+
+
+class ScoreCache:
+    """LRU di memori + SQLite opsional di disk"""
+
+    def __init__(self, version, max_entries=DEFAULT_MEMORY_ENTRIES,
+                 disk_path=DEFAULT_DISK_PATH, disk_max_entries=DEFAULT_DISK_ENTRIES):
+        self.version = version
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.memory = OrderedDict()
+        self.counters = {
+            'hits': 0,
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'disk_evictions': 0,
+        }
+
+        self.db = None
+        if disk_path:
+            self.db = sqlite3.connect(disk_path, timeout=5)
+            self.db.execute('PRAGMA journal_mode=WAL')
+            self.db.execute(
+                'CREATE TABLE IF NOT EXISTS scores '
+                '(key TEXT PRIMARY KEY, version TEXT, result TEXT, used REAL)'
+            )
+            self.db.execute('CREATE INDEX IF NOT EXISTS scores_used ON scores (used)')
+            # Jumlah baris jalan terus (dibagi semua worker), diisi sekali dari COUNT(*)
+            self.db.execute('BEGIN IMMEDIATE')
+            self.db.execute('CREATE TABLE IF NOT EXISTS score_count (rows INTEGER)')
+            if self.db.execute('SELECT rows FROM score_count').fetchone() is None:
+                self.db.execute('INSERT INTO score_count SELECT COUNT(*) FROM scores')
+            self.db.execute(
+                'CREATE TRIGGER IF NOT EXISTS scores_added AFTER INSERT ON scores '
+                'BEGIN UPDATE score_count SET rows = rows + 1; END'
+            )
+            self.db.execute(
+                'CREATE TRIGGER IF NOT EXISTS scores_removed AFTER DELETE ON scores '
+                'BEGIN UPDATE score_count SET rows = rows - 1; END'
+            )
+            self.db.commit()
+
+    def get_many(self, keys):
+        """Ambil hasil buat banyak kunci sekaligus - None kalo miss"""
+        results = [None] * len(keys)
+        missing = {}
+
+        for i, key in enumerate(keys):
+            if key is None:
+                continue
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                results[i] = dict(self.memory[key])
+                self.counters['memory_hits'] += 1
+            else:
+                missing.setdefault(key, []).append(i)
+
+        if self.db is not None and missing:
+            found = self._disk_get(list(missing))
+            for key, result in found.items():
+                self._remember(key, result)
+                for i in missing.pop(key):
+                    results[i] = dict(result)
+                    self.counters['disk_hits'] += 1
+
+        self.counters['misses'] += sum(len(rows) for rows in missing.values())
+        self.counters['hits'] = self.counters['memory_hits'] + self.counters['disk_hits']
+        return results
+
+    def put_many(self, keys, results):
+        """Simpen hasil yang valid (yang error ga dicache)"""
+        fresh = {}
+        for key, result in zip(keys, results):
+            if key is None or result is None or 'error' in result:
+                continue
+            self._remember(key, result)
+            fresh[key] = result
+
+        if self.db is not None and fresh:
+            self._disk_put(fresh)
+
+    def _remember(self, key, result):
+        self.memory[key] = result
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.counters['evictions'] += 1
+
+    def _disk_get(self, keys):
+        found = {}
+        now = time.time()
+        # SQLite ada batas jumlah parameter per query
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            marks = ','.join('?' * len(chunk))
+            rows = self.db.execute(
+                f'SELECT key, result FROM scores WHERE version = ? AND key IN ({marks})',
+                [self.version] + chunk
+            ).fetchall()
+            if rows:
+                hit_keys = [key for key, _ in rows]
+                self.db.execute(
+                    f'UPDATE scores SET used = ? WHERE key IN ({",".join("?" * len(hit_keys))})',
+                    [now] + hit_keys
+                )
+            for key, result in rows:
+                found[key] = json.loads(result)
+        self.db.commit()
+        return found
+
+    def _disk_put(self, fresh):
+        now = time.time()
+        # Upsert (bukan INSERT OR REPLACE): REPLACE ga nyalain trigger hapus, hitungannya bisa ngaco
+        self.db.executemany(
+            'INSERT INTO scores (key, version, result, used) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (key) DO UPDATE SET version = excluded.version, '
+            'result = excluded.result, used = excluded.used',
+            [(key, self.version, json.dumps(result), now) for key, result in fresh.items()]
+        )
+        count = self.db.execute('SELECT rows FROM score_count').fetchone()[0]
+        excess = count - self.disk_max_entries
+        if excess > 0:
+            # Buang yang paling lama ga kepake
+            self.db.execute(
+                'DELETE FROM scores WHERE key IN '
+                '(SELECT key FROM scores ORDER BY used LIMIT ?)',
+                (excess,)
+            )
+            self.counters['disk_evictions'] += excess
+        self.db.commit()
+
+    def stats(self):
+        """Counter hit/miss + ukuran cache"""
+        lookups = self.counters['hits'] + self.counters['misses']
+        return {
+            **self.counters,
+            'hit_rate': round(self.counters['hits'] / lookups, 4) if lookups else 0,
+            'memory_entries': len(self.memory),
+            'version': self.version,
+        }
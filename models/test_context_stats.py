@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Regresi log statistik (update_stats): payload ngaco ga boleh nyangkut di
+context_stats.json.log, dan log yang udah terlanjur keracunan ga boleh
+bikin sync / load gagal atau ngitung baris yang valid dua kali.
+
+    python -m pytest test_context_stats.py   (atau: python test_context_stats.py)
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from context_stats import LOG_SUFFIX, ContextStatsStore, observed_rows
+from predict_anomaly import load_model_files, predict_batch, record_stats, resolve_model_dir
+
+HOUR_MS = 3600 * 1000
+# 2025-01-06 10:00 WIB
+START_MS = 1736132400000
+
+
+def make_tx(i, **fields):
+    return {
+        'id': f'TXN_{i:03d}',
+        'farm_id': 'KANDANG1',
+        'category': 'Pakan',
+        'type': 'expense',
+        'amount': 1_000_000 + i * 12_345,
+        'date': START_MS + i * HOUR_MS,
+        **fields,
+    }
+
+
+def saved_store(directory):
+    path = os.path.join(directory, 'context_stats.json')
+    store = ContextStatsStore()
+    store.save(path)
+    return ContextStatsStore.load(path)
+
+
+def test_bad_payloads_not_logged():
+    bad = [
+        make_tx(1, amount='nan'),
+        make_tx(2, amount=float('inf')),
+        make_tx(3, amount=-5),
+        make_tx(4, category=['x']),
+        make_tx(5, farm_id={'a': 1}),
+        make_tx(6, type=None),
+        make_tx(7, date='2025-01-06'),
+        make_tx(8, date=START_MS + 0.5),
+    ]
+    assert observed_rows(bad) == []
+    assert len(observed_rows(bad + [make_tx(9)])) == 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = saved_store(directory)
+        models = {**load_model_files(resolve_model_dir()), 'stats': store}
+        record_stats(bad + [make_tx(9)], models)
+        with open(store.path + LOG_SUFFIX, encoding='utf-8') as f:
+            assert len(f.read().splitlines()) == 2  # header + satu baris valid
+        assert store.total == 1
+
+
+def test_poisoned_log_replay():
+    with tempfile.TemporaryDirectory() as directory:
+        writer = saved_store(directory)
+        reader = ContextStatsStore.load(writer.path)
+        good = observed_rows([make_tx(i) for i in range(3)])
+        poison = [
+            ['KANDANG1', 'Pakan', float('nan'), '2025-01-06', START_MS, 'expense', 'TXN_NAN'],
+            ['KANDANG1', ['x'], 1000.0, '2025-01-06', START_MS, 'expense', 'TXN_LIST'],
+            'bukan baris',
+        ]
+        # Log yang ditulis versi lama (sebelum disaring): baris rusak di tengah
+        with open(writer.path + LOG_SUFFIX, 'a', encoding='utf-8') as f:
+            for row in [good[0], *poison, good[1]]:
+                f.write(json.dumps(row) + '\n')
+            f.write('{"rusak\n')
+            f.write(json.dumps(good[2]) + '\n')
+
+        assert reader.sync() == 3
+        assert reader.total == 3
+        assert reader.rejected_lines == 4
+        # Sync berikutnya ga ngulang baris sebelum yang rusak
+        assert reader.sync() == 0
+        assert reader.total == 3
+
+        # Proses baru juga bisa load (ga mulai kosong diem-diem)
+        fresh = ContextStatsStore.load(writer.path)
+        assert fresh.total == 3
+        assert fresh.category_stats['Pakan'].n == 3
+
+        # Request berikutnya tetep keskor
+        models = {**load_model_files(resolve_model_dir()), 'stats': fresh, 'cache': None}
+        results = predict_batch([make_tx(10)], models)
+        assert results[0].get('error') is None
+
+        # Setelah dipadetin baris rusaknya ilang
+        fresh.append([make_tx(11)])
+        fresh.save(fresh.path)
+        compacted = ContextStatsStore.load(writer.path)
+        assert compacted.total == 4
+        assert compacted.rejected_lines == 0
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f'✓ {name}')
@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""
+Regresi cek dobel vs history: transaksi yang udah masuk statistik
+(update_stats / context_stats.py build) terus diskor lagi ga boleh dobel
+sama dirinya sendiri, tapi posting lain dengan kunci sama tetep dobel.
+
+    python -m pytest test_duplicate_index.py   (atau: python test_duplicate_index.py)
+"""
+
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from context_stats import ContextStatsStore, observe_transactions
+from duplicate_index import DuplicateIndex, identity
+from predict_anomaly import load_model_files, resolve_model_dir, score_batch
+
+HOUR_MS = 3600 * 1000
+# 2025-01-06 10:00 WIB
+START_MS = 1736132400000
+
+
+def make_batch(n=40):
+    """Transaksi yang ga ada pasangan dobelnya sama sekali (amount beda semua)"""
+    return [
+        {
+            'id': f'TXN_{i:03d}',
+            'farm_id': f'KANDANG{i % 3 + 1}',
+            'category': 'Pakan',
+            'type': 'expense',
+            'amount': 1_000_000 + i * 12_345,
+            'date': START_MS + i * 5 * HOUR_MS,
+            'description': 'Beli pakan',
+        }
+        for i in range(n)
+    ]
+
+
+def duplicate_column(plan, transactions, stats):
+    features, _, _, _ = plan.build(transactions, stats)
+    return features[:, plan.feature_columns.index('is_potential_duplicate')]
+
+
+def test_index_skips_itself():
+    index = DuplicateIndex()
+    key = index.key('KANDANG1', 'Pakan', 'expense', 500000)
+    index.add(key, START_MS, identity('TXN_1', START_MS))
+    assert not index.check(key, START_MS, identity('TXN_1', START_MS))
+    # Posting lain: id beda, atau id sama tapi waktunya beda (input ulang)
+    assert index.check(key, START_MS, identity('TXN_2', START_MS))
+    assert index.check(key, START_MS + HOUR_MS, identity('TXN_1', START_MS + HOUR_MS))
+    # Tanpa id yang dicocokin timestamp persisnya
+    other = index.key('KANDANG2', 'Pakan', 'expense', 500000)
+    index.add(other, START_MS, identity(None, START_MS))
+    assert not index.check(other, START_MS + 0.0, identity(None, START_MS + 0.0))
+    assert index.check(other, START_MS + HOUR_MS, identity(None, START_MS + HOUR_MS))
+
+
+def test_observed_batch_scores_like_fresh():
+    models = load_model_files(resolve_model_dir())
+    plan = models['plan']
+    transactions = make_batch()
+
+    stats = ContextStatsStore()
+    observe_transactions(stats, transactions)
+    assert not duplicate_column(plan, transactions, stats).any()
+
+    results = score_batch(transactions, {**models, 'stats': stats, 'cache': None})
+    assert all(result.get('error') is None for result in results)
+
+    # Dataset disimpen & diload ulang (kayak context_stats.json) hasilnya sama
+    reloaded = ContextStatsStore.from_dict(stats.to_dict())
+    assert not duplicate_column(plan, transactions, reloaded).any()
+
+
+def test_repost_after_observe_still_duplicate():
+    models = load_model_files(resolve_model_dir())
+    plan = models['plan']
+    transactions = make_batch()
+    stats = ContextStatsStore()
+    observe_transactions(stats, transactions)
+
+    repost = {**transactions[5], 'id': 'TXN_REPOST', 'date': transactions[5]['date'] + 2 * HOUR_MS}
+    same_time = {**transactions[7], 'id': 'TXN_OTHER'}
+    flags = duplicate_column(plan, [repost, same_time, transactions[9]], stats)
+    assert np.array_equal(flags, [1.0, 1.0, 0.0])
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f'✓ {name}')
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Paritas fitur di dataset bawaan (sama kayak `python feature_plan.py parity`):
+batch vs satu-satu, training (build_frame) vs serving (build) termasuk
+bitmask alasan anomali, dan fitur konteks dari ContextStatsStore vs groupby.
+
+    python -m pytest test_feature_plan.py   (atau: python test_feature_plan.py)
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+
+from context_stats import ContextStatsStore, observe_transactions
+from feature_plan import AMOUNT_OUTLIER, CATEGORY_MISMATCH, TIME_PATTERN, check_parity
+from predict_anomaly import load_model_files, resolve_model_dir
+
+DATASET = os.path.join(SCRIPT_DIR, '..', 'scripts', 'kandang_anomaly_dataset_sep2025_jan2026.json')
+
+# Statistik grup yang harus sama antara history + baris itu vs groupby seluruh dataset
+# (median ga ikut: di serving cuma dari history dan aproksimasi streaming)
+CONTEXT_COLUMNS = (
+    'amount_zscore_category', 'amount_zscore_farm', 'category_frequency', 'daily_transaction_count'
+)
+
+_cache = {}
+
+
+def load():
+    if not _cache:
+        with open(DATASET, 'r', encoding='utf-8') as f:
+            _cache['transactions'] = json.load(f)['transactions']
+        _cache['plan'] = load_model_files(resolve_model_dir())['plan']
+    return _cache['plan'], _cache['transactions']
+
+
+def frame_flags(plan, features):
+    """Bitmask alasan dari kolom fitur training (dataset-nya lengkap: ada category, type, amount angka)"""
+    column = {name: features[:, j] for j, name in enumerate(plan.feature_columns)}
+    flags = np.where(column['is_night_time'] == 1, TIME_PATTERN, 0)
+    flags |= np.where(column['category_type_mismatch'] == 1, CATEGORY_MISMATCH, 0)
+    flags |= np.where(column['exceeds_threshold'] == 1, AMOUNT_OUTLIER, 0)
+    return flags
+
+
+def test_single_row_matches_batch():
+    plan, transactions = load()
+    result = check_parity(plan, transactions)
+    assert result['single_vs_batch_mismatches'] == 0
+
+    stats = ContextStatsStore()
+    observe_transactions(stats, transactions[:1000], plan.tz)
+    result = check_parity(plan, transactions[1000:], stats)
+    assert result['single_vs_batch_mismatches'] == 0
+
+
+def test_training_matches_serving():
+    plan, transactions = load()
+    result = check_parity(plan, transactions)
+    assert result['training_vs_serving_mismatched_columns'] == []
+
+    training = plan.build_frame(pd.DataFrame(transactions))
+    serving, errors, _, flags = plan.build(transactions)
+    assert all(e is None for e in errors)
+    assert np.array_equal(frame_flags(plan, training), flags)
+    # Tanpa history baris dengan konteks netral aja yang beda, sisanya identik
+    shared = [j for j, name in enumerate(plan.feature_columns)
+              if name not in CONTEXT_COLUMNS + ('amount_to_category_median', 'is_potential_duplicate')]
+    assert np.array_equal(training[:, shared], serving[:, shared])
+
+
+def test_context_matches_training():
+    plan, transactions = load()
+    training = plan.build_frame(pd.DataFrame(transactions))
+    columns = [plan.feature_columns.index(name) for name in CONTEXT_COLUMNS]
+    duplicate_column = plan.feature_columns.index('is_potential_duplicate')
+    duplicate = training[:, duplicate_column] == 1
+    order = sorted(range(len(transactions)), key=lambda i: (transactions[i]['date'], i))
+    position = {i: k for k, i in enumerate(order)}
+
+    # Sampel tiap 75 baris + semua yang dobel biar cek duplikatnya ikut kena
+    sample = sorted(set(range(0, len(transactions), 75)) | set(np.flatnonzero(duplicate).tolist()))
+    assert duplicate[sample].any()
+    for i in sample:
+        # Statistik grup: history = semua baris lain, baris-nya sendiri ditambahin lookup
+        stats = ContextStatsStore()
+        observe_transactions(stats, transactions[:i] + transactions[i + 1:], plan.tz)
+        row, errors, _, flags = plan.build([transactions[i]], stats)
+        assert errors == [None]
+        assert flags == frame_flags(plan, training[i:i + 1]).tolist()
+        assert np.allclose(row[0, columns], training[i, columns], rtol=1e-9, atol=1e-9), i
+
+        # Cek dobel: history = yang lebih dulu (find_duplicates nandain yang belakangan)
+        stats = ContextStatsStore()
+        observe_transactions(stats, [transactions[j] for j in order[:position[i]]], plan.tz)
+        row, _, _, _ = plan.build([transactions[i]], stats)
+        assert row[0, duplicate_column] == training[i, duplicate_column], i
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f'✓ {name}')
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Regresi cache SQLite bareng: buka cache versi baru (hot reload) ga boleh
+ngehapus entri worker yang masih di versi lama, dan jumlah baris yang
+dijaga trigger tetep pas sama isi tabelnya (termasuk upsert & eviction).
+
+    python -m pytest test_score_cache.py   (atau: python test_score_cache.py)
+"""
+
+import os
+import sqlite3
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from score_cache import ScoreCache, fingerprint
+
+
+def keys(version, n):
+    return [fingerprint({'id': f'TXN_{i}', 'amount': 1000 + i}, version) for i in range(n)]
+
+
+def disk_hits(version, path, entries):
+    cache = ScoreCache(version, max_entries=1, disk_path=path, disk_max_entries=100)
+    return sum(result is not None for result in cache.get_many(entries))
+
+
+def test_versions_share_disk_cache():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'scores.db')
+        old = ScoreCache('v1', disk_path=path, disk_max_entries=50)
+        old_keys = keys('v1', 30)
+        old.put_many(old_keys, [{'is_anomaly': False}] * 30)
+        # Hasil yang sama disimpen ulang (upsert) ga nambah hitungan
+        old.put_many(old_keys[:10], [{'is_anomaly': True}] * 10)
+
+        new = ScoreCache('v2', disk_path=path, disk_max_entries=50)
+        assert disk_hits('v1', path, old_keys) == 30
+        # Versi beda ga pernah kebaca walaupun kuncinya ada
+        assert disk_hits('v2', path, old_keys) == 0
+
+        new_keys = keys('v2', 40)
+        new.put_many(new_keys, [{'is_anomaly': False}] * 40)
+        # Kelebihan 20 dibuang dari yang paling lama ga kepake (versi lama)
+        assert new.counters['disk_evictions'] == 20
+        assert disk_hits('v2', path, new_keys) == 40
+        assert disk_hits('v1', path, old_keys) == 10
+
+        db = sqlite3.connect(path)
+        count = db.execute('SELECT COUNT(*) FROM scores').fetchone()[0]
+        assert count == db.execute('SELECT rows FROM score_count').fetchone()[0] == 50
+        db.close()
+
+
+if __name__ == '__main__':
+    for name, test in list(globals().items()):
+        if name.startswith('test_') and callable(test):
+            test()
+            print(f'✓ {name}')
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Decode timestamp transaksi (epoch ms) jadi fitur kalender, satu array sekaligus.
+
+Dulu tiap baris di-decode sendiri pake datetime.fromtimestamp (scorer,
+statistik konteks) dan dibikin pake datetime(...).timestamp() (importer,
+generator) - dua-duanya pake zona waktu server, jadi hour_of_day /
+is_night_time bisa geser kalo TZ server-nya beda, dan tanggal yang ga
+kebaca diem-diem diganti datetime.now(). Sekarang semuanya lewat sini:
+  - zona waktunya zona waktu kandang (ANOMALY_FARM_TZ, default Asia/Jakarta),
+    bukan TZ server
+  - offset UTC dicari sekali per array (pandas buat array gede, zoneinfo
+    per baris buat yang kecil - overhead pandas kerasa di request satu
+    transaksi), sisanya aritmetika datetime64 numpy
+  - semua fitur kalender keluar sekali jalan (calendar_features)
+  - timestamp yang ga valid (bukan angka, NaN, di luar rentang) ditandain
+    valid=False - yang make yang mutusin (scorer: error per baris)
+
+Cek cepet:
+    python time_features.py 1735689600000 1735707600000 abc
+"""
+
+import os
+import sys
+import json
+from datetime import datetime
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+import numpy as np
+import pandas as pd
+
+FARM_TZ = os.environ.get('ANOMALY_FARM_TZ', 'Asia/Jakarta')
+
+DAY_MS = 86400 * 1000
+HOUR_MS = 3600 * 1000
+# Rentang yang bisa diwakilin pandas (datetime64[ns]), transaksi beneran jauh di dalemnya
+MIN_MS = pd.Timestamp.min.value // 1_000_000 + DAY_MS
+MAX_MS = pd.Timestamp.max.value // 1_000_000 - DAY_MS
+# Sampe segini baris offset-nya dicari pake zoneinfo, di atasnya pandas
+SMALL_ARRAY = 64
+UTC_NAMES = ('UTC', 'Etc/UTC')
+NUMBER_TYPES = {int, float}
+
+
+@lru_cache(maxsize=None)
+def _zone(tz):
+    return ZoneInfo(tz)
+
+
+def epoch_ms(values):
+    """
+    Nilai mentah field date -> (ms float64, valid). Cuma angka beneran yang
+    valid - bool, string, None, NaN, inf, di luar rentang = ga valid.
+    """
+    ms = None
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'iuf':
+        ms = values.astype(np.float64)
+    else:
+        values = list(values)
+        if set(map(type, values)) <= NUMBER_TYPES:
+            # Jalur cepet: isinya int/float biasa semua (kasus normal)
+            try:
+                ms = np.array(values, dtype=np.float64)
+            except OverflowError:
+                ms = None
+    if ms is None:
+        ms = np.full(len(values), np.nan)
+        for i, value in enumerate(values):
+            if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, (bool, np.bool_)):
+                try:
+                    ms[i] = value
+                except OverflowError:
+                    pass
+    with np.errstate(invalid='ignore'):
+        valid = (ms >= MIN_MS) & (ms <= MAX_MS)
+    return ms, valid
+
+
+def invalid_message(value):
+    """Pesan error per baris buat timestamp yang ga valid"""
+    return f'Tanggal ga valid (harus epoch ms): {value!r}'
+
+
+def utc_offsets(stamps, tz=FARM_TZ):
+    """Offset UTC (ms) zona waktu tz di tiap timestamp (int64 ms, valid semua)"""
+    if tz in UTC_NAMES:
+        return np.zeros(len(stamps), dtype=np.int64)
+    if len(stamps) <= SMALL_ARRAY:
+        zone = _zone(tz)
+        return np.array([
+            int(datetime.fromtimestamp(stamp / 1000, zone).utcoffset().total_seconds() * 1000)
+            for stamp in stamps.tolist()
+        ], dtype=np.int64)
+    utc = pd.DatetimeIndex(stamps.astype('datetime64[ms]')).tz_localize('UTC')
+    local = utc.tz_convert(tz).tz_localize(None).as_unit('ms')
+    return local.asi8 - stamps
+
+
+def local_ms(values, tz=FARM_TZ):
+    """(jam dinding di zona tz dalam ms sejak 1970-01-01 lokal, valid) - baris ga valid isinya 0"""
+    ms, valid = epoch_ms(values)
+    local = np.zeros(len(ms), dtype=np.int64)
+    if valid.any():
+        stamps = np.floor(ms[valid]).astype(np.int64)
+        local[valid] = stamps + utc_offsets(stamps, tz)
+    return local, valid
+
+
+def _labels(units, valid, unit, missing):
+    """Nomor hari/bulan -> 'YYYY-MM-DD' / 'YYYY-MM', diformat sekali per nilai unik"""
+    labels = np.full(len(units), missing, dtype=object)
+    if not valid.any():
+        return labels
+    if len(units) <= SMALL_ARRAY:
+        labels[valid] = np.datetime_as_string(units[valid].astype(f'datetime64[{unit}]'), unit=unit)
+        return labels
+    codes, uniques = pd.factorize(units[valid])
+    names = np.datetime_as_string(np.asarray(uniques).astype(f'datetime64[{unit}]'), unit=unit).astype(object)
+    labels[valid] = names[codes]
+    return labels
+
+
+def calendar_features(values, tz=FARM_TZ):
+    """
+    Semua fitur kalender dari array epoch ms, di zona waktu kandang:
+      valid        : False kalo timestamp-nya ga valid (kolom lain 0 / None)
+      hour, day_of_week (Senin=0), day_of_month, month, year : array int64
+      day          : 'YYYY-MM-DD' (object, None kalo ga valid)
+    """
+    local, valid = local_ms(values, tz)
+    days = np.floor_divide(local, DAY_MS)
+    months = days.astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    month_start = months.astype('datetime64[M]').astype('datetime64[D]').astype(np.int64)
+    features = {
+        'valid': valid,
+        'hour': (local - days * DAY_MS) // HOUR_MS,
+        # 1970-01-01 itu hari Kamis
+        'day_of_week': (days + 3) % 7,
+        'day_of_month': days - month_start + 1,
+        'month': months % 12 + 1,
+        'year': months // 12 + 1970,
+    }
+    invalid = ~valid
+    if invalid.any():
+        for name in ('hour', 'day_of_week', 'day_of_month', 'month', 'year'):
+            features[name][invalid] = 0
+    features['day'] = _labels(days, valid, 'D', None)
+    return features
+
+
+def month_keys(values, tz=FARM_TZ):
+    """Epoch ms -> 'YYYY-MM' di zona waktu kandang (array object, 'unknown' kalo ga valid)"""
+    local, valid = local_ms(values, tz)
+    months = np.floor_divide(local, DAY_MS).astype('datetime64[D]').astype('datetime64[M]').astype(np.int64)
+    return _labels(months, valid, 'M', 'unknown')
+
+
+def local_epoch_ms(local, tz=FARM_TZ):
+    """
+    Kebalikannya: jam dinding di zona kandang (datetime naive, array/Series)
+    -> epoch ms int64. Jam yang ga ada (loncat DST) digeser maju, jam yang
+    kembar diambil yang belakangan.
+    """
+    index = pd.DatetimeIndex(local)
+    if tz not in UTC_NAMES:
+        index = index.tz_localize(tz, ambiguous=np.zeros(len(index), dtype=bool), nonexistent='shift_forward')
+    return index.as_unit('ms').asi8
+
+
+def main():
+    if len(sys.argv) < 2:
+        print('Pake: python time_features.py <epoch_ms> [epoch_ms ...]')
+        sys.exit(1)
+    values = []
+    for arg in sys.argv[1:]:
+        try:
+            values.append(json.loads(arg))
+        except ValueError:
+            values.append(arg)
+    features = calendar_features(values)
+    for i, value in enumerate(values):
+        row = {name: column[i] for name, column in features.items()}
+        row = {name: v.item() if hasattr(v, 'item') else v for name, v in row.items()}
+        print(json.dumps({'date': value, 'tz': FARM_TZ, **row}))
+
+
+if __name__ == '__main__':
+    main()
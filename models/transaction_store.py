@@ -0,0 +1,398 @@
+#!/usr/bin/env python3
+"""
+Penyimpanan transaksi kolumnar (Parquet, partisi per kandang & bulan).
+
+Dulu data pindah-pindah lewat JSON: importer nulis import_data.json, generator
+nulis dataset JSON, training & skoring json.load semuanya. Di volume gede
+parse/serialize JSON-nya yang paling makan waktu. Di sini transaksi disimpen
+jadi folder Parquet ala Hive:
+
+    <root>/farm_id=KANDANG1/month=2025-09/part-....parquet
+
+Bacanya lewat pyarrow.dataset, jadi:
+  - filter kandang / rentang tanggal -> folder partisi yang ga kena ga dibuka
+    sama sekali, di dalem file row group-nya masih dipilih lagi pake statistik
+    kolom date (predicate pushdown)
+  - cuma kolom yang diminta yang dibaca (projection), misal fitur doang
+  - dibaca per batch Arrow, memorinya ga harus muat semua
+
+Bulan partisi diitung di zona waktu kandang (ANOMALY_FARM_TZ, default
+Asia/Jakarta), sama kayak tanggal di importer. Tiap write nambah file part
+baru per partisi (tulis ke file sementara + rename), upsert() nulis ulang
+partisi yang kena buat import incremental (id diganti / dihapus).
+
+JSON tinggal buat export (export(), atau CLI di bawah).
+
+Butuh pyarrow (opsional - modul ini tetep bisa diimport tanpa pyarrow, baru
+error pas store-nya dipake).
+
+CLI:
+    python transaction_store.py import <dataset.json|.ndjson|.parquet> <root>
+    python transaction_store.py export <root> <output.json|.ndjson> [--farm F] [--start D] [--end D]
+    python transaction_store.py info <root>
+"""
+
+import os
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# month_keys ikut diekspor dari sini (dipake rollup_cube)
+from time_features import FARM_TZ, month_keys
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+FARM_COLUMN = 'farm_id'
+MONTH_COLUMN = 'month'
+# Kolom yang dibutuhin scorer (sisanya ga usah dibaca pas skoring)
+SCORE_COLUMNS = ['id', 'farm_id', 'description', 'amount', 'type', 'category', 'date']
+BATCH_ROWS = 100_000
+META_FILE = '_dataset.json'
+
+
+def _require_pyarrow():
+    if pa is None:
+        raise RuntimeError('transaction store butuh pyarrow (pip install pyarrow)')
+
+
+def to_epoch_ms(value, tz=FARM_TZ):
+    """Batas filter tanggal: epoch ms (angka) atau 'YYYY-MM-DD[ HH:MM]' jam lokal kandang"""
+    if value is None:
+        return None
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return int(value)
+    text = str(value)
+    if text.lstrip('-').isdigit():
+        return int(text)
+    return int(pd.Timestamp(text, tz=tz).value // 1_000_000)
+
+
+def months_between(start_ms, end_ms, tz=FARM_TZ):
+    """Semua nama partisi bulan yang kena rentang [start, end)"""
+    first, last = month_keys([start_ms, max(start_ms, end_ms - 1)], tz)
+    months = pd.period_range(first, last, freq='M')
+    return [str(month) for month in months]
+
+
+def _normalize(table):
+    """Kolom yang isinya null semua (tipe null) dijadiin string biar skema antar part nyambung"""
+    for i, field in enumerate(table.schema):
+        if pa.types.is_null(field.type):
+            table = table.set_column(i, field.name, table.column(i).cast(pa.string()))
+    return table
+
+
+def _frame(transactions):
+    """list dict / DataFrame / Arrow Table -> DataFrame"""
+    if pa is not None and isinstance(transactions, pa.Table):
+        return transactions.to_pandas()
+    if isinstance(transactions, pd.DataFrame):
+        return transactions
+    return pd.DataFrame(list(transactions))
+
+
+class TransactionStore:
+    """Folder Parquet partisi farm_id / month"""
+
+    def __init__(self, root, tz=FARM_TZ):
+        _require_pyarrow()
+        self.root = root
+        self.tz = tz
+        self.partitioning = ds.partitioning(
+            pa.schema([(FARM_COLUMN, pa.string()), (MONTH_COLUMN, pa.string())]), flavor='hive'
+        )
+        self.sequence = 0
+
+    # ---- nulis ----
+
+    def _partition_dir(self, farm, month):
+        return os.path.join(self.root, f'{FARM_COLUMN}={farm}', f'{MONTH_COLUMN}={month}')
+
+    def _part_name(self):
+        self.sequence += 1
+        return f'part-{time.time_ns()}-{os.getpid()}-{self.sequence}.parquet'
+
+    def _write_file(self, directory, table):
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, self._part_name())
+        tmp_path = os.path.join(directory, '.' + os.path.basename(path) + '.tmp')
+        pq.write_table(table, tmp_path, compression='zstd')
+        # Pembaca ga pernah liat file setengah jadi
+        os.replace(tmp_path, path)
+        return path
+
+    def _groups(self, frame):
+        """(farm, bulan, DataFrame tanpa kolom partisi) per partisi"""
+        if frame.empty:
+            return
+        if FARM_COLUMN not in frame.columns:
+            raise ValueError(f'transaksi butuh kolom {FARM_COLUMN}')
+        farms = frame[FARM_COLUMN].astype(str).to_numpy(dtype=object)
+        months = month_keys(frame['date'].to_numpy(), self.tz)
+        body = frame.drop(columns=[FARM_COLUMN, MONTH_COLUMN], errors='ignore')
+        keys = pd.DataFrame({'farm': farms, 'month': months})
+        for (farm, month), index in keys.groupby(['farm', 'month'], sort=True).indices.items():
+            yield farm, month, body.iloc[index]
+
+    def write(self, transactions):
+        """Tambahin transaksi (list dict / DataFrame / Arrow Table). Balikin jumlah baris"""
+        frame = _frame(transactions)
+        for farm, month, part in self._groups(frame):
+            table = _normalize(pa.Table.from_pandas(part, preserve_index=False))
+            self._write_file(self._partition_dir(farm, month), table)
+        return len(frame)
+
+    def upsert(self, transactions, removed=()):
+        """
+        Buat import incremental: transaksi yang id-nya udah ada diganti, id di
+        `removed` dihapus. Partisi kandang yang kena ditulis ulang jadi satu
+        file (tulis folder baru dulu, baru ditukar).
+        """
+        frame = _frame(transactions)
+        drop = set(removed)
+        if not frame.empty:
+            drop.update(frame['id'].astype(str))
+        farms = set(frame[FARM_COLUMN].astype(str)) if not frame.empty else set()
+        farms.update(tx_id.split('/', 1)[0] for tx_id in removed)
+
+        for farm in sorted(farms):
+            farm_dir = os.path.join(self.root, f'{FARM_COLUMN}={farm}')
+            if not drop or not os.path.isdir(farm_dir):
+                continue
+            for name in sorted(os.listdir(farm_dir)):
+                directory = os.path.join(farm_dir, name)
+                if not name.startswith(f'{MONTH_COLUMN}=') or not os.path.isdir(directory):
+                    continue
+                table = self._partition_table(directory)
+                if table is None or 'id' not in table.column_names:
+                    continue
+                keep = pc.invert(pc.is_in(table['id'], value_set=pa.array(sorted(drop))))
+                if pc.all(keep).as_py():
+                    continue
+                self._replace_partition(directory, table.filter(keep))
+
+        return self.write(frame)
+
+    def _partition_table(self, directory):
+        files = self._files(directory)
+        if not files:
+            return None
+        schema = pa.unify_schemas([pq.read_schema(path) for path in files])
+        return ds.dataset(files, schema=schema, format='parquet').to_table()
+
+    def _replace_partition(self, directory, table):
+        tmp_dir = directory + '.tmp'
+        old_dir = directory + '.old'
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if table.num_rows:
+            self._write_file(tmp_dir, table)
+        else:
+            os.makedirs(tmp_dir)
+        os.rename(directory, old_dir)
+        os.rename(tmp_dir, directory)
+        shutil.rmtree(old_dir)
+
+    def write_meta(self, meta):
+        """Info dataset (anomaly_thresholds, statistics, ...) disimpen di <root>/_dataset.json"""
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, META_FILE)
+        with open(path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        os.replace(path + '.tmp', path)
+
+    # ---- baca ----
+
+    def meta(self):
+        """Isi _dataset.json, {} kalo ga ada"""
+        try:
+            with open(os.path.join(self.root, META_FILE), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _files(self, directory=None):
+        """File part yang udah jadi (file sementara .tmp / folder .tmp .old dilewatin)"""
+        directory = directory or self.root
+        found = []
+        for base, dirs, files in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.endswith(('.tmp', '.old')))
+            found.extend(os.path.join(base, name) for name in sorted(files)
+                         if name.endswith('.parquet') and not name.startswith('.'))
+        return found
+
+    def dataset(self):
+        """pyarrow Dataset semua part, skemanya digabung (kolom yang ga ada di part lama jadi null)"""
+        files = self._files()
+        if not files:
+            return None
+        schema = pa.unify_schemas([pq.read_schema(path) for path in files] + [self.partitioning.schema])
+        return ds.dataset(files, schema=schema, format='parquet',
+                          partitioning=self.partitioning, partition_base_dir=self.root)
+
+    def filter_expression(self, farms=None, start=None, end=None):
+        """Filter kandang & rentang tanggal [start, end): partisi bulan + kolom date"""
+        expression = None
+
+        def both(a, b):
+            return b if a is None else a & b
+
+        if farms:
+            farms = [farms] if isinstance(farms, str) else list(farms)
+            expression = both(expression, ds.field(FARM_COLUMN).isin(farms))
+        start_ms = to_epoch_ms(start, self.tz)
+        end_ms = to_epoch_ms(end, self.tz)
+        if start_ms is not None:
+            expression = both(expression, ds.field('date') >= start_ms)
+        if end_ms is not None:
+            expression = both(expression, ds.field('date') < end_ms)
+        if start_ms is not None and end_ms is not None:
+            # Folder bulan di luar rentang langsung dilewatin tanpa buka file
+            expression = both(expression, ds.field(MONTH_COLUMN).isin(months_between(start_ms, end_ms, self.tz)))
+        return expression
+
+    def scanner(self, columns=None, farms=None, start=None, end=None, batch_rows=BATCH_ROWS):
+        dataset = self.dataset()
+        if dataset is None:
+            return None
+        if columns is None:
+            # Kolom month cuma nama folder, bukan data transaksi
+            columns = [c for c in dataset.schema.names if c != MONTH_COLUMN]
+        else:
+            # Kolom yang diminta tapi ga ada di store dilewatin aja
+            columns = [c for c in columns if c in dataset.schema.names]
+        return dataset.scanner(
+            columns=columns, filter=self.filter_expression(farms, start, end), batch_size=batch_rows
+        )
+
+    def batches(self, columns=None, farms=None, start=None, end=None, batch_rows=BATCH_ROWS):
+        """Iterator RecordBatch Arrow (urutannya per file, ga diurutin tanggal)"""
+        scanner = self.scanner(columns, farms, start, end, batch_rows)
+        if scanner is None:
+            return
+        for batch in scanner.to_batches():
+            if batch.num_rows:
+                yield batch
+
+    def read(self, columns=None, farms=None, start=None, end=None):
+        """Arrow Table hasil filter + projection"""
+        scanner = self.scanner(columns, farms, start, end)
+        if scanner is None:
+            return pa.table({}) if columns is None else pa.table({c: pa.array([], pa.null()) for c in columns})
+        return scanner.to_table()
+
+    def read_frame(self, columns=None, farms=None, start=None, end=None):
+        return self.read(columns, farms, start, end).to_pandas()
+
+    def partitions(self):
+        """[(farm, bulan, jumlah file)] buat info"""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for farm_name in sorted(os.listdir(self.root)):
+            farm_dir = os.path.join(self.root, farm_name)
+            if not farm_name.startswith(f'{FARM_COLUMN}=') or not os.path.isdir(farm_dir):
+                continue
+            for month_name in sorted(os.listdir(farm_dir)):
+                if month_name.startswith(f'{MONTH_COLUMN}=') and not month_name.endswith(('.tmp', '.old')):
+                    files = self._files(os.path.join(farm_dir, month_name))
+                    result.append((farm_name.split('=', 1)[1], month_name.split('=', 1)[1], len(files)))
+        return result
+
+    # ---- export ----
+
+    def export(self, path, fmt=None, columns=None, farms=None, start=None, end=None):
+        """Export ke JSON ({"transactions": [...]}) atau NDJSON. Balikin jumlah baris"""
+        fmt = fmt or ('ndjson' if path.endswith(('.ndjson', '.jsonl')) else 'json')
+        total = 0
+        with open(path, 'w', encoding='utf-8') as f:
+            if fmt == 'json':
+                f.write('{"transactions": [\n')
+            for batch in self.batches(columns, farms, start, end):
+                lines = [json.dumps(_clean(row), ensure_ascii=False) for row in batch.to_pylist()]
+                if fmt == 'json':
+                    f.write(('' if total == 0 else ',\n') + ',\n'.join(lines))
+                else:
+                    f.write('\n'.join(lines) + '\n')
+                total += len(lines)
+            if fmt == 'json':
+                f.write('\n]}\n')
+        return total
+
+
+def swap_in(build_root, root):
+    """Ganti store `root` pake store yang baru selesai dibangun di `build_root` (full import / generate)"""
+    old_root = root + '.old'
+    shutil.rmtree(old_root, ignore_errors=True)
+    if os.path.isdir(root):
+        os.rename(root, old_root)
+    os.makedirs(build_root, exist_ok=True)
+    os.rename(build_root, root)
+    shutil.rmtree(old_root, ignore_errors=True)
+
+
+def _clean(row):
+    """Field null dibuang (kayak JSON asli yang field-nya emang ga ada)"""
+    return {key: value for key, value in row.items() if value is not None}
+
+
+def read_source(path, chunk_rows=BATCH_ROWS):
+    """Dataset lama (.json / .ndjson / .parquet) per chunk DataFrame, buat diimport ke store"""
+    if path.endswith('.parquet'):
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    elif path.endswith(('.ndjson', '.jsonl')):
+        yield from pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False)
+    else:
+        with open(path, 'r', encoding='utf-8') as f:
+            transactions = json.load(f)['transactions']
+        for start in range(0, len(transactions), chunk_rows):
+            yield pd.DataFrame(transactions[start:start + chunk_rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Store transaksi Parquet (partisi kandang/bulan)')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('import', help='masukin dataset JSON/NDJSON/Parquet ke store')
+    p.add_argument('source')
+    p.add_argument('root')
+    p = sub.add_parser('export', help='export store ke JSON / NDJSON')
+    p.add_argument('root')
+    p.add_argument('output')
+    p.add_argument('--farm', action='append', help='filter kandang (boleh berkali-kali)')
+    p.add_argument('--start', help='tanggal awal (YYYY-MM-DD atau epoch ms)')
+    p.add_argument('--end', help='tanggal akhir, eksklusif')
+    p.add_argument('--columns', help='kolom dipisah koma')
+    p = sub.add_parser('info', help='daftar partisi')
+    p.add_argument('root')
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        store = TransactionStore(args.root)
+        start = time.perf_counter()
+        total = sum(store.write(chunk) for chunk in read_source(args.source))
+        print(f'✓ {total} transaksi masuk ke {args.root} ({time.perf_counter() - start:.2f}s)')
+    elif args.command == 'export':
+        store = TransactionStore(args.root)
+        columns = args.columns.split(',') if args.columns else None
+        start = time.perf_counter()
+        total = store.export(args.output, columns=columns, farms=args.farm, start=args.start, end=args.end)
+        print(f'✓ {total} transaksi diexport ke {args.output} ({time.perf_counter() - start:.2f}s)')
+    else:
+        partitions = TransactionStore(args.root).partitions()
+        for farm, month, files in partitions:
+            print(f'  {farm:<20} {month}  {files} file')
+        print(f'{len(partitions)} partisi')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark guess_category: the old loop (`keyword in desc_lower` for every keyword)
+vs KeywordCategorizer (Aho-Corasick + memo) on the descriptions in Data Keuangan/.
+Run from the repo root: py scripts/bench_categorize.py [--repeat N] [--scale K] [--keywords N]
+
+--scale K    repeat the description column K times (the real ledgers are only a few
+             hundred rows)
+--keywords N append N fake supplier/item keywords to the table, to see the cost
+             once the dictionary grows to hundreds of words
+"""
+
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from categorizer import KeywordCategorizer
+from import_excel import CATEGORY_MAPPING, FILES, read_sheets
+
+
+def guess_category_legacy(description, mapping):
+    """Old version - kept only as the baseline"""
+    desc_lower = description.lower()
+    for keyword, category in mapping.items():
+        if keyword in desc_lower:
+            return category
+    return 'Lain-lain'
+
+
+def load_descriptions():
+    """Every KETERANGAN value (all sheets) from the Excel files"""
+    descriptions = []
+    for file_path, _ in FILES:
+        for sheet in read_sheets(file_path, all_sheets=True):
+            descriptions.extend(str(text) for text in sheet['keterangan'] if text is not None)
+    return descriptions
+
+
+def extended_mapping(count, seed=42):
+    """The real table plus `count` fake keywords (random letters that never match the data)"""
+    rng = random.Random(seed)
+    mapping = dict(CATEGORY_MAPPING)
+    while len(mapping) < len(CATEGORY_MAPPING) + count:
+        keyword = 'zq' + ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        mapping[keyword] = 'Peralatan'
+    return mapping
+
+
+def _best_time(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark guess_category')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--scale', type=int, default=100)
+    parser.add_argument('--keywords', type=int, default=500)
+    args = parser.parse_args()
+
+    descriptions = load_descriptions() * args.scale
+    distinct = len(set(descriptions))
+    print(f"{len(descriptions)} descriptions ({distinct} distinct)\n")
+
+    for label, mapping in (
+        (f'real table ({len(CATEGORY_MAPPING)} keywords)', CATEGORY_MAPPING),
+        (f'table + {args.keywords} keywords', extended_mapping(args.keywords)),
+    ):
+        compile_start = time.perf_counter()
+        KeywordCategorizer(mapping)
+        compile_ms = (time.perf_counter() - compile_start) * 1000
+
+        legacy_s, expected = _best_time(
+            lambda: [guess_category_legacy(text, mapping) for text in descriptions], args.repeat)
+        # No memo: the automaton runs on every row
+        plain = KeywordCategorizer(mapping)
+        automaton_s, _ = _best_time(lambda: [plain._match(text) for text in descriptions], args.repeat)
+        # Whole column, fresh memo on every repeat
+        column_s, got = _best_time(
+            lambda: KeywordCategorizer(mapping).categorize_column(descriptions).tolist(), args.repeat)
+
+        print(label)
+        print(f"  compile                 : {compile_ms:8.1f} ms")
+        for name, seconds in (
+            ('old loop', legacy_s),
+            ('automaton per row', automaton_s),
+            ('automaton + column memo', column_s),
+        ):
+            rate = len(descriptions) / seconds if seconds else float('inf')
+            print(f"  {name:<24}: {seconds * 1000:8.1f} ms  ({rate:,.0f} rows/s)")
+        print(f"  identical results       : {got == expected}\n")
+
+
+if __name__ == '__main__':
+    main()
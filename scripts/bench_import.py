@@ -0,0 +1,207 @@
+"""
+Benchmark the Excel importer: the old version (pd.read_excel + iterrows) vs the new
+one (openpyxl read-only + column operations + process pool) on the files in Data Keuangan/.
+Run from the repo root: py scripts/bench_import.py [--repeat N] [--scale K]
+
+The real files are small (a few hundred rows), so the timings are mostly the cost of
+opening the workbook. --scale K makes a temporary copy of each file with the rows of
+its first sheet repeated K times, to show the per-row cost.
+"""
+
+import os
+import sys
+import time
+import shutil
+import argparse
+import tempfile
+from datetime import datetime
+from zoneinfo import ZoneInfo
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from openpyxl import Workbook, load_workbook
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import import_excel
+from import_excel import FILES, guess_category, parse_excel
+from time_features import FARM_TZ
+
+FARM_ZONE = ZoneInfo(FARM_TZ)
+
+
+def parse_excel_legacy(file_path, kandang_name):
+    """Old version (pd.read_excel + iterrows) - kept only as the baseline"""
+    df = pd.read_excel(file_path)
+    transactions = []
+    
+    current_month = None
+    current_year = 2025
+    
+    for _, row in df.iterrows():
+        # Skip headers and totals
+        keterangan = str(row.get('KETERANGAN', ''))
+        if pd.isna(keterangan) or 'SALDO' in keterangan.upper() or keterangan.strip() == '':
+            continue
+        if 'LIST' in keterangan.upper() or 'TOTAL' in keterangan.upper():
+            continue
+            
+        # Get date info
+        tgl_val = row.iloc[0]
+        day_val = row.iloc[1] if len(row) > 1 else None
+        
+        # Parse month from TGL column
+        if not pd.isna(tgl_val):
+            if isinstance(tgl_val, str):
+                months = {'JANUARI':1,'FEBRUARI':2,'MARET':3,'APRIL':4,'MEI':5,'JUNI':6,
+                         'JULI':7,'AGUSTUS':8,'SEPTEMBER':9,'OKTOBER':10,'NOVEMBER':11,'DESEMBER':12}
+                for m_name, m_num in months.items():
+                    if m_name in tgl_val.upper():
+                        current_month = m_num
+                        break
+            elif isinstance(tgl_val, (int, float)) and tgl_val > 2000:
+                current_year = int(tgl_val)
+        
+        # Get day
+        day = 1
+        if not pd.isna(day_val) and isinstance(day_val, (int, float)):
+            day = int(day_val)
+        
+        # Get amount - check both MASUK and KELUAR
+        masuk = row.get('MASUK', 0)
+        keluar = row.get('KELUAR', 0)
+        
+        if pd.isna(masuk): masuk = 0
+        if pd.isna(keluar): keluar = 0
+        
+        # Skip if no amount
+        if masuk == 0 and keluar == 0:
+            continue
+            
+        # Determine type and amount
+        if masuk > 0:
+            tx_type = 'income'
+            amount = float(masuk)
+        else:
+            tx_type = 'expense'
+            amount = float(keluar)
+        
+        # Create date timestamp (midnight in the farm timezone, like import_excel.py)
+        if current_month:
+            try:
+                date_obj = datetime(current_year, current_month, day, tzinfo=FARM_ZONE)
+                date_ts = int(date_obj.timestamp() * 1000)
+            except:
+                date_ts = int(datetime(current_year, 1, 1, tzinfo=FARM_ZONE).timestamp() * 1000)
+        else:
+            date_ts = int(datetime(current_year, 1, 1, tzinfo=FARM_ZONE).timestamp() * 1000)
+        
+        # Guess category
+        category = guess_category(keterangan)
+        
+        transactions.append({
+            'kandang': kandang_name,
+            'description': keterangan.strip(),
+            'amount': amount,
+            'type': tx_type,
+            'category': category,
+            'date': date_ts,
+        })
+    
+    return transactions
+
+
+
+def _run_legacy(files):
+    results = {}
+    for file_path, kandang_name in files:
+        try:
+            results[kandang_name] = parse_excel_legacy(file_path, kandang_name)
+        except Exception as e:
+            results[kandang_name] = e
+    return results
+
+
+def _run_new(files, workers):
+    if workers <= 1:
+        return {name: parse_excel(path, name) for path, name in files}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = pool.map(parse_excel, [p for p, _ in files], [n for _, n in files])
+        return dict(zip([n for _, n in files], parsed))
+
+
+def _best_time(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def _scaled_copy(src, dst, scale):
+    """Copy the first sheet with its data rows repeated `scale` times"""
+    source = load_workbook(src, read_only=True, data_only=True)
+    sheet = source.worksheets[0]
+    rows = list(sheet.iter_rows(values_only=True))
+    source.close()
+
+    target = Workbook(write_only=True)
+    out = target.create_sheet(sheet.title)
+    out.append(rows[0])
+    for _ in range(scale):
+        for row in rows[1:]:
+            out.append(row)
+    target.save(dst)
+
+
+def _report(title, files, repeat, workers):
+    legacy_time, legacy = _best_time(lambda: _run_legacy(files), repeat)
+    new_time, new = _best_time(lambda: _run_new(files, 1), repeat)
+    pool_time, pooled = _best_time(lambda: _run_new(files, workers), repeat)
+
+    print('=' * 60)
+    print(title)
+    print('=' * 60)
+    engine = 'calamine' if import_excel.CalamineWorkbook is not None else 'openpyxl read-only'
+    print(f'New version reader           : {engine}')
+    print(f'Old version (iterrows)       : {legacy_time * 1000:8.1f} ms')
+    print(f'New version (1 process)      : {new_time * 1000:8.1f} ms')
+    print(f'New version ({workers} processes)    : {pool_time * 1000:8.1f} ms')
+
+    print('\nParity per file:')
+    for _, kandang_name in files:
+        old = legacy[kandang_name]
+        if isinstance(old, Exception):
+            print(f'  {kandang_name}: old version failed ({old}), new version {len(new[kandang_name])} transactions')
+        else:
+            same = old == new[kandang_name] == pooled[kandang_name]
+            print(f'  {kandang_name}: {len(old)} transactions, identical: {same}')
+    print()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark import_excel.py')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--workers', type=int, default=len(FILES))
+    parser.add_argument('--scale', type=int, default=100)
+    args = parser.parse_args()
+
+    _report('EXCEL IMPORT BENCHMARK - real files', FILES, args.repeat, args.workers)
+
+    if args.scale > 1:
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            scaled = []
+            for file_path, kandang_name in FILES:
+                dst = os.path.join(tmp_dir, os.path.basename(file_path))
+                _scaled_copy(file_path, dst, args.scale)
+                scaled.append((dst, kandang_name))
+            _report(f'EXCEL IMPORT BENCHMARK - first sheet x{args.scale}', scaled, args.repeat, args.workers)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Keyword categorizer used by import_excel.py to guess a category from KETERANGAN.
+
+The keyword table is compiled once into an Aho-Corasick automaton, so one pass
+over the text finds every keyword occurrence (overlapping ones too) no matter
+how many keywords there are, and the keyword with the best priority wins. Priorities
+are explicit: by default it is the position in the table (so dict order keeps
+working), but a rule can set its own. Rules can also ask for whole-word matches
+(e.g. 'dp' should not match inside another word).
+
+Ledgers repeat the same descriptions a lot, so results are memoized and a whole
+column is categorized through its distinct values only.
+"""
+
+import pandas as pd
+
+DEFAULT_CATEGORY = 'Lain-lain'
+
+# Memo is cleared when it grows past this many descriptions
+MEMO_LIMIT = 100000
+
+
+def _normalize_rules(mapping):
+    """
+    Mapping values are either a category name or a dict with 'category' and
+    optional 'priority' (lower wins, default = position) and 'word'
+    (match whole words only, default False).
+    Returns [(keyword, category, priority, word)] sorted by priority.
+    """
+    rules = []
+    for position, (keyword, rule) in enumerate(mapping.items()):
+        if isinstance(rule, str):
+            rule = {'category': rule}
+        rules.append((
+            keyword.lower(),
+            rule['category'],
+            rule.get('priority', position),
+            rule.get('word', False),
+        ))
+    # Stable sort: equal priorities keep table order
+    rules.sort(key=lambda rule: rule[2])
+    return rules
+
+
+class KeywordCategorizer:
+    """Compiled keyword automaton + memo of already categorized descriptions"""
+
+    def __init__(self, mapping, default=DEFAULT_CATEGORY):
+        self.default = default
+        self.rules = _normalize_rules(mapping)
+        self.memo = {}
+        self._compile()
+
+    def _compile(self):
+        """
+        Aho-Corasick automaton over the lowercased keywords, turned into a full
+        transition table (state -> {char: next state}) so scanning is one dict
+        lookup per character. matches[state] lists the keywords ending there,
+        as (rank, length, word) in priority order.
+        """
+        goto = [{}]
+        matches = [[]]
+        for rank, (keyword, _, _, word) in enumerate(self.rules):
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    matches.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            matches[state].append((rank, len(keyword), word))
+
+        # Breadth-first: fill in failure transitions and inherit their matches
+        transitions = [dict(goto[0])] + [None] * (len(goto) - 1)
+        fail = [0] * len(goto)
+        queue = list(goto[0].values())
+        for state in queue:
+            transitions[state] = dict(transitions[fail[state]])
+            transitions[state].update(goto[state])
+            matches[state] = sorted(matches[state] + matches[fail[state]])
+            for ch, child in goto[state].items():
+                fail[child] = transitions[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        self.transitions = transitions
+        self.matches = matches
+
+    def _match(self, text):
+        text = text.lower()
+        transitions = self.transitions
+        matches = self.matches
+        best = None
+        state = 0
+        for end, ch in enumerate(text, 1):
+            state = transitions[state].get(ch, 0)
+            for rank, length, word in matches[state]:
+                if best is not None and rank >= best:
+                    break
+                if word and not _whole_word(text, end - length, end):
+                    continue
+                best = rank
+                break
+            if best == 0:
+                break
+        return self.default if best is None else self.rules[best][1]
+
+    def categorize(self, description):
+        """Category for one description (memoized)"""
+        category = self.memo.get(description)
+        if category is None:
+            category = self._match(description)
+            if len(self.memo) >= MEMO_LIMIT:
+                self.memo.clear()
+            self.memo[description] = category
+        return category
+
+    def categorize_column(self, descriptions):
+        """Categories for a column of strings, each distinct description matched once"""
+        codes, uniques = pd.factorize(pd.Series(descriptions, dtype=object))
+        categories = pd.Series([self.categorize(text) for text in uniques], dtype=object)
+        return categories.take(codes).to_numpy()
+
+
+def _whole_word(text, start, end):
+    """True if text[start:end] is not glued to letters/digits on either side"""
+    return (
+        (start == 0 or not text[start - 1].isalnum()) and
+        (end == len(text) or not text[end].isalnum())
+    )
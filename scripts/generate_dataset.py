@@ -1,8 +1,50 @@
+"""
+Generator dataset sintetis transaksi kandang (buat training, load test & benchmark).
+Run: py scripts/generate_dataset.py [--rows N] [--seed S] [--format json|ndjson|parquet|store]
+                                    [--output FILE] [--workers N] [--chunk-rows N]
+                                    [--duplicate-window N]
+
+Bisa juga diimport: generate(rows, seed) ngasih DataFrame per chunk (urut tanggal),
+write_dataset(path, fmt, rows, seed, workers) langsung nulis ke file.
+
+Dibikin per chunk pake numpy Generator (vektor, bukan dict per baris). Jumlah
+transaksi per hari diundi sekali di awal, terus hari-harinya dibagi jadi chunk
+(satu chunk = beberapa hari utuh, sekitar --chunk-rows baris), jadi:
+  - hasilnya udah urut tanggal tanpa harus sort semua data di memori
+  - tiap chunk punya seed sendiri (seed, nomor chunk), jadi hasilnya sama persis
+    mau dijalanin pake berapa proses pun
+  - memori kepake cuma sebesar chunk yang lagi dikerjain (satu hari ga dipecah,
+    jadi kalo transaksi per harinya lebih dari --chunk-rows, chunk-nya segede sehari)
+Duplikat nyalin transaksi acak di chunk yang sama, jadi jarak ke aslinya
+acak sepanjang rentang tanggal kayak versi lama (dataset lebih dari satu
+chunk: sepanjang rentang chunk-nya). --duplicate-window N bikin versi
+"input ulang" yang jaraknya cuma N baris.
+Output di-stream: NDJSON, Parquet (butuh pyarrow) atau JSON format lama
+(farm_ids, date_range, anomaly_thresholds, transactions, statistics).
+--format store nulis ke store Parquet partisi kandang/bulan
+(models/transaction_store.py), header JSON-nya masuk ke _dataset.json.
+"""
+
+import os
+import sys
 import json
-import random
-from datetime import datetime, timedelta
+import shutil
+import argparse
+from datetime import datetime
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
 
-random.seed(43)
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "models"))
+from transaction_store import TransactionStore, swap_in
+from time_features import local_epoch_ms
 
 #Nama disamarkan untuk netralitas
 farm_ids = ["KANDANG1", "KANDANG2", "KANDANG3"]
@@ -59,155 +101,357 @@ category_types = {
     "Lainnya": "income",
 }
 
-def random_date_in_range(start_date, end_date):
-    """Generate random timestamp between start and end date"""
-    time_between = end_date - start_date
-    random_seconds = random.randint(0, int(time_between.total_seconds()))
-    random_dt = start_date + timedelta(seconds=random_seconds)
-    return int(random_dt.timestamp() * 1000)
-
-# Range tanggal: 1 September 2025 - 31 Januari 2026
-start_date = datetime(2025, 9, 1)
-end_date = datetime(2026, 1, 31, 23, 59, 59)
-
-data = {
-    "farm_ids": farm_ids,
-    "date_range": {
-        "start": "2025-09-01",
-        "end": "2026-01-31"
-    },
-    "anomaly_thresholds": anomaly_thresholds,
-    "transactions": []
-}
+# Jenis-jenis anomali
+anomaly_choices = ["amount_outlier", "duplicate", "category_mismatch", "time_pattern"]
+AMOUNT_OUTLIER, DUPLICATE, CATEGORY_MISMATCH, TIME_PATTERN = range(4)
+
+# Range tanggal default: 1 September 2025 - 31 Januari 2026
+START_DATE = "2025-09-01"
+END_DATE = "2026-01-31"
 
 #Set total transaksi dan ratio anomali
 TOTAL_TRANSACTIONS = 1500
 ANOMALY_RATIO = 0.09
+SEED = 43
 
-for i in range(TOTAL_TRANSACTIONS):
-    is_anomaly = random.random() < ANOMALY_RATIO
-    farm_id = random.choice(farm_ids)
-    category = random.choice(list(categories.keys()))
-    low, high = categories[category]
-    txn_type = category_types[category]
-    anomaly_type = None
-    
-    if is_anomaly:
-        # Jenis-jenis anomali
-        anomaly_choices = ["amount_outlier", "duplicate", "category_mismatch", "time_pattern"]
-        anomaly_type = random.choice(anomaly_choices)
-        
-        if anomaly_type == "amount_outlier":
-            # Anomali berdasarkan threshold yang ditentukan
-            if category in anomaly_thresholds:
-                threshold = anomaly_thresholds[category]
-                amount = threshold * random.uniform(1.5, 5.0)
-            else:
-                # Untuk kategori tanpa threshold khusus, buat outlier ekstrem
-                amount = high * random.uniform(10, 50)
-        
-        elif anomaly_type == "duplicate" and len(data["transactions"]) > 50:
-            # Duplikasi transaksi yang sudah ada
-            dup = random.choice(data["transactions"][-50:])
-            txn = dup.copy()
-            txn["is_anomaly"] = 1
-            txn["anomaly_type"] = "duplicate"
-            txn["date"] = random_date_in_range(start_date, end_date)
-            data["transactions"].append(txn)
-            continue
-        
-        elif anomaly_type == "category_mismatch":
-            # Kategori tidak sesuai dengan tipe transaksi
-            if txn_type == "expense":
-                # Pengeluaran jadi pemasukan (aneh)
-                txn_type = "income"
-            else:
-                # Pemasukan jadi pengeluaran (aneh)
-                txn_type = "expense"
-            amount = random.randint(low, high)
-        
-        else:  # time_pattern
-            # Transaksi besar di waktu tidak biasa (tengah malam) salah satu anomali juga, mengerikan
-            amount = high * random.uniform(5, 15)
-            
+# Duplikat nyalin transaksi acak dari chunk yang sama (tanggal aslinya acak seragam
+# kayak versi lama). Diisi angka = sumbernya salah satu dari sekian baris sebelumnya,
+# jadi jaraknya cuma jam/hari - lebih gampang ketangkep jendela dobel 7 hari
+DUPLICATE_WINDOW = None
+
+# Kira-kira 250 MB per chunk yang lagi dikerjain
+CHUNK_ROWS = 100_000
+
+COLUMNS = ["id", "farm_id", "description", "amount", "type", "category",
+           "date", "date_readable", "is_anomaly", "anomaly_type"]
+
+# Tabel per kategori (urutan sama kayak dict di atas)
+_names = np.array(list(categories), dtype=object)
+_low = np.array([low for low, _ in categories.values()], dtype=np.int64)
+_high = np.array([high for _, high in categories.values()], dtype=np.int64)
+_threshold = np.array([anomaly_thresholds.get(c, 0) for c in categories], dtype=np.float64)
+_is_income = np.array([category_types[c] == "income" for c in categories])
+_descriptions = np.array([f"Transaksi {c}" for c in categories], dtype=object)
+
+
+def plan_chunks(rows, seed=SEED, start=START_DATE, end=END_DATE, chunk_rows=CHUNK_ROWS):
+    """
+    Undi jumlah transaksi per hari (tanggal acak seragam kayak versi lama),
+    terus kelompokin hari-hari berurutan jadi chunk. Balikin list
+    (nomor chunk, baris pertama, hari pertama, jumlah per hari)
+    """
+    days = (datetime.fromisoformat(end) - datetime.fromisoformat(start)).days + 1
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(0,)))
+    per_day = rng.multinomial(rows, np.full(days, 1 / days))
+
+    chunks = []
+    first_row = 0
+    first_day = 0
+    size = 0
+    for day in range(days):
+        if size and size + per_day[day] > chunk_rows:
+            chunks.append((len(chunks), first_row, first_day, per_day[first_day:day]))
+            first_row += size
+            first_day = day
+            size = 0
+        size += per_day[day]
+    if size or not chunks:
+        chunks.append((len(chunks), first_row, first_day, per_day[first_day:]))
+    return chunks
+
+
+def _day_epochs(start, first_day, days):
+    """Epoch detik jam 00:00 (zona waktu kandang, bukan TZ server) tiap hari di chunk"""
+    midnights = np.datetime64(start, "D") + np.arange(first_day, first_day + days).astype("timedelta64[D]")
+    return local_epoch_ms(midnights) // 1000
+
+
+def generate_chunk(chunk, rows, seed=SEED, start=START_DATE, anomaly_ratio=ANOMALY_RATIO,
+                   duplicate_window=DUPLICATE_WINDOW):
+    """Bikin satu chunk (DataFrame, udah urut tanggal)"""
+    index, first_row, first_day, per_day = chunk
+    n = int(per_day.sum())
+    rng = np.random.default_rng(np.random.SeedSequence(seed, spawn_key=(1, index)))
+
+    day = np.repeat(np.arange(first_day, first_day + len(per_day)), per_day)
+    is_anomaly = rng.random(n) < anomaly_ratio
+    anomaly = np.where(is_anomaly, rng.integers(0, len(anomaly_choices), n), -1)
+
+    # Jam: transaksi tengah malam (00:00 - 04:00) ANOMALI, normal jam wajar (05:00 - 23:00),
+    # duplikat jam berapa aja
+    hour = np.where(anomaly == TIME_PATTERN, rng.integers(0, 5, n), rng.integers(5, 24, n))
+    second_of_day = hour * 3600 + rng.integers(0, 60, n) * 60 + rng.integers(0, 60, n)
+    second_of_day = np.where(anomaly == DUPLICATE, rng.integers(0, 86400, n), second_of_day)
+
+    # Urutin dalam hari (day-nya udah urut), anomalinya ikut
+    order = np.lexsort((second_of_day, day))
+    second_of_day, anomaly, is_anomaly = second_of_day[order], anomaly[order], is_anomaly[order]
+
+    farm = rng.integers(0, len(farm_ids), n)
+    category = rng.integers(0, len(categories), n)
+    low, high = _low[category], _high[category]
+    income = _is_income[category].copy()
+
+    # Transaksi normal
+    amount = rng.integers(low, high, endpoint=True).astype(np.float64)
+
+    # Anomali berdasarkan threshold yang ditentukan, kategori tanpa threshold khusus dibikin outlier ekstrem
+    outlier = anomaly == AMOUNT_OUTLIER
+    threshold = _threshold[category]
+    amount = np.where(
+        outlier & (threshold > 0), threshold * rng.uniform(1.5, 5.0, n),
+        np.where(outlier, high * rng.uniform(10, 50, n), amount)
+    )
+
+    # Kategori tidak sesuai dengan tipe transaksi (jumlahnya tetep normal)
+    income = np.where(anomaly == CATEGORY_MISMATCH, ~income, income)
+
+    # Transaksi besar di waktu tidak biasa
+    amount = np.where(anomaly == TIME_PATTERN, high * rng.uniform(5, 15, n), amount)
+
+    # Duplikasi transaksi lain (farm, kategori, tipe, jumlah sama), tanggalnya sendiri.
+    # Duplikat yang ga punya sumber (baris pertama / chunk isinya duplikat semua) -> jadi outlier
+    position = np.arange(n)
+    duplicate = anomaly == DUPLICATE
+    originals = np.flatnonzero(~duplicate)
+    if duplicate_window:
+        orphan = duplicate & (position == 0)
     else:
-        # Transaksi normal
-        amount = random.randint(low, high)
-    
-    # Generate timestamp
-    if anomaly_type == "time_pattern":
-        # Transaksi tengah malam (00:00 - 04:00) - ANOMALI ini mah
-        random_dt = datetime.fromtimestamp(random_date_in_range(start_date, end_date) / 1000)
-        random_dt = random_dt.replace(hour=random.randint(0, 4), minute=random.randint(0, 59))
-        timestamp = int(random_dt.timestamp() * 1000)
+        orphan = duplicate if len(originals) == 0 else np.zeros(n, dtype=bool)
+    amount = np.where(orphan, high * rng.uniform(10, 50, n), amount)
+    anomaly = np.where(orphan, AMOUNT_OUTLIER, anomaly)
+    duplicate &= ~orphan
+
+    if duplicate_window:
+        source = position - rng.integers(1, duplicate_window, n, endpoint=True).clip(max=np.maximum(position, 1))
+        source = np.where(duplicate, source, position)
+        # Kalo sumbernya duplikat juga, ikutin sampe ketemu yang asli
+        while True:
+            chained = source != source[source]
+            if not chained.any():
+                break
+            source = np.where(chained, source[source], source)
     else:
-        # Transaksi normal: jam wajar (05:00 - 23:00)
-        random_dt = datetime.fromtimestamp(random_date_in_range(start_date, end_date) / 1000)
-        random_dt = random_dt.replace(hour=random.randint(5, 23), minute=random.randint(0, 59))
-        timestamp = int(random_dt.timestamp() * 1000)
-    
-    txn = {
-        "id": f"TXN_{i+1:05d}",
-        "farm_id": farm_id,
-        "description": f"Transaksi {category}",
-        "amount": float(amount),
-        "type": txn_type,
-        "category": category,
-        "date": timestamp,
-        "date_readable": datetime.fromtimestamp(timestamp / 1000).strftime("%Y-%m-%d %H:%M:%S"),
-        "is_anomaly": 1 if is_anomaly else 0
-    }
-    
-    if anomaly_type:
-        txn["anomaly_type"] = anomaly_type
-    
-    data["transactions"].append(txn)
-
-# Sort berdasarkan tanggal
-data["transactions"].sort(key=lambda x: x["date"])
-
-# Statistik
-total_anomalies = sum(1 for t in data["transactions"] if t["is_anomaly"])
-data["statistics"] = {
-    "total_transactions": len(data["transactions"]),
-    "total_anomalies": total_anomalies,
-    "anomaly_percentage": round(total_anomalies / len(data["transactions"]) * 100, 2),
-    "anomaly_types": {}
-}
+        # Sumbernya transaksi asli mana aja di chunk, sebelum atau sesudahnya
+        picks = originals[rng.integers(0, len(originals), n)] if len(originals) else position
+        source = np.where(duplicate, picks, position)
+    farm, category, income, amount = farm[source], category[source], income[source], amount[source]
+
+    row_ids = pd.Series(first_row + position + 1).astype(str).str.zfill(max(5, len(str(rows))))
+    stamps = _day_epochs(start, first_day, len(per_day))[day - first_day] + second_of_day
+    readable = np.datetime64(start) + day.astype("timedelta64[D]") + second_of_day.astype("timedelta64[s]")
+
+    return pd.DataFrame({
+        "id": ("TXN_" + row_ids).to_numpy(dtype=object),
+        "farm_id": np.array(farm_ids, dtype=object)[farm],
+        "description": _descriptions[category],
+        "amount": amount,
+        "type": np.where(income, "income", "expense").astype(object),
+        "category": _names[category],
+        "date": stamps * 1000,
+        "date_readable": pd.Series(np.datetime_as_string(readable, unit="s")).str.replace("T", " ").to_numpy(dtype=object),
+        "is_anomaly": is_anomaly.astype(np.int64),
+        "anomaly_type": np.array(anomaly_choices + [None], dtype=object)[anomaly],
+    }, columns=COLUMNS)
+
+
+def generate(rows=TOTAL_TRANSACTIONS, seed=SEED, start=START_DATE, end=END_DATE,
+             anomaly_ratio=ANOMALY_RATIO, chunk_rows=CHUNK_ROWS, duplicate_window=DUPLICATE_WINDOW):
+    """Generator DataFrame per chunk, urut tanggal (satu proses)"""
+    for chunk in plan_chunks(rows, seed, start, end, chunk_rows):
+        yield generate_chunk(chunk, rows, seed, start, anomaly_ratio, duplicate_window)
+
+
+def _chunk_job(job):
+    """Worker process: bikin chunk + langsung diserialisasi biar paralel juga"""
+    chunk, rows, seed, start, anomaly_ratio, duplicate_window, fmt = job
+    frame = generate_chunk(chunk, rows, seed, start, anomaly_ratio, duplicate_window)
+    counts = frame["anomaly_type"].value_counts().to_dict()
+    if fmt in ("parquet", "store"):
+        return frame, len(frame), counts
+    return _to_lines(frame), len(frame), counts
+
+
+def _json_column(values):
+    """Satu kolom -> potongan JSON per baris (None kalo nilainya kosong)"""
+    if values.dtype.kind == "f":
+        return values.map(repr).to_numpy(dtype=object)
+    if values.dtype.kind in "iu":
+        return values.astype(str).to_numpy(dtype=object)
+    if values.name in ("id", "date_readable"):
+        # Isinya huruf/angka doang, ga perlu di-escape
+        return ('"' + values.astype(str) + '"').to_numpy(dtype=object)
+    # String lain: json.dumps sekali per nilai unik
+    codes, uniques = pd.factorize(values)
+    table = np.array([json.dumps(value, ensure_ascii=False) for value in uniques] + [None], dtype=object)
+    return table[codes]
+
+
+def _to_lines(frame):
+    """
+    DataFrame -> list baris JSON, dirakit per kolom (bukan json.dumps per baris).
+    Field anomaly_type cuma ada kalo anomali, kayak versi lama
+    """
+    lines = None
+    for column in COLUMNS:
+        encoded = _json_column(frame[column])
+        if column == "anomaly_type":
+            present = pd.notna(encoded)
+            fragment = np.where(present, ', "anomaly_type": ', "").astype(object) + np.where(present, encoded, "").astype(object)
+        elif lines is None:
+            lines = '{"' + column + '": ' + encoded
+            continue
+        else:
+            fragment = ', "' + column + '": ' + encoded
+        lines = lines + fragment
+    return (lines + "}").tolist() if lines is not None else []
+
+
+def _ordered(pool, jobs, window):
+    """Kayak pool.map tapi yang jalan paling banyak `window` job, biar memori kebatas"""
+    pending = []
+    for job in jobs:
+        pending.append(pool.submit(_chunk_job, job))
+        if len(pending) >= window:
+            yield pending.pop(0).result()
+    for future in pending:
+        yield future.result()
+
+
+class DatasetWriter:
+    """Nulis chunk ke NDJSON / Parquet / JSON format lama"""
+
+    def __init__(self, path, fmt, start, end):
+        self.fmt = fmt
+        self.path = path
+        self.first = True
+        self.parquet = None
+        self.header = {
+            "farm_ids": farm_ids,
+            "date_range": {"start": start, "end": end},
+            "anomaly_thresholds": anomaly_thresholds,
+        }
+        if fmt == "parquet":
+            return
+        if fmt == "store":
+            # Dibangun di folder sementara, baru dituker pas close
+            self.store = TransactionStore(path + ".tmp")
+            shutil.rmtree(self.store.root, ignore_errors=True)
+            return
+        self.file = open(path, "w", encoding="utf-8")
+        if fmt == "json":
+            header = json.dumps(self.header, ensure_ascii=False, indent=2)
+            self.file.write(header[:-2] + ',\n  "transactions": [\n')
+
+    def write(self, chunk):
+        if self.fmt == "store":
+            self.store.write(chunk)
+            return
+        if self.fmt == "parquet":
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            if self.parquet is None:
+                self.parquet = pq.ParquetWriter(self.path, table.schema)
+            self.parquet.write_table(table)
+            return
+        if not chunk:
+            return
+        if self.fmt == "json":
+            text = ("" if self.first else ",\n") + ",\n".join("    " + line for line in chunk)
+        else:
+            text = "\n".join(chunk) + "\n"
+        self.file.write(text)
+        self.first = False
+
+    def close(self, statistics):
+        if self.fmt == "store":
+            self.store.write_meta({**self.header, "statistics": statistics})
+            swap_in(self.store.root, self.path)
+            return
+        if self.fmt == "parquet":
+            if self.parquet is not None:
+                self.parquet.close()
+            return
+        if self.fmt == "json":
+            stats = json.dumps(statistics, ensure_ascii=False, indent=2).replace("\n", "\n  ")
+            self.file.write('\n  ],\n  "statistics": ' + stats + "\n}")
+        self.file.close()
+
+
+def write_dataset(path, fmt="ndjson", rows=TOTAL_TRANSACTIONS, seed=SEED, workers=1,
+                  start=START_DATE, end=END_DATE, anomaly_ratio=ANOMALY_RATIO, chunk_rows=CHUNK_ROWS,
+                  duplicate_window=DUPLICATE_WINDOW):
+    """Bikin dataset dan stream ke file. Balikin statistik (format lama)"""
+    if fmt in ("parquet", "store") and pa is None:
+        raise RuntimeError("format parquet butuh pyarrow (pip install pyarrow)")
+
+    jobs = [
+        (chunk, rows, seed, start, anomaly_ratio, duplicate_window, fmt)
+        for chunk in plan_chunks(rows, seed, start, end, chunk_rows)
+    ]
+    writer = DatasetWriter(path, fmt, start, end)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    total = 0
+    anomaly_types = {}
+    try:
+        results = _ordered(pool, jobs, workers * 2) if pool else map(_chunk_job, jobs)
+        for chunk, count, counts in results:
+            writer.write(chunk)
+            total += count
+            for name, value in counts.items():
+                anomaly_types[name] = anomaly_types.get(name, 0) + value
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        statistics = {
+            "total_transactions": total,
+            "total_anomalies": sum(anomaly_types.values()),
+            "anomaly_percentage": round(sum(anomaly_types.values()) / total * 100, 2) if total else 0,
+            "anomaly_types": {name: anomaly_types[name] for name in anomaly_choices if name in anomaly_types},
+        }
+        writer.close(statistics)
+    return statistics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate dataset anomali transaksi kandang")
+    parser.add_argument("--rows", type=int, default=TOTAL_TRANSACTIONS, help="jumlah transaksi")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--format", choices=["json", "ndjson", "parquet", "store"], default="json",
+                        help="store = folder Parquet partisi kandang/bulan")
+    parser.add_argument("--output", help="default kandang_anomaly_dataset_sep2025_jan2026.json / .ndjson / .parquet "
+                                         "/ .store (folder)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS, help="kira-kira baris per chunk")
+    parser.add_argument("--anomaly-ratio", type=float, default=ANOMALY_RATIO)
+    parser.add_argument("--start", default=START_DATE, help="tanggal awal (YYYY-MM-DD)")
+    parser.add_argument("--end", default=END_DATE, help="tanggal akhir (YYYY-MM-DD)")
+    parser.add_argument("--duplicate-window", type=int, default=DUPLICATE_WINDOW,
+                        help="duplikat nyalin salah satu dari N baris sebelumnya (jarak jam/hari); "
+                             "default sumbernya acak dari seluruh chunk kayak versi lama")
+    args = parser.parse_args()
+
+    output = args.output or f"kandang_anomaly_dataset_sep2025_jan2026.{args.format}"
+    try:
+        statistics = write_dataset(
+            output, args.format, args.rows, args.seed, args.workers,
+            args.start, args.end, args.anomaly_ratio, args.chunk_rows, args.duplicate_window
+        )
+    except RuntimeError as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=" * 60)
+    print("DATASET ANOMALI PETERNAKAN GENERATED")
+    print("=" * 60)
+    print(f"Periode: {args.start} s/d {args.end}")
+    print(f"Total Transaksi: {statistics['total_transactions']}")
+    print(f"Total Anomali: {statistics['total_anomalies']} ({statistics['anomaly_percentage']}%)")
+    print("\nJenis Anomali:")
+    for atype, count in statistics["anomaly_types"].items():
+        print(f"  - {atype}: {count}")
+    print("\n" + "=" * 60)
+    print(f"\n✅ Dataset disimpan ke: {output}")
+
 
-# Hitung per jenis anomali
-for txn in data["transactions"]:
-    if txn.get("anomaly_type"):
-        atype = txn["anomaly_type"]
-        data["statistics"]["anomaly_types"][atype] = data["statistics"]["anomaly_types"].get(atype, 0) + 1
-
-# Export ke JSON
-output_json = json.dumps(data, ensure_ascii=False, indent=2)
-
-print("=" * 60)
-print("DATASET ANOMALI PETERNAKAN GENERATED")
-print("=" * 60)
-print(f"Periode: {data['date_range']['start']} s/d {data['date_range']['end']}")
-print(f"Total Transaksi: {data['statistics']['total_transactions']}")
-print(f"Total Anomali: {data['statistics']['total_anomalies']} ({data['statistics']['anomaly_percentage']}%)")
-print("\nJenis Anomali:")
-for atype, count in data["statistics"]["anomaly_types"].items():
-    print(f"  - {atype}: {count}")
-print("\n" + "=" * 60)
-print("\nContoh 5 transaksi pertama:")
-print("=" * 60)
-for txn in data["transactions"][:5]:
-    print(f"\n{txn['id']} - {txn['category']}")
-    print(f"  Amount: Rp {txn['amount']:,.0f}")
-    print(f"  Type: {txn['type']}")
-    print(f"  Date: {txn['date_readable']}")
-    print(f"  Anomaly: {'YA (' + txn.get('anomaly_type', '') + ')' if txn['is_anomaly'] else 'TIDAK'}")
-
-print("\n" + "=" * 60)
-print("Dataset siap disimpan sebagai JSON!")
-print("=" * 60)
-
-# Simpan ke file
-with open("kandang_anomaly_dataset_sep2025_jan2026.json", "w", encoding="utf-8") as f:
-    f.write(output_json)
-print("\n✅ Dataset disimpan ke: kandang_anomaly_dataset_sep2025_jan2026.json")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
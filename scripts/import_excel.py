@@ -1,14 +1,56 @@
 """
 Script to import Excel data to Convex database
-Run: py scripts/import_excel.py
+Run: py scripts/import_excel.py [--format json|ndjson|store] [--output FILE] [--workers N] [--all-sheets]
+     py scripts/import_excel.py --incremental [--manifest FILE] [...]
+
+Sheets are streamed with python-calamine when it is installed (much faster),
+otherwise with openpyxl read-only mode. The month/year carry-forward,
+MASUK/KELUAR split and date construction run as vectorized column operations,
+and workbooks are parsed in parallel. Output is written incrementally.
+
+With --incremental a manifest (file size/mtime/sha1 plus, per sheet, the rows
+already imported) is kept between runs. Unchanged workbooks are skipped, sheets
+that only got new rows at the bottom are parsed from the last imported row,
+and only new/modified transactions are written, each with a stable id
+(kandang/sheet/row), plus the ids of transactions that disappeared.
+
+--format store writes a Parquet store partitioned by kandang and month
+(models/transaction_store.py, needs pyarrow) that training and batch scoring
+read directly; farm_id is the kandang name. A full import rebuilds the store
+and swaps it in when done, --incremental upserts the delta into it in place.
+JSON/NDJSON stay available as export formats.
+
+--cube FILE also maintains the monthly rollup cube (scripts/rollup_cube.py):
+rebuilt on a full import, updated with the delta on --incremental.
 """
 
-import pandas as pd
+import os
+import sys
 import json
-from datetime import datetime
-import re
+import shutil
+import hashlib
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+from categorizer import KeywordCategorizer
 
-# Category mapping based on keywords in KETERANGAN
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'models'))
+from transaction_store import TransactionStore, swap_in
+from time_features import local_epoch_ms
+
+try:
+    from python_calamine import CalamineWorkbook
+except ImportError:
+    CalamineWorkbook = None
+
+# Category mapping based on keywords in KETERANGAN. When several keywords match,
+# the one listed first wins. A value can also be a dict to set an explicit
+# priority (lower wins) or whole-word matching, e.g.
+#   'dp': {'category': 'Investasi', 'priority': 0, 'word': True}
 CATEGORY_MAPPING = {
     # Expense categories
     'pakan': 'Pakan',
@@ -46,118 +88,527 @@ CATEGORY_MAPPING = {
     'bunga': 'Bunga Bank',
 }
 
+# Month names in the TGL column
+MONTHS = {'JANUARI': 1, 'FEBRUARI': 2, 'MARET': 3, 'APRIL': 4, 'MEI': 5, 'JUNI': 6,
+          'JULI': 7, 'AGUSTUS': 8, 'SEPTEMBER': 9, 'OKTOBER': 10, 'NOVEMBER': 11, 'DESEMBER': 12}
+
+DEFAULT_YEAR = 2025
+
+RAW_COLUMNS = ['tgl', 'day', 'keterangan', 'masuk', 'keluar']
+TX_COLUMNS = ['kandang', 'description', 'amount', 'type', 'category', 'date']
+
+MANIFEST_VERSION = 1
+
+# Excel files to process
+FILES = [
+    ('Data Keuangan/AYAM PERTAMA - LAPKEU 2025.xlsx', 'AYAM PERTAMA'),
+    ('Data Keuangan/AYAM KEDUA - LAPKEU 2025.xlsx', 'AYAM KEDUA'),
+    ('Data Keuangan/Kandang KEVIN.xlsx', 'Kandang KEVIN'),
+]
+
+
+CATEGORIZER = KeywordCategorizer(CATEGORY_MAPPING)
+
+
 def guess_category(description):
     """Guess category based on keywords in description"""
-    desc_lower = description.lower()
-    for keyword, category in CATEGORY_MAPPING.items():
-        if keyword in desc_lower:
-            return category
-    return 'Lain-lain'
+    return CATEGORIZER.categorize(description)
 
-def parse_excel(file_path, kandang_name):
-    """Parse Excel file and return transactions list"""
-    df = pd.read_excel(file_path)
-    transactions = []
-    
-    current_month = None
-    current_year = 2025
-    
-    for _, row in df.iterrows():
-        # Skip headers and totals
-        keterangan = str(row.get('KETERANGAN', ''))
-        if pd.isna(keterangan) or 'SALDO' in keterangan.upper() or keterangan.strip() == '':
-            continue
-        if 'LIST' in keterangan.upper() or 'TOTAL' in keterangan.upper():
-            continue
-            
-        # Get date info
-        tgl_val = row.iloc[0]
-        day_val = row.iloc[1] if len(row) > 1 else None
-        
-        # Parse month from TGL column
-        if not pd.isna(tgl_val):
-            if isinstance(tgl_val, str):
-                months = {'JANUARI':1,'FEBRUARI':2,'MARET':3,'APRIL':4,'MEI':5,'JUNI':6,
-                         'JULI':7,'AGUSTUS':8,'SEPTEMBER':9,'OKTOBER':10,'NOVEMBER':11,'DESEMBER':12}
-                for m_name, m_num in months.items():
-                    if m_name in tgl_val.upper():
-                        current_month = m_num
-                        break
-            elif isinstance(tgl_val, (int, float)) and tgl_val > 2000:
-                current_year = int(tgl_val)
-        
-        # Get day
-        day = 1
-        if not pd.isna(day_val) and isinstance(day_val, (int, float)):
-            day = int(day_val)
-        
-        # Get amount - check both MASUK and KELUAR
-        masuk = row.get('MASUK', 0)
-        keluar = row.get('KELUAR', 0)
-        
-        if pd.isna(masuk): masuk = 0
-        if pd.isna(keluar): keluar = 0
-        
-        # Skip if no amount
-        if masuk == 0 and keluar == 0:
+
+def _sheet_rows(file_path, all_sheets=False):
+    """Yield one row iterator per sheet, using calamine if available"""
+    if CalamineWorkbook is not None:
+        workbook = CalamineWorkbook.from_path(file_path)
+        count = len(workbook.sheet_names) if all_sheets else min(1, len(workbook.sheet_names))
+        for index in range(count):
+            # Keep leading empty rows/columns so column positions match openpyxl
+            yield iter(workbook.get_sheet_by_index(index).to_python(skip_empty_area=False))
+        return
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheets = workbook.worksheets if all_sheets else workbook.worksheets[:1]
+        for sheet in sheets:
+            yield sheet.iter_rows(values_only=True)
+    finally:
+        workbook.close()
+
+
+def read_sheets(file_path, all_sheets=False):
+    """
+    Stream sheets and keep only the columns we need: TGL (1st column),
+    day (2nd column), KETERANGAN, MASUK and KELUAR. Empty cells become None
+    (same as NaN in pandas.read_excel). `row` is the Excel row number
+    """
+    for rows in _sheet_rows(file_path, all_sheets):
+        header = next(rows, None)
+        if header is None:
             continue
-            
-        # Determine type and amount
-        if masuk > 0:
-            tx_type = 'income'
-            amount = float(masuk)
-        else:
-            tx_type = 'expense'
-            amount = float(keluar)
-        
-        # Create date timestamp
-        if current_month:
-            try:
-                date_obj = datetime(current_year, current_month, day)
-                date_ts = int(date_obj.timestamp() * 1000)
-            except:
-                date_ts = int(datetime(current_year, 1, 1).timestamp() * 1000)
+
+        header = list(header)
+        picks = [0, 1] + [
+            header.index(name) if name in header else None
+            for name in ('KETERANGAN', 'MASUK', 'KELUAR')
+        ]
+        columns = [[], [], [], [], []]
+
+        for row in rows:
+            width = len(row)
+            for column, pos in zip(columns, picks):
+                value = row[pos] if pos is not None and pos < width else None
+                column.append(None if value == '' else value)
+
+        # Missing KETERANGAN column behaves like empty text (row gets skipped)
+        if picks[2] is None:
+            columns[2] = [''] * len(columns[0])
+
+        df = pd.DataFrame(dict(zip(RAW_COLUMNS, columns)), dtype=object)
+        df['row'] = np.arange(2, len(df) + 2)
+        yield df
+
+
+def _numeric(series):
+    """Keep real numbers only (no bools/strings/dates), everything else becomes NaN"""
+    is_number = series.map(type).isin([int, float])
+    return pd.to_numeric(series.where(is_number), errors='coerce')
+
+
+def _local_timestamps(years, months, days):
+    """Epoch ms for farm-local dates, converted once per distinct date"""
+    dates = pd.to_datetime(
+        pd.DataFrame({'year': years, 'month': months, 'day': days}),
+        errors='coerce'
+    )
+    # Invalid dates (e.g. 31 November) fall back to January 1st
+    fallback = pd.to_datetime(pd.DataFrame({'year': years, 'month': 1, 'day': 1}))
+    dates = dates.fillna(fallback)
+
+    # Midnight in the farm timezone (ANOMALY_FARM_TZ), not the importing machine's
+    codes, uniques = pd.factorize(dates)
+    return local_epoch_ms(uniques)[codes]
+
+
+def parse_sheet(df, kandang_name, state):
+    """
+    Turn one sheet into transactions. `state` is the (month, year) carried over
+    from previous sheets; returns (transactions DataFrame, new state)
+    """
+    current_month, current_year = state
+
+    # Skip headers and totals (before reading month/year, same as row-by-row)
+    keterangan = df['keterangan'].where(df['keterangan'].notna(), 'nan').astype(str)
+    upper = keterangan.str.upper()
+    skip = (
+        upper.str.contains('SALDO', regex=False) |
+        (keterangan.str.strip() == '') |
+        upper.str.contains('LIST', regex=False) |
+        upper.str.contains('TOTAL', regex=False)
+    )
+    df = df[~skip].reset_index(drop=True)
+    keterangan = keterangan[~skip].reset_index(drop=True)
+    if df.empty:
+        return None, state
+
+    # Parse month from TGL column - first month name found wins, then carry forward
+    tgl = df['tgl']
+    tgl_text = tgl.where(tgl.map(type) == str, '').astype(str).str.upper()
+    month_marker = np.select(
+        [tgl_text.str.contains(name, regex=False) for name in MONTHS],
+        list(MONTHS.values()),
+        default=0
+    )
+    month = pd.Series(month_marker, dtype=float).replace(0, np.nan).ffill()
+    if current_month is not None:
+        month = month.fillna(current_month)
+
+    # Year rows are numbers > 2000 in the TGL column
+    year_marker = _numeric(tgl)
+    year = np.trunc(year_marker.where(year_marker > 2000)).ffill().fillna(current_year)
+
+    # Get day
+    day = np.trunc(_numeric(df['day'])).fillna(1)
+
+    new_state = (
+        None if pd.isna(month.iloc[-1]) else int(month.iloc[-1]),
+        int(year.iloc[-1])
+    )
+
+    # Get amount - check both MASUK and KELUAR, skip if no amount
+    masuk = _numeric(df['masuk']).fillna(0)
+    keluar = _numeric(df['keluar']).fillna(0)
+    has_amount = ~((masuk == 0) & (keluar == 0))
+    if not has_amount.any():
+        return None, new_state
+
+    masuk, keluar = masuk[has_amount], keluar[has_amount]
+    month, year, day = month[has_amount], year[has_amount], day[has_amount]
+    keterangan = keterangan[has_amount]
+    rows = df['row'][has_amount]
+
+    # Determine type and amount
+    is_income = masuk > 0
+    tx_type = np.where(is_income, 'income', 'expense')
+    amount = np.where(is_income, masuk, keluar).astype(float)
+
+    # Create date timestamp - no month yet means January 1st
+    has_month = month.notna()
+    date = _local_timestamps(
+        year.astype(int).to_numpy(),
+        month.fillna(1).astype(int).to_numpy(),
+        day.where(has_month, 1).astype(int).to_numpy()
+    )
+
+    # Guess category once per distinct description
+    category = CATEGORIZER.categorize_column(keterangan)
+
+    transactions = pd.DataFrame({
+        'kandang': kandang_name,
+        'description': keterangan.str.strip().to_numpy(),
+        'amount': amount,
+        'type': tx_type,
+        'category': category,
+        'date': date,
+        'row': rows.to_numpy(),
+    })
+    return transactions, new_state
+
+
+def parse_excel(file_path, kandang_name, all_sheets=False):
+    """Parse Excel file and return transactions list"""
+    state = (None, DEFAULT_YEAR)
+    frames = []
+    for sheet in read_sheets(file_path, all_sheets):
+        transactions, state = parse_sheet(sheet, kandang_name, state)
+        if transactions is not None:
+            frames.append(transactions)
+
+    if not frames:
+        return []
+    return pd.concat(frames, ignore_index=True)[TX_COLUMNS].to_dict('records')
+
+
+def file_digest(file_path):
+    """sha1 of the file contents"""
+    digest = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _hashes(df, columns):
+    """One 64-bit hash per row of the given columns"""
+    return pd.util.hash_pandas_object(df[columns].astype(str), index=False).to_numpy()
+
+
+def _prefix_digest(row_hashes, count):
+    """Digest of the first `count` raw rows of a sheet"""
+    return hashlib.sha1(row_hashes[:count].tobytes()).hexdigest()
+
+
+def parse_excel_incremental(file_path, kandang_name, entry, all_sheets=False):
+    """
+    Parse only what changed since the manifest entry of this file.
+    Returns (transactions, removed_ids, new_entry): transactions are the new or
+    modified ones, each with a stable 'id', removed_ids the ids that are gone
+    """
+    stat = os.stat(file_path)
+    entry = entry if entry and entry.get('all_sheets') == all_sheets else None
+
+    # Same size and mtime, or same contents: nothing to do
+    if entry and entry['size'] == stat.st_size and entry['mtime'] == stat.st_mtime:
+        return [], [], entry
+    sha1 = file_digest(file_path)
+    if entry and entry['sha1'] == sha1:
+        return [], [], {**entry, 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+    old_sheets = entry['sheets'] if entry else []
+    state = (None, DEFAULT_YEAR)
+    frames, removed, sheets = [], [], []
+
+    for index, sheet in enumerate(read_sheets(file_path, all_sheets)):
+        old = old_sheets[index] if index < len(old_sheets) else None
+        old_digests = old['transactions'] if old else {}
+        row_hashes = _hashes(sheet, RAW_COLUMNS)
+
+        # Rows were only appended if everything up to the last imported row is
+        # untouched and the month/year carried in from earlier sheets is the same
+        known = old['rows'] if old else 0
+        appended = (
+            old is not None and known <= len(sheet) and
+            old['start_state'] == list(state) and
+            old['prefix'] == _prefix_digest(row_hashes, known)
+        )
+        if appended:
+            transactions, end_state = parse_sheet(sheet.iloc[known:], kandang_name, tuple(old['end_state']))
+            current = dict(old_digests)
         else:
-            date_ts = int(datetime(current_year, 1, 1).timestamp() * 1000)
-        
-        # Guess category
-        category = guess_category(keterangan)
-        
-        transactions.append({
-            'kandang': kandang_name,
-            'description': keterangan.strip(),
-            'amount': amount,
-            'type': tx_type,
-            'category': category,
-            'date': date_ts,
+            transactions, end_state = parse_sheet(sheet, kandang_name, state)
+            current = {}
+
+        if transactions is not None:
+            transactions.insert(0, 'id', [f'{kandang_name}/{index}/{row}' for row in transactions['row']])
+            digests = [format(h, '016x') for h in _hashes(transactions, TX_COLUMNS)]
+            changed = [old_digests.get(tx_id) != digest for tx_id, digest in zip(transactions['id'], digests)]
+            current.update(zip(transactions['id'], digests))
+            frames.append(transactions[changed])
+
+        removed.extend(tx_id for tx_id in old_digests if tx_id not in current)
+        sheets.append({
+            'rows': len(sheet),
+            'prefix': _prefix_digest(row_hashes, len(sheet)),
+            'start_state': list(state),
+            'end_state': list(end_state),
+            'transactions': current,
         })
-    
-    return transactions
+        state = end_state
 
-# Process all Excel files
-files = [
-    ('Data Keuangan/AYAM PERTAMA - LAPKEU 2025.xlsx', 'AYAM PERTAMA'),
-    ('Data Keuangan/AYAM KEDUA - LAPKEU 2025.xlsx', 'AYAM KEDUA'),
-    ('Data Keuangan/Kandang KEVIN.xlsx', 'Kandang KEVIN'),
-]
+    # Sheets that no longer exist
+    for old in old_sheets[len(sheets):]:
+        removed.extend(old['transactions'])
+
+    new_entry = {
+        'kandang': kandang_name,
+        'size': stat.st_size,
+        'mtime': stat.st_mtime,
+        'sha1': sha1,
+        'all_sheets': all_sheets,
+        'sheets': sheets,
+    }
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return [], removed, new_entry
+    delta = pd.concat(frames, ignore_index=True)[['id'] + TX_COLUMNS]
+    return delta.to_dict('records'), removed, new_entry
+
+
+def load_manifest(path):
+    """Previous import state, empty if missing or from another version"""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    if manifest.get('version') != MANIFEST_VERSION:
+        return {'version': MANIFEST_VERSION, 'files': {}}
+    return manifest
+
+
+def save_manifest(manifest, path):
+    """Write the manifest atomically (temp file + rename)"""
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
-all_transactions = []
-for file_path, kandang_name in files:
+
+def _parse_job(job):
+    """Worker entry for the process pool"""
+    file_path, kandang_name, all_sheets = job
     try:
-        txs = parse_excel(file_path, kandang_name)
-        all_transactions.extend(txs)
-        print(f"✓ {kandang_name}: {len(txs)} transactions")
+        return parse_excel(file_path, kandang_name, all_sheets), None
     except Exception as e:
-        print(f"✗ Error processing {file_path}: {e}")
+        return None, str(e)
 
-# Save to JSON for import
-output = {
-    'kandang': ['AYAM PERTAMA', 'AYAM KEDUA', 'Kandang KEVIN'],
-    'transactions': all_transactions
-}
 
-with open('import_data.json', 'w', encoding='utf-8') as f:
-    json.dump(output, f, ensure_ascii=False, indent=2)
+def _incremental_job(job):
+    """Worker entry for the process pool (incremental mode)"""
+    file_path, kandang_name, all_sheets, entry = job
+    try:
+        return parse_excel_incremental(file_path, kandang_name, entry, all_sheets), None
+    except Exception as e:
+        return None, str(e)
+
+
+class TransactionWriter:
+    """Write transactions as they come, either NDJSON lines or one JSON document"""
+
+    def __init__(self, path, fmt, kandang):
+        self.fmt = fmt
+        self.file = open(path, 'w', encoding='utf-8')
+        self.first = True
+        if fmt == 'json':
+            self.file.write('{"kandang": ' + json.dumps(kandang, ensure_ascii=False) + ', "transactions": [\n')
+
+    def write(self, transactions):
+        for tx in transactions:
+            line = json.dumps(tx, ensure_ascii=False)
+            if self.fmt == 'json':
+                line = ('' if self.first else ',\n') + line
+            else:
+                line += '\n'
+            self.file.write(line)
+            self.first = False
+        self.file.flush()
+
+    def close(self, removed=None):
+        """`removed` (incremental mode) lists ids of transactions that are gone"""
+        if self.fmt == 'json':
+            self.file.write('\n]')
+            if removed is not None:
+                self.file.write(', "removed": ' + json.dumps(removed, ensure_ascii=False))
+            self.file.write('}\n')
+        elif removed:
+            for tx_id in removed:
+                self.file.write(json.dumps({'id': tx_id, 'removed': True}, ensure_ascii=False) + '\n')
+        self.file.close()
+
+
+class StoreWriter:
+    """Write transactions into a Parquet transaction store, same interface as TransactionWriter"""
+
+    def __init__(self, path, incremental=False):
+        self.path = path
+        # Full import builds a fresh store next to the old one and swaps it in on close
+        self.build_path = path if incremental else path + '.tmp'
+        if not incremental:
+            shutil.rmtree(self.build_path, ignore_errors=True)
+        self.incremental = incremental
+        self.store = TransactionStore(self.build_path)
+        self.pending = []
+
+    def write(self, transactions):
+        transactions = [{**tx, 'farm_id': tx['kandang']} for tx in transactions]
+        if self.incremental:
+            # Upserted once on close, together with the removed ids
+            self.pending.extend(transactions)
+        else:
+            self.store.write(transactions)
+
+    def close(self, removed=None):
+        if self.incremental:
+            self.store.upsert(self.pending, removed or [])
+            return
+        swap_in(self.build_path, self.path)
+
+
+def open_writer(path, fmt, incremental=False):
+    """TransactionWriter for json/ndjson, StoreWriter for the Parquet store"""
+    if fmt == 'store':
+        return StoreWriter(path, incremental)
+    return TransactionWriter(path, fmt, [name for _, name in FILES])
+
+
+def _run(jobs, job, workers):
+    """Run jobs on a process pool (or inline), results in job order"""
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            yield from pool.map(job, jobs)
+    else:
+        yield from map(job, jobs)
+
+
+def _open_cube(path, fresh=False):
+    """Rollup cube to keep in sync with the import (None without --cube)"""
+    if not path:
+        return None
+    from rollup_cube import RollupCube
+    return RollupCube() if fresh else RollupCube.load(path)
+
+
+def import_full(args):
+    output_path = args.output or ('import_store' if args.format == 'store' else f'import_data.{args.format}')
+    # The store and the cube need stable ids (kandang/sheet/row) so later --incremental runs
+    # replace transactions instead of adding them twice
+    with_ids = args.format == 'store' or bool(args.cube)
+    cube = _open_cube(args.cube, fresh=True)
+    jobs = [
+        (file_path, kandang_name, args.all_sheets) + ((None,) if with_ids else ())
+        for file_path, kandang_name in FILES
+    ]
+    writer = open_writer(output_path, args.format)
+
+    total = 0
+    try:
+        # Results come back in file order, each written as soon as it is ready
+        results = _run(jobs, _incremental_job if with_ids else _parse_job, args.workers)
+        for (file_path, kandang_name, *_), (txs, error) in zip(jobs, results):
+            if error is not None:
+                print(f"✗ Error processing {file_path}: {error}")
+                continue
+            if with_ids:
+                txs = txs[0]
+            writer.write(txs)
+            if cube is not None:
+                cube.add(txs)
+            total += len(txs)
+            print(f"✓ {kandang_name}: {len(txs)} transactions")
+    finally:
+        writer.close()
+
+    if cube is not None:
+        cube.save(args.cube)
+        print(f"✓ Rollup cube: {len(cube)} cells -> {args.cube}")
+
+    print(f"\n✓ Total: {total} transactions")
+    print(f"✓ Saved to {output_path}")
+
+
+def import_incremental(args):
+    # The store is updated in place, json/ndjson get a separate delta file
+    output_path = args.output or ('import_store' if args.format == 'store' else f'import_delta.{args.format}')
+    manifest = load_manifest(args.manifest)
+    files = manifest['files']
+    jobs = [
+        (file_path, kandang_name, args.all_sheets, files.get(file_path))
+        for file_path, kandang_name in FILES
+    ]
+    writer = open_writer(output_path, args.format, incremental=True)
+    cube = _open_cube(args.cube)
+
+    total = 0
+    removed = []
+    try:
+        for (file_path, kandang_name, _, _), (result, error) in zip(jobs, _run(jobs, _incremental_job, args.workers)):
+            if error is not None:
+                # Keep the old entry so the next run retries this file
+                print(f"✗ Error processing {file_path}: {error}")
+                continue
+            txs, gone, files[file_path] = result
+            if not txs and not gone:
+                print(f"= {kandang_name}: no changes")
+                continue
+            writer.write(txs)
+            if cube is not None:
+                cube.apply(txs, gone)
+            removed.extend(gone)
+            total += len(txs)
+            print(f"✓ {kandang_name}: {len(txs)} new/modified, {len(gone)} removed")
+    finally:
+        writer.close(removed)
+
+    if cube is not None:
+        cube.save(args.cube)
+    # Only remember what was imported once the delta is safely written
+    save_manifest(manifest, args.manifest)
+    print(f"\n✓ Delta: {total} transactions, {len(removed)} removed")
+    print(f"✓ Saved to {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Import LAPKEU Excel files')
+    parser.add_argument('--format', choices=['json', 'ndjson', 'store'], default='json',
+                        help='store = Parquet store partitioned by kandang/month (needs pyarrow)')
+    parser.add_argument('--output', help='output file (default import_data.json / import_data.ndjson, '
+                                         'import_delta.* with --incremental) or store directory '
+                                         '(default import_store)')
+    parser.add_argument('--workers', type=int, default=min(len(FILES), os.cpu_count() or 1),
+                        help='number of processes parsing workbooks in parallel')
+    parser.add_argument('--all-sheets', action='store_true',
+                        help='parse every sheet (default: first sheet only)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only output transactions that changed since the last incremental run')
+    parser.add_argument('--manifest', default='import_manifest.json',
+                        help='state file for --incremental (default import_manifest.json)')
+    parser.add_argument('--cube', help='also keep this monthly rollup cube file up to date '
+                                       '(see rollup_cube.py)')
+    args = parser.parse_args()
+
+    if args.incremental:
+        import_incremental(args)
+    else:
+        import_full(args)
+
 
-print(f"\n✓ Total: {len(all_transactions)} transactions")
-print(f"✓ Saved to import_data.json")
+if __name__ == '__main__':
+    main()
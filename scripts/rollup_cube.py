@@ -0,0 +1,443 @@
+"""
+Rollup bulanan transaksi kandang (cube) di atas hasil import_excel.parse_excel.
+Run: py scripts/rollup_cube.py build [--all-sheets] [--cube FILE]
+     py scripts/rollup_cube.py update DELTA.json|.ndjson [--cube FILE]
+     py scripts/rollup_cube.py query [--kandang K] [--category C] [--type T]
+                                     [--start YYYY-MM] [--end YYYY-MM] [--by kandang,month]
+     py scripts/rollup_cube.py reconcile [--rekapan FILE] [--kandang K]
+     py scripts/rollup_cube.py context [--stats FILE]
+
+Tiap sel cube = satu (kandang, kategori, tipe, bulan) dan isinya count, sum,
+min, max sama m2 (buat varians, rumus Welford/Chan). Mean = sum / count. Jadi
+pertanyaan kayak "pengeluaran per kandang per bulan" atau "total Pakan
+Agustus" cukup ngegabung sel - O(jumlah sel), bukan scan ulang semua
+transaksi. Bulan diitung di zona waktu kandang (ANOMALY_FARM_TZ).
+
+Update incremental: transaksi yang punya id (kandang/sheet/baris, dari
+import_excel --incremental / --cube) diinget id -> (sel, jumlah), jadi delta
+import bisa langsung diterapin: id lama yang berubah ditarik dulu dari selnya
+terus dimasukin lagi, id yang dihapus ditarik. min/max sel baru diitung ulang
+dari anggota sel itu kalo yang ditarik kebetulan nilai ujungnya.
+
+reconcile nyocokin cube sama Data Keuangan/REKAPAN.xlsx: baris REKAPAN yang
+ada tanggalnya dibandingin sama total bulan+tipe kandangnya, item biaya "# ..."
+dijumlah dibandingin sama total pengeluaran kandang itu.
+
+context bikin ulang models/context_stats.json dari cube: statistik per
+kategori & kandang (n/mean/std) plus total, biar fitur konteks scorer ga
+perlu scan ulang history. Yang ga ada di cube (median, hitungan harian,
+indeks dobel) dikosongin, bukan dicampur sama isi file lama dari sumber
+lain - keisi lagi lewat update_stats.
+
+build defaultnya sheet pertama doang, sama kayak import_excel (--all-sheets
+buat semua sheet), jadi cube & store hasil import dari sumber yang sama.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, SCRIPT_DIR)
+sys.path.insert(0, os.path.join(SCRIPT_DIR, "..", "models"))
+
+from import_excel import FILES, MONTHS, DEFAULT_YEAR, parse_excel_incremental
+from transaction_store import month_keys
+from context_stats import RunningStats, ContextStatsStore, DEFAULT_STATS_PATH
+
+CUBE_VERSION = 1
+DEFAULT_CUBE_PATH = "rollup_cube.json"
+DEFAULT_REKAPAN = "Data Keuangan/REKAPAN.xlsx"
+# REKAPAN isinya rekap KEVIN FARM
+DEFAULT_REKAPAN_KANDANG = "Kandang KEVIN"
+DIMENSIONS = ("kandang", "category", "type", "month")
+# Selisih rupiah yang masih dianggep cocok
+TOLERANCE = 0.5
+
+
+class RollupCube:
+    """Sel (kandang, kategori, tipe, bulan) -> [count, sum, min, max, m2]"""
+
+    def __init__(self):
+        self.cells = {}
+        # id transaksi -> [kunci sel, jumlah], buat narik lagi pas update
+        self.members = {}
+
+    def __len__(self):
+        return len(self.cells)
+
+    @staticmethod
+    def _frame(transactions):
+        """list dict / DataFrame -> DataFrame kolom DIMENSIONS + amount (+ id kalo ada)"""
+        df = transactions if isinstance(transactions, pd.DataFrame) else pd.DataFrame(list(transactions))
+        if df.empty:
+            return None
+        kandang = df["kandang"] if "kandang" in df.columns else df["farm_id"]
+        frame = pd.DataFrame({
+            "kandang": kandang.astype(str).to_numpy(),
+            "category": df["category"].astype(str).to_numpy(),
+            "type": df["type"].astype(str).to_numpy(),
+            "month": month_keys(df["date"].to_numpy()),
+            "amount": pd.to_numeric(df["amount"], errors="coerce").to_numpy(dtype=np.float64),
+        })
+        if "id" in df.columns:
+            frame["id"] = df["id"].astype(str).to_numpy()
+        return frame[np.isfinite(frame["amount"].to_numpy())]
+
+    def add(self, transactions):
+        """Masukin transaksi baru (vektor: groupby dulu per sel, baru digabung ke cube)"""
+        frame = self._frame(transactions)
+        if frame is None or frame.empty:
+            return 0
+        keys = (frame["kandang"] + "|" + frame["category"] + "|" + frame["type"] + "|" + frame["month"]).to_numpy()
+        grouped = frame["amount"].groupby(keys, sort=False)
+        parts = pd.DataFrame({
+            "count": grouped.count(),
+            "sum": grouped.sum(),
+            "min": grouped.min(),
+            "max": grouped.max(),
+            # ddof=0 * n = jumlah kuadrat selisih dari mean (m2)
+            "m2": grouped.var(ddof=0) * grouped.count(),
+        })
+        for key, count, total, low, high, m2 in parts.itertuples():
+            self._merge(key, int(count), float(total), float(low), float(high), float(m2))
+        if "id" in frame.columns:
+            self.members.update(zip(frame["id"], ([k, a] for k, a in zip(keys.tolist(), frame["amount"].tolist()))))
+        return len(frame)
+
+    def _merge(self, key, count, total, low, high, m2):
+        cell = self.cells.get(key)
+        if cell is None:
+            self.cells[key] = [count, total, low, high, m2]
+            return
+        n_a, sum_a = cell[0], cell[1]
+        n = n_a + count
+        delta = total / count - sum_a / n_a
+        cell[4] += m2 + delta * delta * n_a * count / n
+        cell[0] = n
+        cell[1] = sum_a + total
+        cell[2] = min(cell[2], low)
+        cell[3] = max(cell[3], high)
+
+    def retract(self, tx_id, stale=None):
+        """
+        Tarik satu transaksi (pake id) dari selnya. Kalo `stale` (set) dikasih,
+        sel yang min/max-nya perlu diitung ulang dicatet di situ aja, biar
+        refresh_extremes cukup sekali jalan buat satu delta
+        """
+        member = self.members.pop(tx_id, None)
+        if member is None:
+            return False
+        key, amount = member
+        cell = self.cells[key]
+        n = cell[0] - 1
+        if n == 0:
+            del self.cells[key]
+            return True
+        # Kebalikan update Welford
+        mean_all = cell[1] / cell[0]
+        mean_rest = (cell[1] - amount) / n
+        cell[4] = max(0.0, cell[4] - (amount - mean_all) * (amount - mean_rest))
+        cell[0] = n
+        cell[1] -= amount
+        if amount <= cell[2] or amount >= cell[3]:
+            # Nilai ujungnya ketarik, itung ulang dari anggota sel ini
+            if stale is None:
+                self.refresh_extremes({key})
+            else:
+                stale.add(key)
+        return True
+
+    def refresh_extremes(self, keys):
+        """Itung ulang min/max sel-sel ini dari anggotanya (satu kali scan members)"""
+        extremes = {}
+        for key, amount in self.members.values():
+            if key in keys:
+                low, high, count = extremes.get(key, (amount, amount, 0))
+                extremes[key] = (min(low, amount), max(high, amount), count + 1)
+        for key, (low, high, count) in extremes.items():
+            cell = self.cells.get(key)
+            # Sel yang sebagian isinya transaksi tanpa id ga bisa diitung ulang, biarin batas lamanya
+            if cell is not None and cell[0] == count:
+                cell[2], cell[3] = low, high
+
+    def apply(self, transactions, removed=()):
+        """Terapin delta import: id yang udah ada diganti, id di `removed` ditarik"""
+        transactions = list(transactions)
+        stale = set()
+        for tx_id in removed:
+            self.retract(tx_id, stale)
+        for tx in transactions:
+            if "id" in tx:
+                self.retract(str(tx["id"]), stale)
+        if stale:
+            self.refresh_extremes(stale)
+        return self.add(transactions)
+
+    def query(self, kandang=None, category=None, tx_type=None, start=None, end=None, by=("kandang", "month")):
+        """
+        Gabung sel yang lolos filter per dimensi `by`. start/end = 'YYYY-MM'
+        (end inklusif). Balikin list dict dimensi + count/sum/min/max/mean.
+        """
+        positions = [DIMENSIONS.index(name) for name in by]
+        groups = {}
+        for key, cell in self.cells.items():
+            parts = key.split("|")
+            if kandang is not None and parts[0] != kandang:
+                continue
+            if category is not None and parts[1] != category:
+                continue
+            if tx_type is not None and parts[2] != tx_type:
+                continue
+            if start is not None and parts[3] < start:
+                continue
+            if end is not None and parts[3] > end:
+                continue
+            group = tuple(parts[i] for i in positions)
+            current = groups.get(group)
+            if current is None:
+                groups[group] = list(cell[:4])
+            else:
+                current[0] += cell[0]
+                current[1] += cell[1]
+                current[2] = min(current[2], cell[2])
+                current[3] = max(current[3], cell[3])
+        rows = []
+        for group in sorted(groups):
+            count, total, low, high = groups[group]
+            rows.append({
+                **dict(zip(by, group)),
+                "count": count, "sum": total, "min": low, "max": high, "mean": total / count,
+            })
+        return rows
+
+    def running_stats(self, dimension):
+        """RunningStats per kategori / kandang (gabungan semua sel), buat context_stats"""
+        position = DIMENSIONS.index(dimension)
+        stats = {}
+        for key, (count, total, _, _, m2) in self.cells.items():
+            name = key.split("|")[position]
+            stats.setdefault(name, RunningStats()).merge(RunningStats(count, total / count, m2))
+        return stats
+
+    def to_dict(self):
+        return {
+            "version": CUBE_VERSION,
+            "cells": self.cells,
+            "members": self.members,
+        }
+
+    @classmethod
+    def from_dict(cls, d):
+        cube = cls()
+        if d.get("version") != CUBE_VERSION:
+            return cube
+        cube.cells = d.get("cells", {})
+        cube.members = d.get("members", {})
+        return cube
+
+    def save(self, path=DEFAULT_CUBE_PATH):
+        """Tulis ke file sementara dulu baru rename"""
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CUBE_PATH):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def build(files=FILES, all_sheets=False):
+    """Cube dari nol: parse semua ledger (pake id stabil biar bisa diupdate incremental)"""
+    cube = RollupCube()
+    for file_path, kandang_name in files:
+        transactions, _, _ = parse_excel_incremental(file_path, kandang_name, None, all_sheets)
+        cube.add(transactions)
+    return cube
+
+
+def read_delta(path):
+    """Output import_excel --incremental (JSON / NDJSON) -> (transaksi, id yang dihapus)"""
+    if path.endswith((".ndjson", ".jsonl")):
+        transactions, removed = [], []
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                tx = json.loads(line)
+                if tx.get("removed"):
+                    removed.append(tx["id"])
+                else:
+                    transactions.append(tx)
+        return transactions, removed
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return data.get("transactions", []), data.get("removed", [])
+
+
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        return None
+    return float(value)
+
+
+def read_rekapan(path=DEFAULT_REKAPAN):
+    """
+    Baca REKAPAN.xlsx (layout sama kayak LAPKEU: TGL, tanggal, KETERANGAN,
+    MASUK, KELUAR, SALDO). Balikin:
+      dated : baris yang ada tanggalnya -> {(bulan, tipe): jumlah}
+      items : item biaya "# ..." (KELUAR) -> [(keterangan, jumlah)]
+      totals: baris LABA (RUGI) -> {masuk, keluar, saldo}
+    """
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = list(workbook.worksheets[0].iter_rows(values_only=True))
+    finally:
+        workbook.close()
+
+    header_index = next(i for i, row in enumerate(rows) if "KETERANGAN" in row)
+    header = list(rows[header_index])
+    k_pos, in_pos, out_pos = header.index("KETERANGAN"), header.index("MASUK"), header.index("KELUAR")
+    saldo_pos = header.index("SALDO") if "SALDO" in header else None
+
+    month, year = None, DEFAULT_YEAR
+    dated, items, totals = {}, [], None
+    for row in rows[header_index + 1:]:
+        row = list(row) + [None] * (len(header) - len(row))
+        tgl, day, text = row[0], row[1], row[k_pos]
+        text = str(text).strip() if text is not None else ""
+        masuk, keluar = _number(row[in_pos]), _number(row[out_pos])
+
+        # Bulan/tahun di kolom TGL dibawa terus ke baris bawahnya (kayak parse_sheet)
+        if isinstance(tgl, str):
+            month = next((number for name, number in MONTHS.items() if name in tgl.upper()), month)
+        elif _number(tgl) is not None and tgl > 2000:
+            year = int(tgl)
+
+        if text.upper().startswith("LABA"):
+            totals = {"masuk": masuk or 0.0, "keluar": keluar or 0.0,
+                      "saldo": _number(row[saldo_pos]) if saldo_pos is not None else None}
+        elif _number(day) is not None and month is not None:
+            key = f"{year:04d}-{month:02d}"
+            if masuk:
+                dated[(key, "income")] = dated.get((key, "income"), 0.0) + masuk
+            if keluar:
+                dated[(key, "expense")] = dated.get((key, "expense"), 0.0) + keluar
+        elif text.startswith("#") and keluar:
+            items.append((text.lstrip("# ").strip(), keluar))
+    return {"dated": dated, "items": items, "totals": totals}
+
+
+def reconcile(cube, rekapan, kandang=DEFAULT_REKAPAN_KANDANG, tolerance=TOLERANCE):
+    """Bandingin total REKAPAN sama cube. Balikin list cek {check, expected, actual, diff, ok}"""
+    checks = []
+
+    def check(name, expected, actual):
+        diff = actual - expected
+        checks.append({"check": name, "expected": expected, "actual": actual,
+                       "diff": diff, "ok": abs(diff) <= tolerance})
+
+    for (month, tx_type), expected in sorted(rekapan["dated"].items()):
+        rows = cube.query(kandang=kandang, tx_type=tx_type, start=month, end=month, by=())
+        check(f"{kandang} {tx_type} {month}", expected, rows[0]["sum"] if rows else 0.0)
+
+    if rekapan["items"]:
+        rows = cube.query(kandang=kandang, tx_type="expense", by=())
+        check(f"{kandang} total biaya (item #)", sum(amount for _, amount in rekapan["items"]),
+              rows[0]["sum"] if rows else 0.0)
+    return checks
+
+
+def seed_context(cube):
+    """
+    ContextStatsStore baru yang isinya cuma yang dipegang cube: statistik per
+    kategori & kandang plus total. Median, hitungan harian & indeks dobel
+    kosong (bukan sisa file lama), jadi semuanya dari satu sumber.
+    """
+    stats = ContextStatsStore()
+    stats.category_stats = cube.running_stats("category")
+    stats.farm_stats = cube.running_stats("kandang")
+    stats.total = sum(cell[0] for cell in cube.cells.values())
+    stats.dirty = True
+    return stats
+
+
+def _print_rows(rows, by):
+    print(f"  {' '.join(f'{name:<16}' for name in by)} {'count':>6} {'sum':>16} {'min':>14} {'max':>14} {'mean':>14}")
+    for row in rows:
+        dims = " ".join(f"{str(row[name])[:16]:<16}" for name in by)
+        print(f"  {dims} {row['count']:>6} {row['sum']:>16,.0f} {row['min']:>14,.0f} "
+              f"{row['max']:>14,.0f} {row['mean']:>14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rollup bulanan per kandang x kategori x tipe")
+    parser.add_argument("--cube", default=DEFAULT_CUBE_PATH, help=f"file cube (default {DEFAULT_CUBE_PATH})")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("build", help="bikin cube dari semua ledger Data Keuangan/")
+    p.add_argument("--all-sheets", action="store_true", help="semua sheet (default sheet pertama doang, kayak import_excel)")
+    p = sub.add_parser("update", help="terapin delta import_excel --incremental")
+    p.add_argument("delta")
+    p = sub.add_parser("query")
+    p.add_argument("--kandang")
+    p.add_argument("--category")
+    p.add_argument("--type", choices=["income", "expense"])
+    p.add_argument("--start", help="bulan awal YYYY-MM")
+    p.add_argument("--end", help="bulan akhir YYYY-MM (inklusif)")
+    p.add_argument("--by", default="kandang,month", help="dimensi dipisah koma (kandang,category,type,month)")
+    p = sub.add_parser("reconcile", help="cocokin sama REKAPAN.xlsx")
+    p.add_argument("--rekapan", default=DEFAULT_REKAPAN)
+    p.add_argument("--kandang", default=DEFAULT_REKAPAN_KANDANG)
+    p = sub.add_parser("context", help="bikin ulang context_stats.json dari cube (kategori/kandang)")
+    p.add_argument("--stats", default=DEFAULT_STATS_PATH)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        cube = build(all_sheets=args.all_sheets)
+        cube.save(args.cube)
+        print(f"✓ {len(cube.members)} transaksi -> {len(cube)} sel, disimpen ke {args.cube}")
+        return
+
+    cube = RollupCube.load(args.cube)
+    if args.command == "update":
+        transactions, removed = read_delta(args.delta)
+        cube.apply(transactions, removed)
+        cube.save(args.cube)
+        print(f"✓ {len(transactions)} baru/berubah, {len(removed)} dihapus -> {len(cube)} sel")
+    elif args.command == "query":
+        by = tuple(name for name in args.by.split(",") if name)
+        unknown = [name for name in by if name not in DIMENSIONS]
+        if unknown:
+            parser.error(f"dimensi ga dikenal: {', '.join(unknown)}")
+        _print_rows(cube.query(args.kandang, args.category, args.type, args.start, args.end, by), by)
+    elif args.command == "reconcile":
+        rekapan = read_rekapan(args.rekapan)
+        checks = reconcile(cube, rekapan, args.kandang)
+        for c in checks:
+            mark = "✓" if c["ok"] else "✗"
+            print(f"  {mark} {c['check']:<45} REKAPAN {c['expected']:>16,.0f}  cube {c['actual']:>16,.0f}  "
+                  f"selisih {c['diff']:>12,.0f}")
+        if rekapan["totals"]:
+            t = rekapan["totals"]
+            print(f"  (LABA (RUGI) REKAPAN: masuk {t['masuk']:,.0f}, keluar {t['keluar']:,.0f}, saldo {t['saldo'] or 0:,.0f})")
+        failed = sum(1 for c in checks if not c["ok"])
+        print(f"\n{'✓ Semua cocok' if not failed else f'✗ {failed} dari {len(checks)} cek ga cocok'}")
+        if failed:
+            sys.exit(1)
+    else:
+        stats = seed_context(cube)
+        stats.save(args.stats)
+        print(f"✓ {len(stats.category_stats)} kategori, {len(stats.farm_stats)} kandang dari cube -> {args.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,367 @@
+"""
+Training model anomali tanpa notebook.
+Run: py scripts/train_model.py DATASET [--model rf|hgb] [--n-jobs N] [--trees N]
+                                       [--warm-start] [--extra-trees N] [--no-activate]
+                                       [--farm F] [--start D] [--end D] [--farm-timezone TZ]
+
+DATASET bisa .ndjson / .parquet (dibaca per chunk, cuma kolom yang dipake),
+folder store Parquet partisi kandang/bulan (models/transaction_store.py, bisa
+difilter --farm/--start/--end tanpa baca partisi lain) atau .json format lama
+(diload sekali). Fiturnya dari models/feature_plan.py, sama
+persis kayak yang dipake scorer.
+
+Hasilnya masuk folder versi baru di models/versions/<versi>/ (model, scaler,
+encoder, model_config.json, forest/ compiled kalo RF, metrics.json). Folder itu
+ditulis lengkap dulu di nama sementara, di-rename, baru file versions/CURRENT
+diganti (tulis file sementara + os.replace) - scorer yang lagi jalan ga pernah
+kebaca artifact setengah jadi. Balik ke versi lama = tulis nama versinya ke CURRENT.
+
+Model:
+  rf   RandomForest kayak di notebook, n_jobs paralel
+  hgb  HistGradientBoosting (histogram), jauh lebih cepet buat data gede
+  --warm-start  lanjutin model versi aktif pake data baru (RF nambah --extra-trees
+                tree, HGB nambah --extra-trees iterasi), scaler & encoder-nya dipake ulang
+
+Fitur jam/hari diitung di zona waktu "farm_timezone" dari config versi aktif
+(model bawaan: UTC, kayak notebook-nya). Training ulang pake jam lokal kandang:
+--farm-timezone Asia/Jakarta (ga bisa bareng --warm-start).
+
+metrics.json: akurasi/precision/recall/F1, waktu load/fitur/training, ukuran
+artifact, latency predict satu baris (p50/p99) sama throughput batch.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+
+import numpy as np
+import pandas as pd
+import joblib
+from sklearn.ensemble import RandomForestClassifier, HistGradientBoostingClassifier
+from sklearn.metrics import accuracy_score, confusion_matrix, precision_recall_fscore_support
+from sklearn.model_selection import train_test_split
+from sklearn.preprocessing import LabelEncoder, StandardScaler
+
+try:
+    import pyarrow.parquet as pq
+except ImportError:
+    pq = None
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+MODELS_DIR = os.path.join(SCRIPT_DIR, "..", "models")
+sys.path.insert(0, MODELS_DIR)
+
+from feature_plan import FeaturePlan
+from transaction_store import TransactionStore
+from predict_anomaly import VERSIONS_DIR, resolve_model_dir
+
+# Kolom dataset yang kepake buat training
+TRAIN_COLUMNS = ["amount", "type", "category", "farm_id", "date", "is_anomaly"]
+TEXT_COLUMNS = ["type", "category", "farm_id"]
+CHUNK_ROWS = 200_000
+MODEL_FILE = "anomaly_detector_rf.joblib"
+LATENCY_SAMPLES = 200
+
+
+def _compact(chunk):
+    """Ambil kolom training aja, teks jadi categorical biar hemat memori"""
+    chunk = chunk[TRAIN_COLUMNS].copy()
+    for column in TEXT_COLUMNS:
+        chunk[column] = chunk[column].astype("category")
+    return chunk
+
+
+def read_chunks(path, chunk_rows=CHUNK_ROWS, filters=None):
+    """Baca dataset per chunk (DataFrame kolom TRAIN_COLUMNS). filters cuma buat store"""
+    if os.path.isdir(path):
+        store = TransactionStore(path)
+        for batch in store.batches(TRAIN_COLUMNS, batch_rows=chunk_rows, **(filters or {})):
+            yield _compact(batch.to_pandas())
+    elif path.endswith(".parquet"):
+        if pq is None:
+            yield _compact(pd.read_parquet(path, columns=TRAIN_COLUMNS))
+            return
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=TRAIN_COLUMNS):
+            yield _compact(batch.to_pandas())
+    elif path.endswith((".ndjson", ".jsonl")):
+        for chunk in pd.read_json(path, lines=True, chunksize=chunk_rows, dtype=False):
+            yield _compact(chunk)
+    else:
+        with open(path, "r", encoding="utf-8") as f:
+            transactions = json.load(f)["transactions"]
+        for start in range(0, len(transactions), chunk_rows):
+            yield _compact(pd.DataFrame(transactions[start:start + chunk_rows]))
+
+
+def load_dataset(path, chunk_rows=CHUNK_ROWS, filters=None):
+    """Gabung semua chunk jadi satu DataFrame ringkes"""
+    chunks = list(read_chunks(path, chunk_rows, filters))
+    if not chunks:
+        raise RuntimeError(f"dataset {path} kosong")
+    df = pd.DataFrame({
+        column: (
+            pd.api.types.union_categoricals([c[column] for c in chunks])
+            if column in TEXT_COLUMNS else
+            np.concatenate([c[column].to_numpy() for c in chunks])
+        )
+        for column in TRAIN_COLUMNS
+    })
+    if os.path.isdir(path):
+        # Store kebaca per partisi, diurutin tanggal lagi biar sama kayak file dataset
+        df = df.sort_values("date", kind="stable", ignore_index=True)
+    return df
+
+
+def _thresholds(path):
+    """anomaly_thresholds dari header dataset JSON / _dataset.json store (kayak notebook), None kalo ga ada"""
+    if os.path.isdir(path):
+        return TransactionStore(path).meta().get("anomaly_thresholds")
+    if not path.endswith(".json"):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f).get("anomaly_thresholds")
+
+
+def build_model(args, previous_dir):
+    """Model baru, atau model versi aktif yang dilanjutin (warm start)"""
+    if args.warm_start:
+        model = joblib.load(os.path.join(previous_dir, MODEL_FILE))
+        if isinstance(model, RandomForestClassifier):
+            model.set_params(warm_start=True, n_estimators=model.n_estimators + args.extra_trees, n_jobs=args.n_jobs)
+        elif isinstance(model, HistGradientBoostingClassifier):
+            model.set_params(warm_start=True, max_iter=model.max_iter + args.extra_trees)
+        else:
+            raise RuntimeError(f"model {type(model).__name__} ga bisa di-warm start")
+        return model
+
+    if args.model == "hgb":
+        return HistGradientBoostingClassifier(
+            max_iter=args.trees,
+            learning_rate=0.1,
+            class_weight="balanced",
+            random_state=args.seed,
+        )
+    # Parameter sama kayak notebook
+    return RandomForestClassifier(
+        n_estimators=args.trees,
+        max_depth=10,
+        min_samples_split=5,
+        class_weight="balanced",
+        random_state=args.seed,
+        n_jobs=args.n_jobs,
+    )
+
+
+def latency(model, X):
+    """Latency predict_proba satu baris (ms) + throughput satu batch penuh"""
+    if hasattr(model, "n_jobs"):
+        # Scorer jalan satu thread per request
+        n_jobs, model.n_jobs = model.n_jobs, 1
+    samples = []
+    for i in range(min(LATENCY_SAMPLES, len(X))):
+        start = time.perf_counter()
+        model.predict_proba(X[i:i + 1])
+        samples.append((time.perf_counter() - start) * 1000)
+    start = time.perf_counter()
+    model.predict_proba(X)
+    batch_s = time.perf_counter() - start
+    if hasattr(model, "n_jobs"):
+        model.n_jobs = n_jobs
+    return {
+        "single_p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "single_p99_ms": round(float(np.percentile(samples, 99)), 3),
+        "batch_rows": len(X),
+        "batch_rows_per_sec": round(len(X) / batch_s, 1),
+    }
+
+
+def _size(path):
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def new_version(versions_dir, model_type):
+    version = time.strftime("%Y%m%d-%H%M%S") + f"-{model_type}"
+    suffix = 1
+    while os.path.exists(os.path.join(versions_dir, version)):
+        suffix += 1
+        version = time.strftime("%Y%m%d-%H%M%S") + f"-{model_type}-{suffix}"
+    return version
+
+
+def activate(versions_dir, version):
+    """Ganti versions/CURRENT ke versi ini (atomic)"""
+    pointer = os.path.join(versions_dir, "CURRENT")
+    tmp_path = pointer + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(version + "\n")
+    os.replace(tmp_path, pointer)
+
+
+def train(args):
+    timings = {}
+    previous_dir = resolve_model_dir(args.versions_dir)
+    with open(os.path.join(previous_dir, "model_config.json"), "r", encoding="utf-8") as f:
+        base_config = json.load(f)
+
+    start = time.perf_counter()
+    filters = {"farms": args.farm, "start": args.start, "end": args.end}
+    df = load_dataset(args.dataset, args.chunk_rows, filters)
+    timings["load_s"] = time.perf_counter() - start
+
+    config = {key: value for key, value in base_config.items() if key != "model_version"}
+    thresholds = _thresholds(args.dataset)
+    if thresholds:
+        config["anomaly_thresholds"] = thresholds
+    if args.farm_timezone:
+        if args.warm_start and args.farm_timezone != base_config.get("farm_timezone"):
+            # Tree lama dilatih pake jam zona yang lama, jangan dicampur
+            raise RuntimeError("--farm-timezone ga bisa diganti pas --warm-start")
+        config["farm_timezone"] = args.farm_timezone
+
+    if args.warm_start:
+        # Fitur harus diskalain & diencode sama persis kayak model yang dilanjutin
+        scaler = joblib.load(os.path.join(previous_dir, "scaler.joblib"))
+        encoders = {name: joblib.load(os.path.join(previous_dir, f"le_{name}.joblib")) for name in ("category", "farm", "type")}
+    else:
+        scaler = StandardScaler()
+        encoders = {
+            "category": LabelEncoder().fit(df["category"].cat.categories),
+            "farm": LabelEncoder().fit(df["farm_id"].cat.categories),
+            "type": LabelEncoder().fit(df["type"].cat.categories),
+        }
+        config["category_mapping"] = {c: i for i, c in enumerate(encoders["category"].classes_.tolist())}
+
+    start = time.perf_counter()
+    plan = FeaturePlan(config, encoders["category"], encoders["type"])
+    X = np.nan_to_num(plan.build_frame(df), nan=0)
+    y = df["is_anomaly"].to_numpy(dtype=np.int64)
+    timings["features_s"] = time.perf_counter() - start
+    del df
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=args.test_size, random_state=args.seed, stratify=y
+    )
+    if args.warm_start:
+        X_train = scaler.transform(X_train)
+    else:
+        X_train = scaler.fit_transform(X_train)
+    X_test = scaler.transform(X_test)
+
+    model = build_model(args, previous_dir)
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    timings["train_s"] = time.perf_counter() - start
+
+    predictions = model.predict(X_test)
+    precision, recall, f1, _ = precision_recall_fscore_support(
+        y_test, predictions, average="binary", zero_division=0
+    )
+    model_type = "hgb" if isinstance(model, HistGradientBoostingClassifier) else "rf"
+
+    versions_dir = args.versions_dir
+    os.makedirs(versions_dir, exist_ok=True)
+    version = new_version(versions_dir, model_type)
+    tmp_dir = os.path.join(versions_dir, f".{version}.tmp")
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    joblib.dump(model, os.path.join(tmp_dir, MODEL_FILE))
+    joblib.dump(scaler, os.path.join(tmp_dir, "scaler.joblib"))
+    for name, encoder in encoders.items():
+        joblib.dump(encoder, os.path.join(tmp_dir, f"le_{name}.joblib"))
+    config.update({
+        "model_version": version,
+        "model_type": model_type,
+        "feature_columns": plan.feature_columns,
+        # Jam/hari fitur dilatih di zona waktu ini, scorer versi ini ikut pake
+        "farm_timezone": plan.tz,
+    })
+    with open(os.path.join(tmp_dir, "model_config.json"), "w", encoding="utf-8") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+
+    if model_type == "rf":
+        # Versi compiled buat scorer (forest/ di dalem folder versi)
+        from compiled_forest import export
+        export(tmp_dir, os.path.join(tmp_dir, "forest"))
+
+    metrics = {
+        "version": version,
+        "model_type": model_type,
+        "warm_start": bool(args.warm_start),
+        "base_version": base_config.get("model_version") if args.warm_start else None,
+        "dataset": os.path.abspath(args.dataset),
+        "rows": {"train": len(X_train), "test": len(X_test), "anomalies": int(y.sum())},
+        "accuracy": round(float(accuracy_score(y_test, predictions)), 4),
+        "precision": round(float(precision), 4),
+        "recall": round(float(recall), 4),
+        "f1": round(float(f1), 4),
+        "confusion_matrix": confusion_matrix(y_test, predictions).tolist(),
+        "timings": {name: round(seconds, 3) for name, seconds in timings.items()},
+        "size_bytes": {
+            "model": _size(os.path.join(tmp_dir, MODEL_FILE)),
+            "forest": _size(os.path.join(tmp_dir, "forest")) if model_type == "rf" else 0,
+            "total": _size(tmp_dir),
+        },
+        "latency": latency(model, X_test),
+        "n_jobs": args.n_jobs,
+        "trained_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+    with open(os.path.join(tmp_dir, "metrics.json"), "w", encoding="utf-8") as f:
+        json.dump(metrics, f, indent=2)
+
+    os.rename(tmp_dir, os.path.join(versions_dir, version))
+    if not args.no_activate:
+        activate(versions_dir, version)
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training model anomali transaksi kandang")
+    parser.add_argument("dataset", help="dataset .json / .ndjson / .parquet / folder store (dari generate_dataset.py)")
+    parser.add_argument("--model", choices=["rf", "hgb"], default="rf")
+    parser.add_argument("--n-jobs", type=int, default=-1, help="core buat training RF (-1 = semua)")
+    parser.add_argument("--trees", type=int, default=100, help="jumlah tree (RF) / iterasi (HGB)")
+    parser.add_argument("--warm-start", action="store_true", help="lanjutin model versi aktif")
+    parser.add_argument("--extra-trees", type=int, default=50, help="tree/iterasi tambahan buat --warm-start")
+    parser.add_argument("--test-size", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--farm", action="append", help="store: cuma kandang ini (boleh berkali-kali)")
+    parser.add_argument("--start", help="store: tanggal awal (YYYY-MM-DD atau epoch ms)")
+    parser.add_argument("--end", help="store: tanggal akhir, eksklusif")
+    parser.add_argument("--farm-timezone",
+                        help="zona waktu fitur jam/hari (default: yang dicatet di config versi aktif, "
+                             "kalo ga ada ANOMALY_FARM_TZ) - model bawaan dilatih pake UTC")
+    parser.add_argument("--versions-dir", default=VERSIONS_DIR)
+    parser.add_argument("--no-activate", action="store_true", help="simpen versinya tapi CURRENT jangan diganti")
+    args = parser.parse_args()
+
+    try:
+        metrics = train(args)
+    except (RuntimeError, OSError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print("=" * 60)
+    print(f"MODEL {metrics['version']} ({metrics['model_type']})")
+    print("=" * 60)
+    print(f"Data: {metrics['rows']['train']} train / {metrics['rows']['test']} test")
+    print(f"Accuracy {metrics['accuracy']}  Precision {metrics['precision']}  "
+          f"Recall {metrics['recall']}  F1 {metrics['f1']}")
+    timings = metrics["timings"]
+    print(f"Waktu: load {timings['load_s']}s, fitur {timings['features_s']}s, training {timings['train_s']}s")
+    print(f"Ukuran: {metrics['size_bytes']['total'] / 1024:.0f} KB")
+    lat = metrics["latency"]
+    print(f"Latency 1 baris: p50 {lat['single_p50_ms']} ms, p99 {lat['single_p99_ms']} ms; "
+          f"batch {lat['batch_rows_per_sec']:,.0f} baris/s")
+    status = "aktif (CURRENT)" if not args.no_activate else "disimpen, belum aktif"
+    print(f"\n✅ {os.path.join(args.versions_dir, metrics['version'])} - {status}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,50 +15,172 @@ const PREDICT_SCRIPT = path.join(MODELS_DIR, 'predict_anomaly.py');
 // Semua routes butuh authentication
 router.use(isAuthenticated);
 
+// Jumlah worker Python yang standby (model cuma diload sekali per worker)
+const POOL_SIZE = Math.max(1, Number(process.env.ANOMALY_WORKERS) || 2);
+// Batas waktu nunggu worker siap / jawab request
+const READY_TIMEOUT_MS = 30000;
+const REQUEST_TIMEOUT_MS = 30000;
+// model_version di response kalo yang jawab fallback rule-based, bukan model Python
+const RULE_BASED_VERSION = 'rule-based';
+// ANOMALY_UPDATE_STATS=1: transaksi dari /detect dimasukin ke statistik historis Python
+// (update_stats). /batch ga pernah, isinya scan ulang transaksi yang udah ada
+const UPDATE_STATS = ['1', 'true', 'yes'].includes(String(process.env.ANOMALY_UPDATE_STATS || '').toLowerCase());
+// Jam transaksi diitung di zona waktu kandang, sama kayak scorer Python (bukan TZ server)
+const FARM_TZ = process.env.ANOMALY_FARM_TZ || 'Asia/Jakarta';
+const farmHourFormat = new Intl.DateTimeFormat('en-US', { timeZone: FARM_TZ, hour: 'numeric', hourCycle: 'h23' });
+
 /**
- * Call Python ML model for prediction
- * @param {Object} data - Transaction data to predict
- * @returns {Promise<Object>} - Prediction result
+ * Satu proses Python resident (predict_anomaly.py --serve)
+ * Ngobrol pake NDJSON lewat stdin/stdout
  */
-async function callPythonModel(data) {
-    return new Promise((resolve, reject) => {
-        const python = spawn('python', [PREDICT_SCRIPT], {
+class ScoringWorker {
+    constructor() {
+        this.nextId = 1;
+        this.pending = new Map();
+        this.buffer = '';
+        this.stderr = '';
+        this.dead = false;
+
+        this.process = spawn('python', [PREDICT_SCRIPT, '--serve'], {
             cwd: MODELS_DIR
         });
 
-        let stdout = '';
-        let stderr = '';
-
-        python.stdout.on('data', (data) => {
-            stdout += data.toString();
+        this.ready = new Promise((resolve, reject) => {
+            this.resolveReady = resolve;
+            this.rejectReady = reject;
         });
-
-        python.stderr.on('data', (data) => {
-            stderr += data.toString();
+        this.readyTimer = setTimeout(() => {
+            this.kill(new Error('Python worker not ready in time'));
+        }, READY_TIMEOUT_MS);
+
+        this.process.stdout.on('data', (chunk) => this.onStdout(chunk));
+        this.process.stderr.on('data', (chunk) => {
+            // Simpen ekor stderr aja buat pesan error
+            this.stderr = (this.stderr + chunk.toString()).slice(-4000);
+        });
+        this.process.stdin.on('error', (err) => this.kill(err));
+        this.process.on('error', (err) => this.kill(err));
+        this.process.on('close', (code) => {
+            this.kill(new Error(`Python process exited with code ${code}: ${this.stderr}`));
         });
+    }
+
+    get load() {
+        return this.pending.size;
+    }
+
+    onStdout(chunk) {
+        this.buffer += chunk.toString();
+
+        let newline;
+        while ((newline = this.buffer.indexOf('\n')) !== -1) {
+            const line = this.buffer.slice(0, newline).trim();
+            this.buffer = this.buffer.slice(newline + 1);
+            if (line) this.onMessage(line);
+        }
+    }
+
+    onMessage(line) {
+        let message;
+        try {
+            message = JSON.parse(line);
+        } catch (e) {
+            console.error('Failed to parse Python output:', line);
+            return;
+        }
 
-        python.on('close', (code) => {
-            if (code !== 0) {
-                console.error('Python stderr:', stderr);
-                reject(new Error(`Python process exited with code ${code}: ${stderr}`));
-            } else {
-                try {
-                    const result = JSON.parse(stdout);
-                    resolve(result);
-                } catch (e) {
-                    reject(new Error(`Failed to parse Python output: ${stdout}`));
-                }
+        // Sinyal siap dari worker
+        if (message.ready) {
+            clearTimeout(this.readyTimer);
+            if (message.model_error) {
+                console.warn('Python worker loaded without model:', message.model_error);
+            }
+            this.resolveReady();
+            return;
+        }
+
+        const request = this.pending.get(message.id);
+        if (!request) return;
+
+        this.pending.delete(message.id);
+        clearTimeout(request.timer);
+
+        if (message.error) {
+            request.reject(new Error(message.error));
+        } else {
+            request.resolve(message.result);
+        }
+    }
+
+    predict(data) {
+        return this.send({ payload: data });
+    }
+
+    /**
+     * Perintah non-skoring (misal 'metrics', 'cache_stats')
+     */
+    command(name) {
+        return this.send({ command: name });
+    }
+
+    async send(message) {
+        await this.ready;
+
+        return new Promise((resolve, reject) => {
+            if (this.dead) {
+                return reject(new Error('Python worker is not running'));
             }
-        });
 
-        python.on('error', (err) => {
-            reject(err);
+            const id = this.nextId++;
+            const timer = setTimeout(() => {
+                this.pending.delete(id);
+                reject(new Error('Python worker timed out'));
+            }, REQUEST_TIMEOUT_MS);
+
+            this.pending.set(id, { resolve, reject, timer });
+            this.process.stdin.write(JSON.stringify({ id, ...message }) + '\n');
         });
+    }
+
+    kill(err) {
+        if (this.dead) return;
+        this.dead = true;
+
+        clearTimeout(this.readyTimer);
+        this.rejectReady(err);
+        // Biar ga jadi unhandled rejection kalo belum ada yang nunggu
+        this.ready.catch(() => {});
+
+        for (const request of this.pending.values()) {
+            clearTimeout(request.timer);
+            request.reject(err);
+        }
+        this.pending.clear();
+        this.process.kill();
+    }
+}
 
-        // Send input data to Python
-        python.stdin.write(JSON.stringify(data));
-        python.stdin.end();
-    });
+const workers = [];
+
+/**
+ * Ambil worker yang paling sepi, worker yang mati diganti baru
+ */
+function getWorker() {
+    for (let i = 0; i < POOL_SIZE; i++) {
+        if (!workers[i] || workers[i].dead) {
+            workers[i] = new ScoringWorker();
+        }
+    }
+    return workers.reduce((best, worker) => (worker.load < best.load ? worker : best));
+}
+
+/**
+ * Call Python ML model for prediction
+ * @param {Object} data - Transaction data to predict
+ * @returns {Promise<Object>} - Prediction result
+ */
+async function callPythonModel(data) {
+    return getWorker().predict(data);
 }
 
 /**
@@ -67,7 +189,7 @@ async function callPythonModel(data) {
  */
 router.post('/detect', async (req, res) => {
     try {
-        const { amount, type, category, date, description, farm_id } = req.body;
+        const { id, amount, type, category, date, description, farm_id } = req.body;
 
         // Validasi input
         if (!amount || !type || !category || !date) {
@@ -82,7 +204,12 @@ router.post('/detect', async (req, res) => {
             category,
             date: Number(date),
             description: description || '',
-            farm_id: farm_id || 'KANDANG1'
+            farm_id: farm_id || 'KANDANG1',
+            // id kepake buat bedain dobel vs transaksinya sendiri di history
+            ...(id !== undefined && { id }),
+            ...(UPDATE_STATS && { update_stats: true }),
+            // ?timings=1 -> timing per tahap dari Python ikut di response
+            ...(req.query.timings === '1' && { timings: true })
         };
 
         try {
@@ -93,7 +220,7 @@ router.post('/detect', async (req, res) => {
             console.warn('ML model failed, using rule-based fallback:', mlError.message);
             // Fallback to rule-based
             const result = detectAnomalyRuleBased(txData);
-            res.json(result);
+            res.json({ ...result, model_version: RULE_BASED_VERSION });
         }
     } catch (error) {
         console.error('Anomaly detection error:', error);
@@ -115,7 +242,10 @@ router.post('/batch', async (req, res) => {
 
         try {
             // Try ML model for batch
-            const result = await callPythonModel({ transactions });
+            const result = await callPythonModel({
+                transactions,
+                ...(req.query.timings === '1' && { timings: true })
+            });
             res.json(result);
         } catch (mlError) {
             console.warn('ML model failed, using rule-based fallback:', mlError.message);
@@ -138,7 +268,8 @@ router.post('/batch', async (req, res) => {
                 total: results.length,
                 anomaly_count: anomalies.length,
                 anomaly_percentage: (anomalies.length / results.length * 100).toFixed(2),
-                transactions: results
+                transactions: results,
+                model_version: RULE_BASED_VERSION
             });
         }
     } catch (error) {
@@ -147,6 +278,23 @@ router.post('/batch', async (req, res) => {
     }
 });
 
+/**
+ * GET /api/anomaly/metrics
+ * Dump metrics kumulatif tiap worker Python (isinya baru keisi kalo ANOMALY_METRICS=1)
+ */
+router.get('/metrics', async (req, res) => {
+    try {
+        getWorker();
+        const results = await Promise.allSettled(workers.map(worker => worker.command('metrics')));
+        res.json({
+            workers: results.map(r => (r.status === 'fulfilled' ? r.value : { error: r.reason.message }))
+        });
+    } catch (error) {
+        console.error('Anomaly metrics error:', error);
+        res.status(500).json({ error: error.message });
+    }
+});
+
 /**
  * Rule-based anomaly detection (fallback)
  * Used when Python ML model is not available
@@ -178,7 +326,7 @@ function detectAnomalyRuleBased(transaction) {
 
     // 2. Time Pattern - transaksi tengah malam (12am - 4am)
     const txDate = new Date(date);
-    const hour = txDate.getHours();
+    const hour = Number.isNaN(txDate.getTime()) ? -1 : Number(farmHourFormat.format(txDate));
     if (hour >= 0 && hour <= 4) {
         anomaly_reasons.push('time_pattern');
         confidence += 0.5;